@@ -1,14 +1,17 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File
 from fastapi.responses import StreamingResponse
-from typing import List
+from typing import Callable, Dict, List, Optional, Tuple
 import cv2
 import sys
 import os
+import time
 import logging
 import numpy as np
 import io
 import base64
 from PIL import Image
+from app.core.config import settings
+from app.services.shared_frames import read_shared_frame
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +20,34 @@ router = APIRouter()
 # Almacenar frames procesados por cámara
 camera_frames = {}
 
+# Última vez (monotónica) que un navegador pidió frames de cada cámara
+camera_viewers: Dict[int, float] = {}
+
+
+def _register_viewer(camera_id: int):
+    """Registrar que la cámara tiene un visor activo"""
+    camera_viewers[camera_id] = time.monotonic()
+
+
+def _encode_latest_frame(camera_id: int, encode: Callable[[np.ndarray], bytes]) -> Tuple[bytes, Optional[float]]:
+    """
+    Codificar el último frame de la cámara
+    
+    Si el detector corre en el mismo host con --frame-transport shm, el frame se
+    codifica directamente desde la memoria compartida (sin copias ni decodificación);
+    si no, se usa el último frame recibido por HTTP.
+    """
+    shared = read_shared_frame(camera_id, encode)
+    if shared is not None:
+        buffer, timestamp = shared
+        if camera_id not in camera_frames or time.time() - timestamp < settings.SHARED_FRAMES_MAX_AGE:
+            return buffer, timestamp
+    
+    if camera_id not in camera_frames:
+        raise HTTPException(status_code=404, detail="No hay frame disponible para esta cámara")
+    frame_data = camera_frames[camera_id]
+    return encode(frame_data['frame']), frame_data.get('timestamp')
+
 @router.get("/detect")
 async def detect_cameras(max_cameras: int = 10):
     """
@@ -85,16 +116,15 @@ async def get_camera_stream(camera_id: int):
     """
     Obtener frame actual de la cámara con detecciones
     """
-    if camera_id not in camera_frames:
-        raise HTTPException(status_code=404, detail="No hay frame disponible para esta cámara")
-    
-    frame_data = camera_frames[camera_id]
+    _register_viewer(camera_id)
     
     # Convertir frame a JPEG
-    _, buffer = cv2.imencode('.jpg', frame_data['frame'], [cv2.IMWRITE_JPEG_QUALITY, 85])
+    buffer, _ = _encode_latest_frame(
+        camera_id, lambda frame: cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tobytes()
+    )
     
     return StreamingResponse(
-        io.BytesIO(buffer.tobytes()),
+        io.BytesIO(buffer),
         media_type="image/jpeg"
     )
 
@@ -121,26 +151,39 @@ async def update_camera_frame_endpoint(camera_id: int, frame: UploadFile = File(
         logger.error(f"Error actualizando frame: {e}")
         return {"status": "error", "message": str(e)}
 
+@router.get("/viewers/{camera_id}")
+async def get_camera_viewers(camera_id: int):
+    """
+    Indicar si la cámara tiene visores activos (consultado por el detector)
+    """
+    last_seen = camera_viewers.get(camera_id)
+    idle = time.monotonic() - last_seen if last_seen is not None else None
+    return {
+        'camera_id': camera_id,
+        'has_viewers': idle is not None and idle < settings.CAMERA_VIEWER_TIMEOUT,
+        'idle_seconds': idle
+    }
+
 @router.get("/frame/{camera_id}")
 async def get_camera_frame(camera_id: int):
     """
     Obtener frame actual como base64 para mostrar en el frontend
     """
-    if camera_id not in camera_frames:
-        raise HTTPException(status_code=404, detail="No hay frame disponible para esta cámara")
-    
-    frame_data = camera_frames[camera_id]
-    frame = frame_data['frame']
+    # Registrar el visor antes de verificar el frame: el detector solo publica si hay visores
+    _register_viewer(camera_id)
     
-    # Convertir BGR a RGB para mostrar en navegador
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    def encode(frame: np.ndarray) -> bytes:
+        # Convertir BGR a RGB para mostrar en navegador
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        _, buffer = cv2.imencode('.jpg', frame_rgb, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        return buffer.tobytes()
     
     # Convertir a JPEG y luego a base64
-    _, buffer = cv2.imencode('.jpg', frame_rgb, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    buffer, timestamp = _encode_latest_frame(camera_id, encode)
     frame_base64 = base64.b64encode(buffer).decode('utf-8')
     
     return {
         'frame': f'data:image/jpeg;base64,{frame_base64}',
-        'timestamp': frame_data.get('timestamp'),
-        'fps': frame_data.get('fps', 0)
+        'timestamp': timestamp,
+        'fps': camera_frames.get(camera_id, {}).get('fps', 0)
     }
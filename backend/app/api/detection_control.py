@@ -7,6 +7,8 @@ import logging
 import sys
 import time
 
+from app.core.config import settings
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -20,6 +22,7 @@ class StartDetectionRequest(BaseModel):
     source: str
     display: bool = True  # Por defecto mostrar video
     model: Optional[str] = None
+    inference_backend: Optional[str] = None  # torch, onnx, openvino u onnx-int8
 
 
 @router.post("/start")
@@ -94,8 +97,15 @@ async def start_detection(request: StartDetectionRequest, background_tasks: Back
     if request.display:
         cmd.append("--display")
     
-    if request.model:
-        cmd.extend(["--model", request.model])
+    cmd.extend(["--model", request.model or settings.DETECTION_MODEL])
+    cmd.extend(["--inference-backend", request.inference_backend or settings.DETECTION_BACKEND])
+    cmd.extend(["--confidence", str(settings.DETECTION_CONFIDENCE)])
+    cmd.extend(["--min-hits", str(settings.TRACKING_MIN_HITS), "--max-age", str(settings.TRACKING_MAX_AGE)])
+    cmd.extend(["--track-high-thresh", str(settings.TRACKING_HIGH_THRESH),
+                "--track-low-thresh", str(settings.TRACKING_LOW_THRESH),
+                "--new-track-thresh", str(settings.TRACKING_NEW_TRACK_THRESH)])
+    if settings.TRACKING_REMOVE_UNCONFIRMED:
+        cmd.append("--remove-unconfirmed")
     
     try:
         # Iniciar proceso en background
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from datetime import datetime
 from app.db.database import get_db
 from app.models.models import Incident, Camera
 from app.schemas.schemas import (
-    IncidentCreate, IncidentResponse, IncidentFilter,
+    IncidentCreate, IncidentResponse, IncidentFilter, IncidentBulkCreate, IncidentBulkResult,
     CameraCreate, CameraResponse, CameraUpdate, CalibrationRequest
 )
 from app.services.incident_service import IncidentService
@@ -24,7 +25,27 @@ async def create_incident(
 ):
     """Crear un nuevo incidente"""
     service = IncidentService(db)
-    return service.create_incident(incident)
+    try:
+        return service.create_incident(incident)
+    except IntegrityError as e:
+        # Incidente inválido (p. ej. camera_id inexistente): reintentarlo no sirve
+        raise HTTPException(status_code=422, detail=f"Incidente rechazado por la base de datos: {e.orig}")
+
+
+@router.post("/bulk", response_model=IncidentBulkResult)
+async def create_incidents_bulk(
+    payload: IncidentBulkCreate,
+    db: Session = Depends(get_db)
+):
+    """Crear varios incidentes en una transacción (idempotente por idempotency_key)"""
+    service = IncidentService(db)
+    created, duplicates, rejected = service.create_incidents_bulk(payload.incidents)
+    return IncidentBulkResult(
+        created=len(created),
+        duplicates=duplicates,
+        ids=[incident.id for incident in created],
+        rejected=rejected
+    )
 
 
 @router.get("/", response_model=List[IncidentResponse])
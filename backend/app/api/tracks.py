@@ -0,0 +1,80 @@
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.services.track_stream import decode_track_message, track_hub, tracks_to_json
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.websocket("/ingest")
+async def ingest_tracks(websocket: WebSocket):
+    """
+    Recibir del detector los tracks de cada frame (mensajes binarios)
+
+    Un mismo detector puede enviar varias cámaras por la misma conexión.
+    """
+    await websocket.accept()
+    logger.info("Detector conectado al stream de tracks")
+    invalid = 0
+    try:
+        while True:
+            message = await websocket.receive_bytes()
+            try:
+                track_hub.publish(message)
+            except ValueError as e:
+                invalid += 1
+                if invalid == 1 or invalid % 100 == 0:
+                    logger.warning(f"Mensaje de tracks inválido ({invalid}): {e}")
+    except WebSocketDisconnect:
+        logger.info("Detector desconectado del stream de tracks")
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    """Esperar a que el cliente cierre la conexión (los mensajes que envíe se ignoran)"""
+    while True:
+        message = await websocket.receive()
+        if message['type'] == 'websocket.disconnect':
+            return
+
+
+@router.websocket("/{camera_id}/stream")
+async def stream_tracks(websocket: WebSocket, camera_id: int):
+    """Reenviar en vivo los mensajes binarios de tracks de una cámara"""
+    await websocket.accept()
+    queue = track_hub.subscribe(camera_id)
+    # Escuchar el cierre en paralelo: sin tracks de la cámara, send_bytes nunca fallaría
+    # y la suscripción de un cliente desconectado quedaría para siempre en el hub
+    disconnected = asyncio.create_task(_wait_for_disconnect(websocket))
+    next_message = asyncio.ensure_future(queue.get())
+    try:
+        while True:
+            done, _ = await asyncio.wait({next_message, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                break
+            await websocket.send_bytes(next_message.result())
+            next_message = asyncio.ensure_future(queue.get())
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        next_message.cancel()
+        disconnected.cancel()
+        track_hub.unsubscribe(camera_id, queue)
+
+
+@router.get("/stats")
+async def get_track_stream_stats():
+    """Obtener estadísticas del stream de tracks"""
+    return track_hub.get_stats()
+
+
+@router.get("/{camera_id}/latest")
+async def get_latest_tracks(camera_id: int):
+    """Obtener los tracks del último frame de la cámara en JSON"""
+    message = track_hub.get_latest(camera_id, settings.TRACK_STREAM_MAX_AGE)
+    if message is None:
+        raise HTTPException(status_code=404, detail="No hay tracks recientes para esta cámara")
+    return tracks_to_json(*decode_track_message(message))
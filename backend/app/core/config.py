@@ -32,10 +32,15 @@ class Settings(BaseSettings):
     
     # Detection
     DETECTION_MODEL: str = "yolov8n.pt"
-    DETECTION_CONFIDENCE: float = 0.25
+    DETECTION_BACKEND: str = "torch"  # torch, onnx, openvino u onnx-int8 (CPU sin GPU: el modelo se exporta y cachea)
+    DETECTION_CONFIDENCE: float = 0.25  # Bajarla a TRACKING_LOW_THRESH para que el tracker use las detecciones de baja confianza
     DETECTION_IOU_THRESHOLD: float = 0.45
     TRACKING_MIN_HITS: int = 3
     TRACKING_MAX_AGE: int = 30
+    TRACKING_HIGH_THRESH: float = 0.5  # Primera asociación y detecciones que pueden crear tracks
+    TRACKING_LOW_THRESH: float = 0.1  # Segunda asociación (vehículos ocluidos), solo mantiene tracks
+    TRACKING_NEW_TRACK_THRESH: float = 0.6
+    TRACKING_REMOVE_UNCONFIRMED: bool = False  # Eliminar al primer frame perdido los tracks vistos una sola vez
     
     # Speed
     SPEED_FPS: int = 10
@@ -45,6 +50,10 @@ class Settings(BaseSettings):
     # Camera
     CAMERA_RTSP_TIMEOUT: int = 5
     CAMERA_MAX_RETRIES: int = 3
+    CAMERA_VIEWER_TIMEOUT: float = 5.0  # Segundos sin pedir frames para dar por cerrado un visor
+    SHARED_FRAMES_DIR: str = "/dev/shm/voi_frames"  # Frames de detectores en el mismo host (--frame-transport shm)
+    SHARED_FRAMES_MAX_AGE: float = 5.0  # Antigüedad máxima para preferir el frame compartido al recibido por HTTP
+    TRACK_STREAM_MAX_AGE: float = 2.0  # Antigüedad máxima de los tracks que devuelve /api/tracks/{id}/latest
     
     # Development
     DEBUG: bool = True
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
@@ -32,3 +32,29 @@ def get_db():
     finally:
         db.close()
 
+
+
+def add_missing_columns():
+    """
+    Agregar a tablas existentes las columnas nuevas (nullable) de los modelos
+    
+    create_all() solo crea tablas que no existen; esto cubre las columnas opcionales
+    agregadas después sin necesidad de recrear la base de datos. También crea los
+    índices de esas columnas (p. ej. el único de idempotency_key): sin ellos la base
+    no garantiza la unicidad y dos envíos concurrentes podrían duplicar incidentes.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {col['name'] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+                for index in table.indexes:
+                    if column.name in index.columns:
+                        index.create(bind=conn, checkfirst=True)
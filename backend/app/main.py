@@ -3,8 +3,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 import uvicorn
-from app.api import incidents, cameras, events, evidence, camera_detection, detection_control
-from app.db.database import engine, Base
+from app.api import incidents, cameras, events, evidence, camera_detection, detection_control, tracks
+from app.db.database import engine, Base, add_missing_columns
 from app.core.config import settings
 import logging
 
@@ -17,6 +17,7 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Inicializando base de datos...")
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
     logger.info("Base de datos inicializada")
     yield
     # Shutdown
@@ -45,6 +46,7 @@ app.include_router(cameras.router, prefix="/api/cameras", tags=["cameras"])
 app.include_router(events.router, prefix="/api/events", tags=["events"])
 app.include_router(camera_detection.router, prefix="/api/camera-detection", tags=["camera-detection"])
 app.include_router(detection_control.router, prefix="/api/detection", tags=["detection"])
+app.include_router(tracks.router, prefix="/api/tracks", tags=["tracks"])
 
 
 @app.get("/")
@@ -14,10 +14,12 @@ class Camera(Base):
     latitude = Column(Float)
     longitude = Column(Float)
     rtsp_url = Column(String(500))
+    detection_url = Column(String(500))  # Substream de baja resolución para detección (opcional)
     web_url = Column(String(500))
     is_active = Column(Boolean, default=True)
     calibration_matrix = Column(JSON)  # Matriz de homografía para velocidad
     calibration_points = Column(JSON)  # Puntos de calibración
+    roi_points = Column(JSON)  # Polígono de la región de interés [[x, y], ...] en píxeles nativos
     speed_limit = Column(Float)  # Límite de velocidad en km/h
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -43,6 +45,7 @@ class Incident(Base):
     clip_path = Column(String(500))  # Ruta al clip de video
     extra_data = Column(JSON)  # Metadatos adicionales
     status = Column(String(20), default="pending")  # pending, reviewed, approved, rejected
+    idempotency_key = Column(String(64), unique=True, index=True)  # Clave del detector para reintentos sin duplicados
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     camera = relationship("Camera", back_populates="incidents")
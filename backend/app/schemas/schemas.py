@@ -9,9 +9,11 @@ class CameraBase(BaseModel):
     latitude: Optional[float] = None
     longitude: Optional[float] = None
     rtsp_url: Optional[str] = None
+    detection_url: Optional[str] = None
     web_url: Optional[str] = None
     is_active: bool = True
     speed_limit: Optional[float] = None
+    roi_points: Optional[List[List[float]]] = None
 
 
 class CameraCreate(CameraBase):
@@ -24,11 +26,13 @@ class CameraUpdate(BaseModel):
     latitude: Optional[float] = None
     longitude: Optional[float] = None
     rtsp_url: Optional[str] = None
+    detection_url: Optional[str] = None
     web_url: Optional[str] = None
     is_active: Optional[bool] = None
     speed_limit: Optional[float] = None
     calibration_matrix: Optional[List[List[float]]] = None
     calibration_points: Optional[Dict[str, Any]] = None
+    roi_points: Optional[List[List[float]]] = None
 
 
 class CameraResponse(CameraBase):
@@ -58,6 +62,18 @@ class IncidentBase(BaseModel):
 class IncidentCreate(IncidentBase):
     frame_path: Optional[str] = None
     clip_path: Optional[str] = None
+    idempotency_key: Optional[str] = Field(None, max_length=64)
+
+
+class IncidentBulkCreate(BaseModel):
+    incidents: List[IncidentCreate] = Field(..., max_length=500)
+
+
+class IncidentBulkResult(BaseModel):
+    created: int
+    duplicates: int
+    ids: List[int]
+    rejected: List[int] = []  # Índices del lote que la base rechazó (reintentar no sirve)
 
 
 class IncidentResponse(IncidentBase):
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
-from typing import List, Optional
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional, Tuple
 from datetime import datetime
 from app.models.models import Incident
 from app.schemas.schemas import IncidentCreate, IncidentFilter
@@ -14,13 +15,96 @@ class IncidentService:
         self.db = db
     
     def create_incident(self, incident_data: IncidentCreate) -> Incident:
-        """Crear un nuevo incidente"""
+        """Crear un nuevo incidente (si la idempotency_key ya existe, retorna el existente)"""
+        incident, _ = self._get_or_create(incident_data)
+        return incident
+    
+    def _get_or_create(self, incident_data: IncidentCreate) -> Tuple[Incident, bool]:
+        """Crear un incidente salvo que su idempotency_key ya exista. Retorna (incidente, creado)"""
+        if incident_data.idempotency_key:
+            existing = self.get_incident_by_key(incident_data.idempotency_key)
+            if existing:
+                return existing, False
+        
         incident = Incident(**incident_data.model_dump())
         self.db.add(incident)
-        self.db.commit()
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # Otro request con la misma clave ganó la carrera
+            self.db.rollback()
+            existing = self.get_incident_by_key(incident_data.idempotency_key) if incident_data.idempotency_key else None
+            if existing is None:
+                raise
+            return existing, False
         self.db.refresh(incident)
         logger.info(f"Incidente creado: {incident.id}")
-        return incident
+        return incident, True
+    
+    def create_incidents_bulk(self, incidents_data: List[IncidentCreate]) -> Tuple[List[Incident], int, List[int]]:
+        """
+        Crear varios incidentes en una sola transacción, ignorando claves ya registradas
+        
+        Si el lote viola alguna restricción se inserta de a uno: los incidentes que
+        la base rechaza (p. ej. camera_id inexistente) se informan aparte para que
+        no bloqueen la entrega del resto.
+        
+        Returns:
+            Tupla (incidentes creados, cantidad de duplicados ignorados, índices rechazados)
+        """
+        keys = [data.idempotency_key for data in incidents_data if data.idempotency_key]
+        existing_keys = set()
+        if keys:
+            rows = self.db.query(Incident.idempotency_key).filter(Incident.idempotency_key.in_(keys)).all()
+            existing_keys = {row[0] for row in rows}
+        
+        created = []
+        seen = set(existing_keys)
+        for data in incidents_data:
+            if data.idempotency_key:
+                if data.idempotency_key in seen:
+                    continue
+                seen.add(data.idempotency_key)
+            created.append(Incident(**data.model_dump()))
+        
+        self.db.add_all(created)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # Carrera con un envío concurrente o un incidente inválido: resolver de a uno
+            self.db.rollback()
+            return self._create_one_by_one(incidents_data, existing_keys)
+        
+        if created:
+            logger.info(f"Incidentes creados en lote: {len(created)}")
+        return created, len(incidents_data) - len(created), []
+    
+    def _create_one_by_one(self, incidents_data: List[IncidentCreate],
+                           existing_keys: set) -> Tuple[List[Incident], int, List[int]]:
+        """Insertar un lote de a un incidente, separando los que la base rechaza"""
+        created = []
+        duplicates = 0
+        rejected = []
+        for index, data in enumerate(incidents_data):
+            if data.idempotency_key in existing_keys:
+                duplicates += 1
+                continue
+            try:
+                incident, is_new = self._get_or_create(data)
+            except IntegrityError as e:
+                logger.warning(f"Incidente rechazado por la base de datos: {e.orig}")
+                rejected.append(index)
+                continue
+            # Clave repetida en el lote o registrada por un envío concurrente
+            if is_new:
+                created.append(incident)
+            else:
+                duplicates += 1
+        return created, duplicates, rejected
+    
+    def get_incident_by_key(self, idempotency_key: str) -> Optional[Incident]:
+        """Obtener incidente por su clave de idempotencia"""
+        return self.db.query(Incident).filter(Incident.idempotency_key == idempotency_key).first()
     
     def get_incident_by_id(self, incident_id: int) -> Optional[Incident]:
         """Obtener incidente por ID"""
@@ -0,0 +1,139 @@
+import mmap
+import os
+import logging
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Formato escrito por el detector (detector/utils/shm_transport.py)
+MAGIC = b'VOIF'
+VERSION = 1
+HEADER_DTYPE = np.dtype({
+    'names': ['magic', 'version', 'num_slots', 'slot_capacity', 'write_seq'],
+    'formats': ['S4', '<u4', '<u4', '<u8', '<u8'],
+    'offsets': [0, 4, 8, 16, 24],
+    'itemsize': 64
+})
+SLOT_DTYPE = np.dtype({
+    'names': ['seq', 'timestamp', 'width', 'height', 'channels', 'nbytes'],
+    'formats': ['<u8', '<f8', '<u4', '<u4', '<u4', '<u8'],
+    'offsets': [0, 8, 16, 20, 24, 32],
+    'itemsize': 64
+})
+
+
+class SharedFrameReader:
+    """Lector del ring buffer de frames que escribe un detector en el mismo host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mmap: Optional[mmap.mmap] = None
+        self._inode: Optional[int] = None
+        self._header = None
+        self._slots = None
+        self._data_offset = 0
+
+    def _ensure_open(self) -> bool:
+        """Abrir (o reabrir si el detector recreó el archivo) el buffer compartido"""
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            self._close()
+            return False
+        if self._mmap is not None and inode == self._inode:
+            return True
+
+        self._close()
+        try:
+            with open(self.path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudo abrir el buffer compartido {self.path}: {e}")
+            return False
+
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self._mmap, offset=0)
+        if header['magic'] != MAGIC or header['version'] != VERSION:
+            logger.warning(f"Buffer compartido con formato desconocido: {self.path}")
+            self._close()
+            return False
+
+        self._inode = inode
+        self._header = header
+        num_slots = int(header['num_slots'])
+        self._slots = np.ndarray((num_slots,), dtype=SLOT_DTYPE, buffer=self._mmap,
+                                 offset=HEADER_DTYPE.itemsize)
+        self._data_offset = HEADER_DTYPE.itemsize + SLOT_DTYPE.itemsize * num_slots
+        return True
+
+    def read(self, consumer: Callable[[np.ndarray], T], retries: int = 3) -> Optional[Tuple[T, float]]:
+        """
+        Procesar el frame más reciente directamente sobre la memoria compartida
+
+        El frame se entrega como vista (sin copia) y solo es válido dentro de
+        `consumer`; si el detector lo sobrescribe mientras tanto, se reintenta.
+
+        Args:
+            consumer: Función que recibe el frame BGR y retorna el resultado (p. ej. el JPEG)
+            retries: Reintentos ante una escritura concurrente
+
+        Returns:
+            Tupla (resultado de consumer, timestamp del frame) o None si no hay frame
+        """
+        if not self._ensure_open():
+            return None
+
+        num_slots = len(self._slots)
+        capacity = int(self._header['slot_capacity'])
+        for _ in range(retries):
+            write_seq = int(self._header['write_seq'])
+            if write_seq == 0:
+                return None
+            index = (write_seq - 1) % num_slots
+            slot = self._slots[index]
+            seq = int(slot['seq'])
+            if seq != 2 * write_seq:
+                continue  # Slot en escritura o ya reutilizado
+
+            shape = (int(slot['height']), int(slot['width']), int(slot['channels']))
+            timestamp = float(slot['timestamp'])
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=self._mmap,
+                               offset=self._data_offset + index * capacity)
+            result = consumer(frame)
+            if int(slot['seq']) == seq:
+                return result, timestamp
+        return None
+
+    def _close(self):
+        self._header = None
+        self._slots = None
+        self._inode = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Quedan vistas vivas: el mapeo se libera cuando se recolecten
+                pass
+            self._mmap = None
+
+
+_readers: Dict[int, SharedFrameReader] = {}
+
+
+def read_shared_frame(camera_id: int, consumer: Callable[[np.ndarray], T]) -> Optional[Tuple[T, float]]:
+    """
+    Leer el último frame de la cámara desde memoria compartida, si el detector la usa
+
+    Returns:
+        Tupla (resultado de consumer, timestamp epoch del frame) o None
+    """
+    reader = _readers.get(camera_id)
+    if reader is None:
+        reader = SharedFrameReader(os.path.join(settings.SHARED_FRAMES_DIR, f'camera_{camera_id}.bin'))
+        _readers[camera_id] = reader
+    return reader.read(consumer)
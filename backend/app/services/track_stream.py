@@ -0,0 +1,127 @@
+import asyncio
+import struct
+import time
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Formato enviado por el detector (detector/utils/track_stream.py)
+MAGIC = b'VOIT'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIdI')
+TRACK_DTYPE = np.dtype([
+    ('track_id', '<u4'),
+    ('class_id', '<u2'),
+    ('flags', '<u2'),
+    ('bbox', '<f4', (4,)),
+    ('confidence', '<f4'),
+    ('speed_kmh', '<f4'),
+])
+FLAG_SPEED_VALID = 1
+FLAG_OVER_LIMIT = 2
+
+
+def decode_track_message(message: bytes) -> Tuple[int, float, np.ndarray]:
+    """
+    Decodificar un mensaje del stream de tracks
+
+    Returns:
+        Tupla (camera_id, timestamp, registros TRACK_DTYPE)
+
+    Raises:
+        ValueError: Si el mensaje no tiene el formato esperado
+    """
+    if len(message) < HEADER.size:
+        raise ValueError("Mensaje de tracks truncado")
+    magic, version, _, camera_id, timestamp, count = HEADER.unpack_from(message)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Mensaje de tracks con formato desconocido")
+    if len(message) != HEADER.size + count * TRACK_DTYPE.itemsize:
+        raise ValueError("Tamaño de mensaje de tracks inválido")
+    tracks = np.frombuffer(message, dtype=TRACK_DTYPE, count=count, offset=HEADER.size)
+    return camera_id, timestamp, tracks
+
+
+def tracks_to_json(camera_id: int, timestamp: float, tracks: np.ndarray) -> Dict[str, Any]:
+    """Convertir un mensaje decodificado a JSON (para clientes sin soporte binario)"""
+    return {
+        'camera_id': camera_id,
+        'timestamp': timestamp,
+        'tracks': [
+            {
+                'track_id': int(track['track_id']),
+                'class_id': int(track['class_id']),
+                'bbox': [float(v) for v in track['bbox']],
+                'confidence': float(track['confidence']),
+                'speed_kmh': float(track['speed_kmh']) if track['flags'] & FLAG_SPEED_VALID else None,
+                'over_limit': bool(track['flags'] & FLAG_OVER_LIMIT)
+            }
+            for track in tracks
+        ]
+    }
+
+
+class TrackHub:
+    """Último mensaje de tracks por cámara y reenvío a los suscriptores"""
+
+    def __init__(self, queue_size: int = 32):
+        self.queue_size = queue_size
+        self.latest: Dict[int, Tuple[bytes, float]] = {}
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+
+        self.received = 0
+        self.dropped = 0
+
+    def publish(self, message: bytes) -> int:
+        """
+        Registrar un mensaje del detector y encolarlo para los suscriptores de su cámara
+
+        Returns:
+            ID de la cámara del mensaje
+
+        Raises:
+            ValueError: Si el mensaje no tiene el formato esperado
+        """
+        camera_id, _, _ = decode_track_message(message)
+        self.latest[camera_id] = (message, time.monotonic())
+        self.received += 1
+        for queue in self._subscribers.get(camera_id, ()):
+            # Suscriptor lento: descartar el mensaje más viejo, nunca frenar la ingesta
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(message)
+        return camera_id
+
+    def get_latest(self, camera_id: int, max_age: float) -> Optional[bytes]:
+        """Último mensaje de la cámara, si tiene menos de max_age segundos"""
+        entry = self.latest.get(camera_id)
+        if entry is None or time.monotonic() - entry[1] > max_age:
+            return None
+        return entry[0]
+
+    def subscribe(self, camera_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(camera_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, camera_id: int, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(camera_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[camera_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'received': self.received,
+            'dropped': self.dropped,
+            'cameras': sorted(self.latest),
+            'subscribers': sum(len(s) for s in self._subscribers.values())
+        }
+
+
+track_hub = TrackHub()
@@ -1,11 +1,12 @@
 # Script de inicialización de la base de datos
 # Este script crea las tablas necesarias
 
-from app.db.database import engine, Base
+from app.db.database import engine, Base, add_missing_columns
 from app.models.models import Camera, Incident, Evidence
 
 if __name__ == "__main__":
     print("Creando tablas de base de datos...")
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
     print("Tablas creadas exitosamente!")
 
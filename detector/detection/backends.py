@@ -0,0 +1,130 @@
+import hashlib
+import importlib.util
+import os
+import shutil
+import logging
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Backend -> (formato de export de ultralytics, sufijo del artefacto, módulo de runtime)
+BACKENDS = {
+    'torch': (None, '.pt', 'torch'),
+    'onnx': ('onnx', '.onnx', 'onnxruntime'),
+    'openvino': ('openvino', '_openvino_model', 'openvino'),
+    # Generado por tools/quantize_model.py (requiere frames de calibración, no se exporta al vuelo)
+    'onnx-int8': (None, '-int8.onnx', 'onnxruntime'),
+}
+
+
+def default_cache_dir() -> str:
+    """Directorio por defecto de los modelos exportados"""
+    return os.path.join(os.path.expanduser('~'), '.cache', 'voi_models')
+
+
+def model_hash(model_path: str) -> str:
+    """Hash (sha256, 12 caracteres) del archivo de pesos: cambia si se reentrena el modelo"""
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def is_exported(model_path: str) -> bool:
+    """Indicar si la ruta ya es un modelo exportado (ONNX u OpenVINO IR)"""
+    name = Path(model_path).name
+    return name.endswith('.onnx') or name.endswith('_openvino_model')
+
+
+def fixed_batch_size(model_path: str) -> Optional[int]:
+    """
+    Tamaño de batch fijo de un modelo exportado
+
+    Los artefactos de resolve_model se exportan con batch dinámico, pero un .onnx
+    o IR de OpenVINO exportado por fuera puede aceptar solo lotes de tamaño fijo.
+
+    Returns:
+        Tamaño de batch que exige el modelo, o None si acepta cualquiera (o es .pt)
+    """
+    if not is_exported(model_path):
+        return None
+    if model_path.endswith('.onnx'):
+        import onnxruntime as ort
+        session = ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+        batch = session.get_inputs()[0].shape[0]
+        return batch if isinstance(batch, int) and batch > 0 else None
+
+    import openvino as ov
+    xml_path = next(Path(model_path).glob('*.xml'))
+    batch = ov.Core().read_model(str(xml_path)).inputs[0].get_partial_shape()[0]
+    return batch.get_length() if batch.is_static else None
+
+
+def artifact_path(model_path: str, backend: str, imgsz: int, cache_dir: Optional[str] = None) -> str:
+    """Ruta en la cache del modelo exportado para un .pt, backend e imgsz"""
+    suffix = BACKENDS[backend][1]
+    return os.path.join(cache_dir or default_cache_dir(),
+                        f"{Path(model_path).stem}-{model_hash(model_path)}-{imgsz}{suffix}")
+
+
+def resolve_model(model_path: str, backend: str = 'torch', imgsz: int = 640,
+                  cache_dir: Optional[str] = None) -> str:
+    """
+    Obtener el modelo a cargar para un backend, exportándolo y cacheándolo si hace falta
+
+    El artefacto exportado se guarda como `<modelo>-<hash>-<imgsz><sufijo>` en el
+    directorio de cache, así un mismo .pt se exporta una sola vez por tamaño de entrada
+    y un modelo reentrenado genera un artefacto nuevo.
+
+    Args:
+        model_path: Ruta al modelo YOLO (.pt) o a un modelo ya exportado
+        backend: 'torch', 'onnx', 'openvino' u 'onnx-int8' (cuantizado previamente)
+        imgsz: Lado de la imagen de entrada
+        cache_dir: Directorio de cache (por defecto ~/.cache/voi_models)
+
+    Returns:
+        Ruta al modelo que recibe YOLO()
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de inferencia desconocido: {backend}")
+    export_format, _, runtime = BACKENDS[backend]
+    if importlib.util.find_spec(runtime) is None:
+        raise RuntimeError(f"El backend '{backend}' necesita el paquete {runtime}")
+    if is_exported(model_path) or backend == 'torch':
+        return model_path
+
+    from ultralytics import YOLO
+    model = None
+    if not os.path.exists(model_path):
+        # Nombre de un modelo oficial (p. ej. yolov8n.pt): ultralytics lo descarga al cargarlo
+        model = YOLO(model_path)
+        model_path = str(model.ckpt_path)
+
+    cache_dir = cache_dir or default_cache_dir()
+    target = artifact_path(model_path, backend, imgsz, cache_dir)
+    if os.path.exists(target):
+        logger.info(f"Modelo {backend} en cache: {target}")
+        return target
+    if export_format is None:
+        raise RuntimeError(f"No existe el modelo cuantizado {target}: generarlo con tools/quantize_model.py")
+
+    logger.info(f"Exportando {model_path} a {backend} (imgsz={imgsz})...")
+    model = model or YOLO(model_path)
+    # dynamic: lotes de tamaño variable (detect_batch) con el mismo artefacto
+    exported = model.export(format=export_format, imgsz=imgsz, dynamic=True, verbose=False)
+
+    # El export se escribe junto al .pt: moverlo a la cache con un rename atómico
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_target = f"{target}.{os.getpid()}.tmp"
+    shutil.move(str(exported), tmp_target)
+    if not os.path.exists(target):
+        os.replace(tmp_target, target)
+    elif os.path.isdir(tmp_target):
+        # Otro proceso exportó el mismo modelo mientras tanto
+        shutil.rmtree(tmp_target, ignore_errors=True)
+    else:
+        os.remove(tmp_target)
+    logger.info(f"Modelo {backend} guardado en cache: {target}")
+    return target
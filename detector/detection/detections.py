@@ -0,0 +1,99 @@
+import numpy as np
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Detections:
+    """
+    Detecciones (o tracks) de un frame en arrays contiguos
+
+    Columnas:
+        boxes: (N, 4) float32 [x1, y1, x2, y2]
+        scores: (N,) float32
+        class_ids: (N,) int32
+        track_ids, hits, ages: (N,) int64, solo en los tracks que retorna ByteTracker
+
+    Indexar con un entero o iterar produce dicts con el formato de siempre
+    ('bbox', 'confidence', 'class_id', 'class_name', ...) para el código que
+    trabaja por objeto; indexar con una máscara, slice o array de índices
+    produce otro Detections sin pasar por dicts.
+    """
+
+    __slots__ = ('boxes', 'scores', 'class_ids', 'track_ids', 'hits', 'ages', 'class_names')
+
+    def __init__(self, boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray,
+                 class_names: Optional[Mapping[int, str]] = None,
+                 track_ids: Optional[np.ndarray] = None,
+                 hits: Optional[np.ndarray] = None,
+                 ages: Optional[np.ndarray] = None):
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        self.class_ids = np.asarray(class_ids, dtype=np.int32).reshape(-1)
+        self.track_ids = None if track_ids is None else np.asarray(track_ids, dtype=np.int64).reshape(-1)
+        self.hits = None if hits is None else np.asarray(hits, dtype=np.int64).reshape(-1)
+        self.ages = None if ages is None else np.asarray(ages, dtype=np.int64).reshape(-1)
+        self.class_names = class_names if class_names is not None else {}
+
+    @classmethod
+    def empty(cls, class_names: Optional[Mapping[int, str]] = None) -> 'Detections':
+        """Detecciones vacías (frame sin inferencia o sin objetos)"""
+        return cls(np.empty((0, 4)), np.empty(0), np.empty(0), class_names)
+
+    @classmethod
+    def from_list(cls, detections: Union['Detections', List[Dict[str, Any]]]) -> 'Detections':
+        """Convertir una lista de dicts de detección (formato anterior) a columnas"""
+        if isinstance(detections, Detections):
+            return detections
+        if len(detections) == 0:
+            return cls.empty()
+        return cls(
+            [d['bbox'] for d in detections],
+            [d['confidence'] for d in detections],
+            [d['class_id'] for d in detections],
+            {d['class_id']: d['class_name'] for d in detections if 'class_name' in d}
+        )
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def __bool__(self) -> bool:
+        return len(self.scores) > 0
+
+    def class_name(self, index: int) -> str:
+        class_id = int(self.class_ids[index])
+        return self.class_names.get(class_id, str(class_id))
+
+    def __getitem__(self, index) -> Union[Dict[str, Any], 'Detections']:
+        if isinstance(index, (int, np.integer)):
+            item = {
+                'bbox': self.boxes[index].tolist(),
+                'confidence': float(self.scores[index]),
+                'class_id': int(self.class_ids[index]),
+                'class_name': self.class_name(index)
+            }
+            if self.track_ids is not None:
+                item['track_id'] = int(self.track_ids[index])
+            if self.hits is not None:
+                item['hits'] = int(self.hits[index])
+            if self.ages is not None:
+                item['age'] = int(self.ages[index])
+            return item
+        return Detections(
+            self.boxes[index], self.scores[index], self.class_ids[index], self.class_names,
+            None if self.track_ids is None else self.track_ids[index],
+            None if self.hits is None else self.hits[index],
+            None if self.ages is None else self.ages[index]
+        )
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Convertir a lista de dicts (para serializar o para código por objeto)"""
+        return list(self)
+
+    def __repr__(self) -> str:
+        return f"Detections(n={len(self)}, tracks={self.track_ids is not None})"
@@ -1,31 +1,86 @@
 from ultralytics import YOLO
 import cv2
 import numpy as np
-from typing import List, Tuple, Dict, Any
+from typing import List, Optional, Tuple, Dict, Any
 import torch
 import logging
 
+from detector.detection.detections import Detections
+from detector.detection.backends import fixed_batch_size, is_exported, resolve_model
+
 logger = logging.getLogger(__name__)
 
 
+def letterbox_into(frame: np.ndarray, slot: np.ndarray) -> Tuple[float, int, int, int, int]:
+    """
+    Escalar el frame manteniendo la proporción y centrarlo con relleno en `slot`
+    
+    Args:
+        frame: Frame BGR de cualquier tamaño
+        slot: Destino (size, size, 3) uint8, p. ej. una posición del buffer del batch
+        
+    Returns:
+        Tupla (escala, pad_x, pad_y, ancho, alto) para llevar los boxes al frame original
+    """
+    size = slot.shape[0]
+    height, width = frame.shape[:2]
+    ratio = min(size / height, size / width)
+    new_w, new_h = max(1, round(width * ratio)), max(1, round(height * ratio))
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    
+    # Rellenar solo las bandas fuera de la imagen (gris 114, como ultralytics)
+    slot[:pad_y] = 114
+    slot[pad_y + new_h:] = 114
+    slot[pad_y:pad_y + new_h, :pad_x] = 114
+    slot[pad_y:pad_y + new_h, pad_x + new_w:] = 114
+    
+    region = slot[pad_y:pad_y + new_h, pad_x:pad_x + new_w]
+    if (new_w, new_h) == (width, height):
+        np.copyto(region, frame)
+    else:
+        cv2.resize(frame, (new_w, new_h), dst=region, interpolation=cv2.INTER_LINEAR)
+    return ratio, pad_x, pad_y, width, height
+
+
 class YOLODetector:
     """Detector de objetos usando YOLOv8"""
     
-    def __init__(self, model_path: str = "yolov8n.pt", confidence: float = 0.25, iou_threshold: float = 0.45):
+    def __init__(self, model_path: str = "yolov8n.pt", confidence: float = 0.25, iou_threshold: float = 0.45,
+                 imgsz: int = 640, backend: str = 'torch', cache_dir: Optional[str] = None):
         """
         Inicializar detector YOLO
         
         Args:
-            model_path: Ruta al modelo YOLO (.pt)
+            model_path: Ruta al modelo YOLO (.pt) o a un modelo ya exportado (.onnx, *_openvino_model)
             confidence: Umbral de confianza mínimo
             iou_threshold: Umbral IoU para NMS
+            imgsz: Lado de la imagen cuadrada de entrada (múltiplo de 32)
+            backend: Runtime de inferencia: 'torch', 'onnx' u 'openvino' (CPU, sin GPU)
+            cache_dir: Directorio de cache de los modelos exportados
         """
-        self.model = YOLO(model_path)
         self.confidence = confidence
         self.iou_threshold = iou_threshold
+        self.imgsz = max(32, int(round(imgsz / 32)) * 32)
+        # Buffer (N, imgsz, imgsz, 3) reutilizado entre batches; crece si llega un batch mayor
+        self._batch_buffer: Optional[np.ndarray] = None
+        
+        # Con onnx/openvino el .pt se exporta una vez (cacheado por hash e imgsz) y ultralytics
+        # lo ejecuta con el runtime correspondiente, con el mismo formato de resultados
+        self.model_path = resolve_model(model_path, backend, self.imgsz, cache_dir)
+        self.backend = backend
+        self.model = YOLO(self.model_path, task='detect')
+        self.device = self.model.device or torch.device('cpu')
+        # Modelos exportados con batch estático: los lotes se dividen (y completan) a ese tamaño
+        self.batch_size = fixed_batch_size(self.model_path)
+        if self.batch_size is not None:
+            logger.info(f"Modelo con batch fijo de {self.batch_size}: los lotes se procesan en tramos de ese tamaño")
+        if is_exported(self.model_path):
+            # Los modelos exportados cargan el runtime (y los nombres de clase) en la primera inferencia
+            self.model.predict(np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8),
+                               imgsz=self.imgsz, verbose=False)
         
         # Clases de interés para detección de tráfico
-        self.class_names = self.model.names
+        self.class_names = self.model.names or self.model.predictor.model.names
         self.vehicle_classes = {
             'car': 2,
             'motorcycle': 3,
@@ -33,11 +88,17 @@ class YOLODetector:
             'truck': 7,
             'person': 0
         }
+        # IDs de las clases que se conservan (filtro vectorizado con np.isin)
+        keep_names = {'person', 'bicycle'}
+        self.keep_class_ids = np.array(sorted(
+            set(self.vehicle_classes.values()) |
+            {class_id for class_id, name in self.class_names.items() if name in keep_names}
+        ), dtype=np.int32)
         
-        logger.info(f"Detector YOLO inicializado con modelo: {model_path}")
-        logger.info(f"Dispositivo: {self.model.device}")
+        logger.info(f"Detector YOLO inicializado con modelo: {self.model_path} (backend {backend})")
+        logger.info(f"Dispositivo: {self.device}")
     
-    def detect(self, frame: np.ndarray) -> List[Dict[str, Any]]:
+    def detect(self, frame: np.ndarray) -> Detections:
         """
         Detectar objetos en un frame
         
@@ -45,43 +106,106 @@ class YOLODetector:
             frame: Frame de video (BGR)
             
         Returns:
-            Lista de detecciones con formato:
+            Detecciones en columnas (boxes, scores, class_ids); iterarlas produce
+            dicts con formato:
             {
                 'bbox': [x1, y1, x2, y2],
                 'confidence': float,
                 'class_id': int,
                 'class_name': str
             }
+        
+        Usa el mismo preprocesamiento (letterbox cuadrado) que detect_batch: un frame
+        da los mismos boxes sin importar si entra solo, en el pipeline o en un batch.
         """
+        return self.detect_batch([frame])[0]
+    
+    def detect_batch(self, frames: List[np.ndarray]) -> List[Detections]:
+        """
+        Detectar objetos en varios frames con un solo forward del modelo
+        
+        Cada frame (de cualquier tamaño) se escala y centra con relleno (letterbox)
+        en un buffer preasignado; el batch entra al modelo como un único tensor y
+        los boxes se llevan de vuelta a las coordenadas de cada frame.
+        
+        Args:
+            frames: Lista de frames de video (BGR), pueden ser de distintas cámaras y tamaños
+            
+        Returns:
+            Lista de detecciones por frame, en el mismo orden que la entrada
+        """
+        if len(frames) == 0:
+            return []
+        if self.batch_size is not None and len(frames) != self.batch_size:
+            detections = []
+            for start in range(0, len(frames), self.batch_size):
+                detections.extend(self._detect_tensor_batch(frames[start:start + self.batch_size]))
+            return detections
+        return self._detect_tensor_batch(frames)
+    
+    def _detect_tensor_batch(self, frames: List[np.ndarray]) -> List[Detections]:
+        """Un forward con los frames (completados hasta el batch fijo del modelo, si tiene)"""
+        batch, transforms = self._letterbox_batch(frames, self.batch_size or len(frames))
+        # BGR uint8 NHWC -> RGB float NCHW en [0, 1], ya en el dispositivo del modelo
+        tensor = torch.from_numpy(batch).to(self.device)
+        tensor = tensor.flip(-1).permute(0, 3, 1, 2).float().div_(255.0)
+        
         results = self.model.predict(
-            frame,
+            tensor,
             conf=self.confidence,
             iou=self.iou_threshold,
             verbose=False,
-            device=self.model.device
+            device=self.device
         )
         
-        detections = []
-        if len(results) > 0 and results[0].boxes is not None:
-            boxes = results[0].boxes
-            
-            for i in range(len(boxes)):
-                box = boxes[i]
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                confidence = float(box.conf[0].cpu().numpy())
-                class_id = int(box.cls[0].cpu().numpy())
-                class_name = self.class_names[class_id]
-                
-                # Solo incluir clases de interés
-                if class_id in self.vehicle_classes.values() or class_name in ['person', 'bicycle']:
-                    detections.append({
-                        'bbox': [float(x1), float(y1), float(x2), float(y2)],
-                        'confidence': confidence,
-                        'class_id': class_id,
-                        'class_name': class_name
-                    })
-        
-        return detections
+        # zip descarta los resultados de las posiciones de relleno
+        return [self._parse_result(result, transform) for result, transform in zip(results, transforms)]
+    
+    def _letterbox_batch(self, frames: List[np.ndarray],
+                         batch_size: int) -> Tuple[np.ndarray, List[Tuple[float, int, int, int, int]]]:
+        """
+        Copiar los frames con letterbox al buffer del batch
+        
+        Args:
+            frames: Frames BGR
+            batch_size: Tamaño del batch (>= len(frames)); las posiciones sobrantes quedan en gris
+        
+        Returns:
+            Tupla (batch (batch_size, imgsz, imgsz, 3), lista de (escala, pad_x, pad_y, ancho, alto) por frame)
+        """
+        size = self.imgsz
+        if self._batch_buffer is None or len(self._batch_buffer) < batch_size:
+            self._batch_buffer = np.empty((batch_size, size, size, 3), dtype=np.uint8)
+        batch = self._batch_buffer[:batch_size]
+        
+        transforms = [letterbox_into(frame, slot) for slot, frame in zip(batch, frames)]
+        batch[len(frames):] = 114
+        return batch, transforms
+    
+    def _parse_result(self, result, letterbox: Optional[Tuple[float, int, int, int, int]] = None) -> Detections:
+        """
+        Convertir el resultado de YOLO de un frame a columnas (una sola copia a CPU)
+        
+        Args:
+            result: Resultado de predict para un frame
+            letterbox: (escala, pad_x, pad_y, ancho, alto) si el frame entró con letterbox propio
+        """
+        if result.boxes is None or len(result.boxes) == 0:
+            return Detections.empty(self.class_names)
+        
+        # (N, 6): x1, y1, x2, y2, confianza, clase
+        data = result.boxes.data.cpu().numpy()
+        class_ids = data[:, 5].astype(np.int32)
+        
+        # Solo incluir clases de interés
+        keep = np.isin(class_ids, self.keep_class_ids)
+        boxes = data[keep, :4]
+        if letterbox is not None:
+            ratio, pad_x, pad_y, width, height = letterbox
+            boxes = (boxes - np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float32)) / ratio
+            np.clip(boxes[:, 0::2], 0, width, out=boxes[:, 0::2])
+            np.clip(boxes[:, 1::2], 0, height, out=boxes[:, 1::2])
+        return Detections(boxes, data[keep, 4], class_ids[keep], self.class_names)
     
     def detect_helmet(self, frame: np.ndarray, person_bbox: List[float]) -> bool:
         """
@@ -5,6 +5,7 @@ import time
 import numpy as np
 from datetime import datetime
 from pathlib import Path
+from typing import Optional, Tuple
 import sys
 import os
 import requests
@@ -13,8 +14,22 @@ import requests
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from detector.detection.yolo_detector import YOLODetector
+from detector.detection.detections import Detections
 from detector.tracking.byte_tracker import ByteTracker
-from detector.speed.speed_calculator import SpeedCalculator
+from detector.speed.speed_calculator import SpeedCalculator, scale_homography
+from detector.speed.violation_tracker import Violation, ViolationTracker
+from detector.utils.threaded_capture import ThreadedCapture
+from detector.utils.ffmpeg_capture import FFmpegCapture
+from detector.utils.evidence_stream import EvidenceStream
+from detector.utils.pipeline import FramePipeline
+from detector.utils.rate_controller import AdaptiveRateController
+from detector.utils.motion_gate import MotionGate
+from detector.utils.roi import RegionOfInterest
+from detector.utils.viewer_monitor import ViewerMonitor
+from detector.utils.frame_publisher import FramePublisher
+from detector.utils.shm_transport import SharedFrameWriter
+from detector.utils.incident_sender import IncidentSender
+from detector.utils.track_stream import TrackStreamSender, encode_tracks
 
 logging.basicConfig(
     level=logging.INFO,
@@ -26,6 +41,82 @@ logger = logging.getLogger(__name__)
 class CameraStream:
     """Manejador de streams de cámaras externas"""
     
+    @staticmethod
+    def is_live_source(source: str) -> bool:
+        """Indicar si la fuente es en vivo (cámara/stream) y no un archivo"""
+        return (source.isdigit() or source.startswith('/dev/video') or
+                source.startswith(('rtsp://', 'http://', 'https://')))
+    
+    @staticmethod
+    def open_threaded(source: str, buffer_size: int = 2, timeout: int = 5, max_retries: int = 3,
+                      backend: str = 'opencv', width: Optional[int] = None, fps: Optional[float] = None,
+                      num_buffers: int = 8):
+        """
+        Abrir stream con captura en segundo plano y buffer del último frame
+        
+        Args:
+            source: Fuente de video (RTSP, HTTP, archivo, número de cámara)
+            buffer_size: Tamaño del buffer circular de frames
+            timeout: Timeout en segundos
+            max_retries: Número máximo de reintentos
+            backend: 'opencv' o 'ffmpeg' (ver open_ffmpeg)
+            width: Ancho de salida con backend ffmpeg
+            fps: FPS de salida con backend ffmpeg
+            num_buffers: Buffers preasignados con backend ffmpeg
+            
+        Returns:
+            ThreadedCapture iniciado o None si falla
+        """
+        cap = None
+        if backend == 'ffmpeg':
+            cap = CameraStream.open_ffmpeg(source, width=width, fps=fps, max_retries=max_retries,
+                                           num_buffers=num_buffers)
+        if cap is None:
+            cap = CameraStream.open_stream(source, timeout=timeout, max_retries=max_retries)
+        if cap is None:
+            return None
+        return ThreadedCapture(cap, buffer_size=buffer_size).start()
+    
+    @staticmethod
+    def open_ffmpeg(source: str, width: Optional[int] = None, fps: Optional[float] = None,
+                    max_retries: int = 3, num_buffers: int = 8):
+        """
+        Abrir fuente con un subproceso ffmpeg que escala y reduce FPS al decodificar
+        
+        Args:
+            source: Fuente de video (RTSP, HTTP o archivo)
+            width: Ancho de salida (mantiene relación de aspecto); None = nativo
+            fps: FPS de salida; None = nativo
+            max_retries: Número máximo de reintentos
+            num_buffers: Cantidad de buffers preasignados
+            
+        Returns:
+            FFmpegCapture o None si ffmpeg no está disponible o la fuente no es compatible
+        """
+        if source.isdigit() or source.startswith('/dev/video'):
+            logger.warning("Backend ffmpeg no soporta cámaras locales, usando OpenCV")
+            return None
+        if not FFmpegCapture.is_available():
+            logger.warning("ffmpeg/ffprobe no encontrados en el PATH, usando OpenCV")
+            return None
+        
+        for attempt in range(max_retries):
+            try:
+                cap = FFmpegCapture(source, width=width, fps=fps, num_buffers=num_buffers)
+                if cap.grab():
+                    logger.info(f"Stream ffmpeg abierto exitosamente en intento {attempt + 1}")
+                    return cap
+                cap.release()
+            except Exception as e:
+                logger.warning(f"Error abriendo stream con ffmpeg: {e}")
+            
+            if attempt < max_retries - 1:
+                logger.info(f"Reintentando conexión ({attempt + 1}/{max_retries})...")
+                time.sleep(2)
+        
+        logger.warning("No se pudo abrir la fuente con ffmpeg, usando OpenCV")
+        return None
+    
     @staticmethod
     def open_stream(source: str, timeout: int = 5, max_retries: int = 3):
         """
@@ -99,19 +190,60 @@ class VideoProcessor:
     """Procesador de video con detección, tracking y cálculo de velocidad"""
     
     def __init__(self, camera_id: int, api_url: str = "http://localhost:8005",
-                 model_path: str = "yolov8n.pt", homography_matrix=None, speed_limit=None):
+                 model_path: str = "yolov8n.pt", homography_matrix=None, speed_limit=None,
+                 detector: Optional[YOLODetector] = None, evidence_dir: Optional[str] = None,
+                 load_camera_info: bool = True, time_origin: Optional[float] = None,
+                 roi_points: Optional[list] = None, spool_dir: str = 'spool',
+                 tracker_options: Optional[dict] = None):
         self.camera_id = camera_id
         self.api_url = api_url
-        self.detector = YOLODetector(model_path=model_path)
-        self.tracker = ByteTracker()
-        self.speed_calculator = SpeedCalculator(homography_matrix=homography_matrix)
+        # Permitir compartir un mismo detector (y modelo) entre varias cámaras
+        self.detector = detector or YOLODetector(model_path=model_path)
+        # Parámetros de ByteTracker (matcher, umbrales); por defecto los del tracker
+        self.tracker = ByteTracker(**(tracker_options or {}))
+        self.speed_calculator = SpeedCalculator()
+        # Homografía calibrada sobre la resolución nativa de la cámara
+        self.homography_matrix = homography_matrix
+        # Escala (x, y) de coordenadas del frame procesado a coordenadas nativas
+        self.frame_scale = (1.0, 1.0)
+        self._apply_homography()
+        # Región de interés (coordenadas nativas, como la calibración): recorte antes de YOLO
+        self.roi_points = roi_points
+        self.roi: Optional[RegionOfInterest] = None
+        self._apply_roi()
+        # Evidencia de incidentes: directorio local y stream principal opcional (alta resolución)
+        self.evidence_dir = Path(evidence_dir) if evidence_dir else None
+        self.evidence_stream: Optional[EvidenceStream] = None
+        # Compuerta de movimiento opcional: sin movimiento ni tracks vivos no se ejecuta YOLO
+        self.motion_gate: Optional[MotionGate] = None
+        # Salida bajo demanda: solo se dibuja/codifica si hay visores web o salida local
+        self.viewer_monitor: Optional[ViewerMonitor] = None
+        self.local_output = False
+        # Envío de frames al navegador fuera del loop de procesamiento (hilo propio),
+        # o por memoria compartida si el backend corre en el mismo host
+        self.frame_publisher = FramePublisher(api_url, camera_id)
+        self.shared_memory_transport = False
+        # Incidentes en lotes y en segundo plano, con spool local si el backend no responde
+        self.incident_sender = IncidentSender(api_url, camera_id, spool_dir=spool_dir)
+        # Stream binario opcional de los tracks de cada frame (WebSocket persistente)
+        self.track_stream: Optional[TrackStreamSender] = None
         self.speed_limit = speed_limit or 50.0
         self.frame_count = 0
         self.fps = 0
         self.last_fps_time = time.time()
+        self.camera_info = {}
+        # Época (segundos) que se suma a los timestamps relativos del video para fechar
+        # los incidentes; None = fecha actual (procesamiento en vivo)
+        self.time_origin = time_origin
         
         # Cargar información de la cámara desde el backend
-        self._load_camera_info()
+        if load_camera_info:
+            self._load_camera_info()
+        
+        # Una infracción por vehículo: se acumula mientras dura y se emite al terminar el track.
+        # Se cierra recién cuando ByteTracker eliminaría el track: si el vehículo reaparece
+        # tras una oclusión con el mismo track_id, sigue siendo la misma infracción
+        self.violation_tracker = ViolationTracker(self.speed_limit, max_missing=self.tracker.max_age)
         
         logger.info(f"VideoProcessor inicializado para cámara {camera_id}")
     
@@ -121,52 +253,245 @@ class VideoProcessor:
             response = requests.get(f"{self.api_url}/api/cameras/{self.camera_id}", timeout=5)
             if response.status_code == 200:
                 camera_data = response.json()
+                self.camera_info = camera_data
                 if camera_data.get('calibration_matrix'):
-                    matrix = np.array(camera_data['calibration_matrix'])
-                    self.speed_calculator.update_homography(matrix)
+                    self.homography_matrix = np.array(camera_data['calibration_matrix'])
+                    self._apply_homography()
                     logger.info("Matriz de homografía cargada desde el backend")
                 if camera_data.get('speed_limit'):
                     self.speed_limit = camera_data['speed_limit']
                     logger.info(f"Límite de velocidad cargado: {self.speed_limit} km/h")
+                if camera_data.get('roi_points'):
+                    self.roi_points = camera_data['roi_points']
+                    self._apply_roi()
+                    logger.info("Región de interés cargada desde el backend")
         except Exception as e:
             logger.warning(f"No se pudo cargar información de la cámara: {e}")
     
-    def process_frame(self, frame: np.ndarray) -> np.ndarray:
+    def set_frame_scale(self, processed_size: Tuple[int, int], native_size: Tuple[int, int]):
+        """
+        Indicar que los frames llegan reescalados respecto de la resolución nativa
+        
+        Args:
+            processed_size: (ancho, alto) de los frames que recibe el procesador
+            native_size: (ancho, alto) nativos de la cámara (los de la calibración)
+        """
+        self.frame_scale = (native_size[0] / processed_size[0], native_size[1] / processed_size[1])
+        self._apply_homography()
+        self._apply_roi()
+        if self.frame_scale != (1.0, 1.0):
+            logger.info(f"Frames reescalados: {processed_size[0]}x{processed_size[1]} -> "
+                        f"nativo {native_size[0]}x{native_size[1]}")
+    
+    def configure_dual_stream(self, main_source: str, processed_size: Tuple[int, int]):
+        """
+        Detectar sobre el substream y tomar la evidencia del stream principal
+        
+        Args:
+            main_source: URL del stream principal (alta resolución) de la cámara
+            processed_size: (ancho, alto) de los frames de detección que recibe el procesador
+        """
+        self.evidence_stream = EvidenceStream(
+            main_source,
+            opener=lambda source: CameraStream.open_threaded(source, buffer_size=1)
+        )
+        main_size = self.evidence_stream.probe_size()
+        if main_size is None:
+            logger.warning("No se pudo obtener la resolución del stream principal; "
+                           "los bboxes quedarán en coordenadas del substream")
+            return
+        self.set_frame_scale(processed_size, main_size)
+        logger.info(f"Modo doble stream: detección {processed_size[0]}x{processed_size[1]}, "
+                    f"evidencia {main_size[0]}x{main_size[1]}")
+    
+    def use_shared_memory_transport(self, shm_dir: Optional[str] = None):
+        """
+        Publicar los frames para el navegador en memoria compartida en lugar de HTTP
+        
+        Args:
+            shm_dir: Directorio compartido con el backend (su SHARED_FRAMES_DIR)
+        """
+        self.frame_publisher.stop()
+        self.frame_publisher = SharedFrameWriter(self.camera_id, shm_dir=shm_dir)
+        self.shared_memory_transport = True
+    
+    def _apply_homography(self):
+        """Actualizar la homografía del calculador de velocidad según la escala de los frames"""
+        if self.homography_matrix is None:
+            return
+        self.speed_calculator.update_homography(
+            scale_homography(np.asarray(self.homography_matrix), *self.frame_scale)
+        )
+    
+    def _apply_roi(self):
+        """Construir la región de interés en coordenadas del frame procesado"""
+        if not self.roi_points:
+            self.roi = None
+            return
+        sx, sy = self.frame_scale
+        points = np.asarray(self.roi_points, dtype=np.float32).reshape(-1, 2) / (sx, sy)
+        try:
+            self.roi = RegionOfInterest(points)
+        except ValueError as e:
+            logger.warning(f"Región de interés inválida, se ignora: {e}")
+            self.roi = None
+    
+    def _to_native_bbox(self, bbox: list) -> list:
+        """Convertir un bbox del frame procesado a coordenadas nativas de la cámara"""
+        sx, sy = self.frame_scale
+        if sx == 1.0 and sy == 1.0:
+            return bbox
+        return [bbox[0] * sx, bbox[1] * sy, bbox[2] * sx, bbox[3] * sy]
+    
+    def process_frame(self, frame: np.ndarray, timestamp: Optional[float] = None) -> np.ndarray:
         """
         Procesar un frame: detectar, trackear y calcular velocidad
         
         Args:
             frame: Frame de video (BGR)
+            timestamp: Momento de captura del frame (por defecto, ahora)
             
         Returns:
             Frame anotado con detecciones y velocidades
         """
-        self.frame_count += 1
-        timestamp = time.time()
+        if timestamp is None:
+            timestamp = time.time()
         
         # Detectar objetos
-        detections = self.detector.detect(frame)
+        detections = self.detect_stage(frame, timestamp)
+        
+        return self.process_detections(frame, detections, timestamp)
+    
+    def process_detections(self, frame: np.ndarray, detections: Detections, timestamp: float) -> np.ndarray:
+        """
+        Procesar un frame cuyas detecciones ya fueron calculadas (p. ej. en un batch compartido)
+        
+        Args:
+            frame: Frame de video (BGR)
+            detections: Detecciones del frame
+            timestamp: Momento de captura del frame
+            
+        Returns:
+            Frame anotado con detecciones y velocidades (el frame original si nadie lo mira)
+        """
+        # Trackear objetos y calcular velocidades
+        tracked, incidents = self.track_stage(detections, timestamp, frame)
+        
+        # Dibujar resultados y codificar frame para el navegador (solo si alguien lo ve)
+        render, publish = self.output_plan()
+        annotated_frame = self.annotate_stage(frame, tracked) if render else frame
+        jpeg_bytes = self.encode_stage(annotated_frame) if publish else None
+        
+        # Enviar incidentes y frame procesado al backend
+        self.publish_stage(incidents, jpeg_bytes)
+        
+        return self.finish_stage(annotated_frame, draw_overlay=render)
+    
+    def output_plan(self) -> Tuple[bool, bool]:
+        """
+        Decidir qué salida visual necesita el frame actual
+        
+        Returns:
+            Tupla (dibujar anotaciones, codificar y publicar al navegador)
+        """
+        publish = self.viewer_monitor is None or self.viewer_monitor.should_publish()
+        return publish or self.local_output, publish
+    
+    def detection_input(self, frame: np.ndarray) -> np.ndarray:
+        """Parte del frame que entra a la inferencia (recorte de la región de interés)"""
+        return self.roi.crop(frame) if self.roi is not None else frame
+    
+    def detections_to_frame(self, detections: Detections) -> Detections:
+        """Filtrar detecciones por la región de interés y llevarlas a coordenadas del frame"""
+        return self.roi.filter(detections) if self.roi is not None else detections
+    
+    def should_detect(self, frame: np.ndarray, timestamp: Optional[float] = None) -> bool:
+        """Indicar si el frame (ya recortado) necesita inferencia según la compuerta de movimiento"""
+        if self.motion_gate is None:
+            return True
+        return self.motion_gate.should_detect(frame, timestamp, has_tracks=self.tracker.num_tracked > 0)
+    
+    def detect_stage(self, frame: np.ndarray, timestamp: Optional[float] = None) -> Detections:
+        """Etapa de inferencia: detectar objetos en la región de interés (si la compuerta lo permite)"""
+        crop = self.detection_input(frame)
+        if not self.should_detect(crop, timestamp):
+            return Detections.empty()
+        return self.detections_to_frame(self.detector.detect(crop))
+    
+    def detect_batch_stage(self, frames: list, timestamps: list) -> list:
+        """
+        Etapa de inferencia para varios frames consecutivos de esta cámara con un solo forward
+        
+        La compuerta de movimiento se evalúa con el estado del tracker al inicio del batch.
+        
+        Returns:
+            Lista de detecciones por frame, en el mismo orden que la entrada
+        """
+        crops = [self.detection_input(frame) for frame in frames]
+        detections = [Detections.empty() for _ in frames]
+        to_detect = [i for i, (crop, timestamp) in enumerate(zip(crops, timestamps))
+                     if self.should_detect(crop, timestamp)]
+        if to_detect:
+            results = self.detector.detect_batch([crops[i] for i in to_detect])
+            for i, dets in zip(to_detect, results):
+                detections[i] = self.detections_to_frame(dets)
+        return detections
+    
+    def track_stage(self, detections: Detections, timestamp: float,
+                    frame: Optional[np.ndarray] = None, record_violations: bool = True) -> Tuple[list, list]:
+        """
+        Etapa de tracking: asociar detecciones, calcular velocidades y verificar infracciones
+        
+        Args:
+            detections: Detecciones del frame
+            timestamp: Momento de captura del frame
+            frame: Frame procesado (para la evidencia de los incidentes)
+            record_violations: False para solo calentar tracker y velocidades sin abrir
+                infracciones (frames de solapamiento que también procesa el tramo anterior)
+            
+        Returns:
+            Tupla (lista de (track, velocidad), lista de incidentes cerrados en este frame)
+        """
+        tracks = self.tracker.update(detections, timestamp)
+        
+        # Velocidades de todos los tracks en una sola pasada vectorizada
+        speeds = self.speed_calculator.calculate_speeds(tracks.track_ids, tracks.boxes, timestamp)
+        
+        if self.track_stream is not None:
+            stream_time = timestamp + self.time_origin if self.time_origin is not None else timestamp
+            self.track_stream.send(encode_tracks(self.camera_id, stream_time, tracks, speeds,
+                                                 self.speed_limit, self.frame_scale))
         
-        # Trackear objetos
-        tracks = self.tracker.update(detections)
+        # Por objeto (dicts) solo desde acá: infracciones, anotación e incidentes
+        tracked = [(track, None if np.isnan(speed) else float(speed))
+                   for track, speed in zip(tracks, speeds)]
         
-        # Calcular velocidad y dibujar resultados
+        # Verificar infracciones: el incidente se emite cuando el track del vehículo termina
+        observed = tracked if record_violations else [(track, None) for track, _ in tracked]
+        closed, ended = self.violation_tracker.update(observed, timestamp, self._evidence_getter(frame))
+        for track_id in ended:
+            self.speed_calculator.remove_track(track_id)
+        incidents = [self._build_incident(violation) for violation in closed]
+        
+        return tracked, incidents
+    
+    def flush_violations(self) -> list:
+        """Cerrar las infracciones abiertas y retornar sus incidentes (fin del procesamiento)"""
+        return [self._build_incident(violation) for violation in self.violation_tracker.flush()]
+    
+    def annotate_stage(self, frame: np.ndarray, tracked: list) -> np.ndarray:
+        """Etapa de anotación: dibujar bboxes, IDs y velocidades sobre una copia del frame"""
         annotated_frame = frame.copy()
-        incidents = []
         
-        for track in tracks:
+        if self.roi is not None:
+            cv2.polylines(annotated_frame, [np.round(self.roi.polygon).astype(np.int32)], True, (255, 255, 0), 1)
+        
+        for track, speed_kmh in tracked:
             track_id = track['track_id']
-            bbox = track['bbox']
             class_name = track['class_name']
-            confidence = track['confidence']
-            
-            # Calcular velocidad
-            speed_kmh = self.speed_calculator.calculate_track_speed(
-                track_id, bbox, timestamp
-            )
             
             # Dibujar bbox
-            x1, y1, x2, y2 = map(int, bbox)
+            x1, y1, x2, y2 = map(int, track['bbox'])
             color = self._get_color_for_class(class_name)
             cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, 2)
             
@@ -180,18 +505,53 @@ class VideoProcessor:
             
             cv2.putText(annotated_frame, label, (x1, y1 - 10),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-            
-            # Verificar infracciones
-            incident = self._check_incidents(track, speed_kmh)
-            if incident:
-                incidents.append(incident)
         
-        # Enviar incidentes al backend
+        return annotated_frame
+    
+    def encode_stage(self, frame: np.ndarray):
+        """
+        Etapa de codificación: redimensionar el frame y convertirlo a JPEG
+        
+        Returns:
+            JPEG (transporte HTTP), el frame redimensionado sin codificar (memoria
+            compartida) o None si falla
+        """
+        try:
+            # Redimensionar frame para reducir tamaño (opcional, para eficiencia)
+            height, width = frame.shape[:2]
+            if width > 1280:
+                scale = 1280 / width
+                new_width = 1280
+                new_height = int(height * scale)
+                frame_resized = cv2.resize(frame, (new_width, new_height))
+            else:
+                frame_resized = frame
+            
+            if self.shared_memory_transport:
+                return frame_resized
+            
+            _, buffer = cv2.imencode('.jpg', frame_resized, [cv2.IMWRITE_JPEG_QUALITY, 85])
+            return buffer.tobytes()
+        except Exception as e:
+            logger.debug(f"Error codificando frame: {e}")
+            return None
+    
+    def publish_stage(self, incidents: list, jpeg_bytes):
+        """Etapa de publicación: enviar incidentes y frame al backend"""
         if incidents:
+            self._save_evidence(incidents)
             self._send_incidents(incidents)
         
+        if self.evidence_stream is not None:
+            self.evidence_stream.close_if_idle()
+        
         # Enviar frame procesado al backend para visualización
-        self._send_frame_to_backend(annotated_frame)
+        if jpeg_bytes is not None:
+            self._send_frame_to_backend(jpeg_bytes)
+    
+    def finish_stage(self, annotated_frame: np.ndarray, draw_overlay: bool = True) -> np.ndarray:
+        """Actualizar FPS y dibujar el overlay para visualización local"""
+        self.frame_count += 1
         
         # Calcular FPS
         if self.frame_count % 30 == 0:
@@ -199,6 +559,10 @@ class VideoProcessor:
             self.fps = 30 / (current_time - self.last_fps_time)
             self.last_fps_time = current_time
         
+        # Sin anotar, el frame es el de la captura: no dibujar sobre él
+        if not draw_overlay:
+            return annotated_frame
+        
         # Mostrar FPS y límite de velocidad
         cv2.putText(annotated_frame, f"FPS: {self.fps:.1f} | Limite: {self.speed_limit} km/h", 
                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
@@ -216,75 +580,160 @@ class VideoProcessor:
         }
         return colors.get(class_name, (255, 255, 255))
     
-    def _check_incidents(self, track: dict, speed_kmh: float) -> dict:
+    def _build_incident(self, violation: Violation) -> dict:
         """
-        Verificar si hay infracciones
+        Construir el incidente consolidado de una infracción de velocidad
         
         Args:
-            track: Información del track
-            speed_kmh: Velocidad calculada
+            violation: Infracción cerrada (velocidad máxima/promedio y mejor evidencia)
             
         Returns:
-            Diccionario con información del incidente o None
+            Diccionario con información del incidente
         """
-        incident = None
-        
-        # Verificar velocidad con tolerancia del 10%
-        if speed_kmh and speed_kmh > self.speed_limit * 1.1:
-            incident = {
-                'camera_id': self.camera_id,
-                'incident_type': 'speed',
-                'detected_class': track['class_name'],
-                'track_id': track['track_id'],
-                'speed_kmh': speed_kmh,
-                'speed_limit': self.speed_limit,
-                'bbox': track['bbox'],
-                'confidence': track['confidence'],
-                'timestamp': datetime.now().isoformat(),
-                'extra_data': {
-                    'hits': track['hits'],
-                    'age': track['age']
-                }
+        track = violation.best_track
+        incident = {
+            'camera_id': self.camera_id,
+            'incident_type': 'speed',
+            'detected_class': track['class_name'],
+            'track_id': violation.track_id,
+            'speed_kmh': violation.max_speed,
+            'speed_limit': self.speed_limit,
+            'bbox': self._to_native_bbox(track['bbox']),
+            'confidence': track['confidence'],
+            'timestamp': self._incident_time(violation.best_time),
+            'extra_data': {
+                'hits': track['hits'],
+                'age': track['age'],
+                'avg_speed_kmh': round(violation.avg_speed, 2),
+                'max_speed_kmh': round(violation.max_speed, 2),
+                'samples': violation.samples,
+                'duration_s': round(violation.end_time - violation.start_time, 3),
+                # Tiempos de captura (época en vivo, segundos del video en archivos)
+                'stream_time': violation.best_time,
+                'start_stream_time': violation.start_time,
+                'end_stream_time': violation.end_time
             }
+        }
+        
+        if violation.evidence_frame is not None:
+            incident['_evidence_frame'] = violation.evidence_frame
+            incident['extra_data']['evidence_size'] = [
+                violation.evidence_frame.shape[1], violation.evidence_frame.shape[0]
+            ]
         
         return incident
     
-    def _send_incidents(self, incidents: list):
-        """Enviar incidentes al backend API"""
-        try:
-            url = f"{self.api_url}/api/incidents/"
-            for incident in incidents:
-                response = requests.post(url, json=incident, timeout=2)
-                if response.status_code == 200:
-                    logger.info(f"Incidente enviado: {incident['incident_type']} - Track {incident['track_id']} - {incident['speed_kmh']:.1f} km/h")
-                else:
-                    logger.warning(f"Error enviando incidente: {response.status_code}")
-        except Exception as e:
-            logger.error(f"Error enviando incidentes al backend: {e}")
+    def _incident_time(self, timestamp: Optional[float]) -> str:
+        """Fecha ISO de un incidente: del video si hay time_origin, si no la actual"""
+        if self.time_origin is not None and timestamp is not None:
+            return datetime.fromtimestamp(self.time_origin + timestamp).isoformat()
+        return datetime.now().isoformat()
     
-    def _send_frame_to_backend(self, frame: np.ndarray):
-        """Enviar frame procesado al backend para visualización en el navegador"""
-        try:
-            # Redimensionar frame para reducir tamaño (opcional, para eficiencia)
-            height, width = frame.shape[:2]
-            if width > 1280:
-                scale = 1280 / width
-                new_width = 1280
-                new_height = int(height * scale)
-                frame_resized = cv2.resize(frame, (new_width, new_height))
-            else:
-                frame_resized = frame
+    def _evidence_getter(self, frame: Optional[np.ndarray]):
+        """
+        Función que obtiene (una sola vez por frame) la evidencia para las infracciones
+        
+        Se usa el stream principal en alta resolución si existe; si no, una copia del
+        frame procesado (puede ser un buffer reutilizado por la captura).
+        """
+        if self.evidence_dir is None or frame is None:
+            return None
+        
+        cache = []
+        
+        def get_evidence() -> np.ndarray:
+            if not cache:
+                evidence_frame = None
+                if self.evidence_stream is not None:
+                    evidence_frame = self.evidence_stream.get_frame()
+                cache.append(evidence_frame if evidence_frame is not None else frame.copy())
+            return cache[0]
+        
+        return get_evidence
+    
+    def _save_evidence(self, incidents: list):
+        """Guardar en disco el frame de evidencia de cada incidente y registrar su ruta"""
+        saved = {}
+        for incident in incidents:
+            evidence_frame = incident.pop('_evidence_frame', None)
+            if evidence_frame is None or self.evidence_dir is None:
+                continue
             
-            # Enviar frame al backend
-            url = f"{self.api_url}/api/camera-detection/update-frame/{self.camera_id}"
-            # Convertir frame a JPEG
-            _, buffer = cv2.imencode('.jpg', frame_resized, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            files = {'frame': ('frame.jpg', buffer.tobytes(), 'image/jpeg')}
+            # Un mismo frame puede ser evidencia de varios incidentes: guardarlo una vez
+            key = id(evidence_frame)
+            if key not in saved:
+                camera_dir = self.evidence_dir / f"camera_{self.camera_id}"
+                try:
+                    camera_dir.mkdir(parents=True, exist_ok=True)
+                    stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+                    path = camera_dir / f"{stamp}_track{incident['track_id']}.jpg"
+                    cv2.imwrite(str(path), evidence_frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+                    saved[key] = str(path)
+                except Exception as e:
+                    logger.error(f"Error guardando evidencia: {e}")
+                    saved[key] = None
             
-            requests.post(url, files=files, timeout=0.1)  # Timeout corto para no bloquear
-        except Exception as e:
-            # No es crítico si falla, solo logging ocasional
-            pass  # Silenciar errores de envío de frame para no saturar logs
+            if saved[key]:
+                incident['frame_path'] = saved[key]
+    
+    def _send_incidents(self, incidents: list):
+        """Encolar incidentes para el backend API (el envío ocurre en segundo plano)"""
+        for incident in incidents:
+            logger.info(f"Incidente detectado: {incident['incident_type']} - Track {incident['track_id']} - {incident['speed_kmh']:.1f} km/h")
+        self.incident_sender.submit(incidents)
+    
+    def _send_frame_to_backend(self, jpeg_bytes):
+        """Publicar frame procesado para el navegador (JPEG en segundo plano o memoria compartida)"""
+        self.frame_publisher.publish(jpeg_bytes)
+
+
+def _frame_timestamp(cap, frame_idx: int, fps: float, is_live: bool) -> float:
+    """
+    Obtener el timestamp real de un frame recién leído
+    
+    En archivos se usa el tiempo del contenedor, para que las velocidades no dependan
+    de la velocidad de procesamiento ni del salto de frames. En vivo, el reloj del sistema.
+    """
+    if is_live:
+        return time.time()
+    pos_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+    if pos_ms and pos_ms > 0:
+        return pos_ms / 1000.0
+    return (frame_idx - 1) / fps
+
+
+def add_tracking_arguments(parser: argparse.ArgumentParser):
+    """Agregar los parámetros de detección y de ByteTracker comunes a los ejecutables"""
+    parser.add_argument('--confidence', type=float, default=0.25,
+                       help='Confianza mínima de YOLO (bajarla a --track-low-thresh para que la segunda '
+                            'asociación reciba las detecciones de baja confianza)')
+    parser.add_argument('--matcher', choices=['greedy', 'hungarian'], default='greedy',
+                       help='Asociación de detecciones con tracks: greedy por IoU o asignación óptima')
+    parser.add_argument('--min-hits', type=int, default=3,
+                       help='Detecciones necesarias para confirmar un track')
+    parser.add_argument('--max-age', type=int, default=30,
+                       help='Frames sin detección antes de eliminar un track perdido')
+    parser.add_argument('--track-high-thresh', type=float, default=0.5,
+                       help='Confianza mínima de la primera asociación')
+    parser.add_argument('--track-low-thresh', type=float, default=0.1,
+                       help='Confianza mínima de la segunda asociación (mantiene tracks ocluidos)')
+    parser.add_argument('--new-track-thresh', type=float, default=0.6,
+                       help='Confianza mínima para crear un track nuevo')
+    parser.add_argument('--remove-unconfirmed', action='store_true',
+                       help='Eliminar al primer frame sin detección los tracks vistos una sola vez')
+
+
+def tracker_options(args: argparse.Namespace) -> dict:
+    """Parámetros de ByteTracker a partir de los argumentos de add_tracking_arguments"""
+    return {
+        'matcher': args.matcher,
+        'min_hits': args.min_hits,
+        'max_age': args.max_age,
+        'high_thresh': args.track_high_thresh,
+        'low_thresh': args.track_low_thresh,
+        'new_track_thresh': args.new_track_thresh,
+        'remove_unconfirmed': args.remove_unconfirmed
+    }
 
 
 def main():
@@ -317,27 +766,120 @@ Ejemplos de uso:
                        help='URL del backend API')
     parser.add_argument('--model', type=str, default='yolov8n.pt',
                        help='Ruta al modelo YOLO')
+    parser.add_argument('--inference-backend', choices=['torch', 'onnx', 'openvino', 'onnx-int8'], default='torch',
+                       help='Runtime de inferencia (onnx/openvino: CPU optimizado, el modelo se exporta y cachea; onnx-int8: cuantizado con tools/quantize_model.py)')
+    parser.add_argument('--model-cache-dir', type=str, default=None,
+                       help='Directorio de cache de modelos exportados (por defecto ~/.cache/voi_models)')
     parser.add_argument('--output', type=str, default=None,
                        help='Ruta para guardar video procesado (opcional)')
     parser.add_argument('--display', action='store_true',
                        help='Mostrar video en ventana')
     parser.add_argument('--max-retries', type=int, default=3,
                        help='Número máximo de reintentos para conectar')
+    parser.add_argument('--no-threaded-capture', action='store_true',
+                       help='Leer frames de forma síncrona en el loop principal (streams en vivo)')
+    parser.add_argument('--capture-buffer', type=int, default=2,
+                       help='Tamaño del buffer circular de la captura en segundo plano')
+    parser.add_argument('--detection-source', type=str, default=None,
+                       help='Substream de baja resolución para detección; --source queda como stream '
+                            'principal para evidencia (por defecto, detection_url de la cámara)')
+    parser.add_argument('--evidence-dir', type=str, default=None,
+                       help='Directorio donde guardar los frames de evidencia de los incidentes')
+    parser.add_argument('--capture-backend', choices=['opencv', 'ffmpeg'], default='opencv',
+                       help='Backend de captura: OpenCV o subproceso ffmpeg con escalado al decodificar')
+    parser.add_argument('--capture-width', type=int, default=None,
+                       help='Ancho de los frames decodificados con backend ffmpeg (ej. 1280)')
+    parser.add_argument('--capture-fps', type=float, default=None,
+                       help='FPS de salida del decodificador con backend ffmpeg (ej. 10)')
+    parser.add_argument('--target-fps', type=float, default=10.0,
+                       help='Tasa de procesamiento objetivo (frames de video procesados por segundo)')
+    parser.add_argument('--latency-budget', type=float, default=0.5,
+                       help='Retraso máximo aceptable entre captura y resultado, en segundos')
+    parser.add_argument('--pipeline', action='store_true',
+                       help='Ejecutar detección, tracking, anotación y publicación en hilos separados')
+    parser.add_argument('--queue-depth', type=int, default=2,
+                       help='Capacidad de las colas entre etapas del pipeline')
+    parser.add_argument('--backpressure', choices=['drop', 'block'], default=None,
+                       help='Política con el pipeline lleno: descartar frames (por defecto en vivo) o bloquear (por defecto en archivos)')
+    parser.add_argument('--motion-gate', action='store_true',
+                       help='Omitir la detección en frames sin movimiento ni tracks activos')
+    parser.add_argument('--motion-threshold', type=float, default=0.002,
+                       help='Fracción de píxeles cambiados que cuenta como movimiento')
+    parser.add_argument('--heartbeat-interval', type=float, default=5.0,
+                       help='Segundos máximos sin detección con la compuerta de movimiento activa')
+    parser.add_argument('--preview-fps', type=float, default=5.0,
+                       help='Tasa máxima de frames publicados al navegador mientras haya visores')
+    parser.add_argument('--always-publish', action='store_true',
+                       help='Dibujar y publicar todos los frames aunque nadie esté mirando la cámara')
+    parser.add_argument('--spool-dir', type=str, default='spool',
+                       help='Directorio donde se guardan los incidentes que no se pudieron enviar')
+    parser.add_argument('--frame-transport', choices=['http', 'shm'], default='http',
+                       help='Envío de frames al backend: HTTP (JPEG) o memoria compartida (mismo host)')
+    parser.add_argument('--shm-dir', type=str, default=None,
+                       help='Directorio de memoria compartida con el backend (por defecto /dev/shm/voi_frames)')
+    parser.add_argument('--track-stream', action='store_true',
+                       help='Enviar los tracks de cada frame al backend por WebSocket (formato binario)')
+    add_tracking_arguments(parser)
     
     args = parser.parse_args()
     
     # Inicializar procesador
+    detector = YOLODetector(model_path=args.model, confidence=args.confidence,
+                            backend=args.inference_backend, cache_dir=args.model_cache_dir)
     processor = VideoProcessor(
         camera_id=args.camera_id,
         api_url=args.api_url,
-        model_path=args.model
+        model_path=args.model,
+        detector=detector,
+        evidence_dir=args.evidence_dir,
+        spool_dir=args.spool_dir,
+        tracker_options=tracker_options(args)
     )
+    if args.motion_gate:
+        processor.motion_gate = MotionGate(
+            motion_threshold=args.motion_threshold,
+            heartbeat_interval=args.heartbeat_interval
+        )
+    # Dibujar siempre si hay ventana o video de salida; publicar al navegador solo con visores
+    processor.local_output = bool(args.display or args.output)
+    if args.frame_transport == 'shm':
+        processor.use_shared_memory_transport(args.shm_dir)
+    if args.track_stream:
+        processor.track_stream = TrackStreamSender(args.api_url).start()
+    if not args.always_publish:
+        processor.viewer_monitor = ViewerMonitor(
+            args.api_url, args.camera_id, preview_fps=args.preview_fps
+        ).start()
+    
+    # Doble stream: detectar sobre el substream y usar --source solo para evidencia
+    main_source = None
+    video_source = args.source
+    detection_source = args.detection_source or processor.camera_info.get('detection_url')
+    if detection_source and detection_source != args.source:
+        main_source, video_source = args.source, detection_source
+        logger.info(f"Detección sobre substream: {video_source}")
     
     # Abrir fuente de video con soporte mejorado
-    cap = CameraStream.open_stream(args.source, max_retries=args.max_retries)
+    # En streams en vivo la captura corre en segundo plano y solo se procesa el último frame
+    threaded = CameraStream.is_live_source(video_source) and not args.no_threaded_capture
+    # Frames en vuelo que pueden seguir referenciando un buffer de ffmpeg (la captura en
+    # segundo plano lee cada frame sobre un array propio y no usa la rotación)
+    num_buffers = args.capture_buffer + 2 + (4 * args.queue_depth if args.pipeline else 0)
+    if threaded:
+        cap = CameraStream.open_threaded(video_source, buffer_size=args.capture_buffer,
+                                         max_retries=args.max_retries,
+                                         backend=args.capture_backend, width=args.capture_width,
+                                         fps=args.capture_fps, num_buffers=2)
+    else:
+        cap = None
+        if args.capture_backend == 'ffmpeg':
+            cap = CameraStream.open_ffmpeg(video_source, width=args.capture_width, fps=args.capture_fps,
+                                           max_retries=args.max_retries, num_buffers=num_buffers)
+        if cap is None:
+            cap = CameraStream.open_stream(video_source, max_retries=args.max_retries)
     
     if cap is None:
-        logger.error(f"No se pudo abrir la fuente de video: {args.source}")
+        logger.error(f"No se pudo abrir la fuente de video: {video_source}")
         logger.error("Verifica que:")
         logger.error("  - La URL RTSP/HTTP sea correcta")
         logger.error("  - La cámara USB esté conectada")
@@ -351,6 +893,15 @@ Ejemplos de uso:
     
     logger.info(f"Video: {width}x{height} @ {fps} FPS")
     
+    # Mapear coordenadas a la resolución nativa si ffmpeg escala al decodificar
+    # o si se detecta sobre un substream
+    source_cap = cap.cap if threaded else cap
+    if main_source is not None:
+        processor.configure_dual_stream(main_source, (width, height))
+    elif isinstance(source_cap, FFmpegCapture):
+        processor.set_frame_scale((source_cap.width, source_cap.height),
+                                  (source_cap.native_width, source_cap.native_height))
+    
     # Configurar escritor de video si es necesario
     writer = None
     if args.output:
@@ -361,40 +912,134 @@ Ejemplos de uso:
     logger.info("Iniciando procesamiento de video...")
     logger.info("Presiona 'q' para salir (si --display está activado)")
     
-    frame_skip = max(1, fps // 10)  # Procesar ~10 FPS para eficiencia
+    # Salto de frames adaptativo según el tiempo real de procesamiento
+    is_live = CameraStream.is_live_source(video_source)
+    rate_controller = AdaptiveRateController(
+        source_fps=fps,
+        target_fps=args.target_fps,
+        latency_budget=args.latency_budget,
+        live=is_live
+    )
     frame_idx = 0
     
+    def record_pipeline_timing(stage_times: list, capture_ts: float):
+        """Informar al controlador de tasa el tiempo de un frame que salió del pipeline"""
+        # Con las etapas en paralelo el ritmo sostenible lo fija la más lenta; el resto
+        # de la latencia (otras etapas y colas) no es espera por frames acumulados
+        latency = time.time() - capture_ts if is_live else None
+        waiting = latency - sum(stage_times) if latency is not None else None
+        rate_controller.record(max(stage_times, default=0.0), latency=latency, waiting=waiting)
+    
+    # Pipeline opcional: cada etapa en su propio hilo con colas acotadas
+    pipeline = None
+    if args.pipeline:
+        backpressure = args.backpressure or ('drop' if threaded else 'block')
+        pipeline = FramePipeline(
+            processor,
+            queue_depth=args.queue_depth,
+            drop_when_full=(backpressure == 'drop'),
+            release_frame=cap.release_frame if threaded else None,
+            on_processed=record_pipeline_timing
+        ).start()
+    
+    def handle_output(annotated_frame) -> bool:
+        """Guardar/mostrar un frame anotado. Retorna False si el usuario pidió salir"""
+        # Guardar si es necesario
+        if writer:
+            writer.write(annotated_frame)
+        
+        # Mostrar si es necesario
+        if args.display:
+            cv2.imshow('Video Processor - Presiona Q para salir', annotated_frame)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                return False
+        return True
+    
+    def consume_result(annotated_frame):
+        """Receptor de los frames anotados del pipeline"""
+        nonlocal running
+        running = handle_output(annotated_frame) and running
+    
+    def write_remaining(annotated_frame):
+        if writer:
+            writer.write(annotated_frame)
+    
+    running = True
     try:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                logger.warning("No se pudo leer frame, reintentando...")
-                time.sleep(0.1)
-                continue
-            
-            frame_idx += 1
-            
-            # Procesar cada N frames para eficiencia
-            if frame_idx % frame_skip == 0:
-                # Procesar frame
-                annotated_frame = processor.process_frame(frame)
+        while running:
+            capture_ts = None
+            if threaded:
+                # El hilo de captura ya descarta los frames viejos: procesar el último si,
+                # contando los frames capturados, ya corresponde según el salto actual
+                ret, frame, capture_ts = cap.read_latest(timeout=1.0)
+                if not ret:
+                    continue
+                frame_idx = cap.last_frame_index
+                if not rate_controller.should_process(frame_idx):
+                    cap.release_frame(frame)
+                    continue
+            else:
+                # grab() solo avanza el stream; el frame se convierte a BGR (retrieve)
+                # únicamente si se va a procesar
+                if not cap.grab():
+                    if not is_live:
+                        logger.info("Fin del archivo de video")
+                        break
+                    logger.warning("No se pudo leer frame, reintentando...")
+                    time.sleep(0.1)
+                    continue
                 
-                # Guardar si es necesario
-                if writer:
-                    writer.write(annotated_frame)
+                frame_idx += 1
+                capture_ts = _frame_timestamp(cap, frame_idx, fps, is_live)
+                if not rate_controller.should_process(frame_idx):
+                    continue
                 
-                # Mostrar si es necesario
-                if args.display:
-                    cv2.imshow('Video Processor - Presiona Q para salir', annotated_frame)
-                    if cv2.waitKey(1) & 0xFF == ord('q'):
-                        break
+                ret, frame = cap.retrieve()
+                if not ret or frame is None:
+                    continue
+            
+            if pipeline is not None:
+                # Con contrapresión 'block' submit() entrega la salida mientras espera lugar
+                pipeline.submit(frame, capture_ts, on_result=consume_result)
+                # Consumir los frames ya anotados por el pipeline
+                annotated_frame = pipeline.get_result()
+                while running and annotated_frame is not None:
+                    consume_result(annotated_frame)
+                    annotated_frame = pipeline.get_result()
+            else:
+                # Procesar frame
+                start = time.time()
+                annotated_frame = processor.process_frame(frame, capture_ts)
+                end = time.time()
+                rate_controller.record(end - start, latency=(end - capture_ts) if is_live else None)
+                running = handle_output(annotated_frame)
+                if threaded:
+                    # Devolver el buffer a la captura recién cuando ya no se usa
+                    cap.release_frame(frame)
     
     except KeyboardInterrupt:
         logger.info("Procesamiento interrumpido por el usuario")
     except Exception as e:
         logger.error(f"Error durante el procesamiento: {e}", exc_info=True)
     finally:
+        if pipeline is not None:
+            # Guardar los frames que quedaron en el pipeline al detenerlo
+            pipeline.stop(on_result=write_remaining)
+        # Emitir las infracciones de los vehículos que seguían en escena
+        processor.publish_stage(processor.flush_violations(), None)
         cap.release()
+        if processor.evidence_stream is not None:
+            processor.evidence_stream.release()
+        if processor.motion_gate is not None:
+            logger.info(f"Compuerta de movimiento: {processor.motion_gate.get_stats()}")
+        processor.frame_publisher.stop()
+        processor.incident_sender.stop()
+        if processor.track_stream is not None:
+            processor.track_stream.stop()
+        if processor.viewer_monitor is not None:
+            processor.viewer_monitor.stop()
+            logger.info(f"Frames publicados: {processor.viewer_monitor.published_frames}, "
+                        f"omitidos sin visores: {processor.viewer_monitor.skipped_frames}")
         if writer:
             writer.release()
         cv2.destroyAllWindows()
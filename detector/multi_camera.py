@@ -0,0 +1,297 @@
+import cv2
+import numpy as np
+import argparse
+import logging
+import time
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+# Agregar directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detector.detection.yolo_detector import YOLODetector
+from detector.detection.detections import Detections
+from detector.main import CameraStream, VideoProcessor, add_tracking_arguments, tracker_options
+from detector.utils.motion_gate import MotionGate
+from detector.utils.viewer_monitor import ViewerMonitor
+from detector.utils.track_stream import TrackStreamSender
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class MultiCameraRunner:
+    """Procesa varias cámaras en un solo proceso con un único YOLODetector compartido"""
+
+    def __init__(self, cameras: Dict[int, Optional[str]], api_url: str = "http://localhost:8005",
+                 model_path: str = "yolov8n.pt", max_batch: int = 16,
+                 capture_buffer: int = 2, max_retries: int = 3, evidence_dir: Optional[str] = None,
+                 motion_gate: bool = False, display: bool = False, preview_fps: Optional[float] = 5.0,
+                 frame_transport: str = 'http', shm_dir: Optional[str] = None, spool_dir: str = 'spool',
+                 track_stream: bool = False, inference_backend: str = 'torch',
+                 model_cache_dir: Optional[str] = None, confidence: float = 0.25,
+                 tracker_options: Optional[dict] = None):
+        """
+        Inicializar runner multi-cámara
+
+        Args:
+            cameras: Diccionario camera_id -> fuente (None para usar la rtsp_url del backend)
+            api_url: URL del backend API
+            model_path: Ruta al modelo YOLO (se carga una sola vez)
+            max_batch: Máximo de frames por llamada a predict
+            capture_buffer: Tamaño del buffer circular de cada captura
+            max_retries: Número máximo de reintentos para conectar cada fuente
+            evidence_dir: Directorio donde guardar los frames de evidencia
+            motion_gate: Omitir del batch los frames sin movimiento ni tracks activos
+            display: Se muestran las cámaras localmente (siempre hay que dibujar)
+            preview_fps: Tasa de publicación al navegador con visores; None = publicar todo
+            frame_transport: 'http' (JPEG) o 'shm' (memoria compartida con el backend)
+            shm_dir: Directorio de memoria compartida con el backend
+            spool_dir: Directorio del spool de incidentes no entregados
+            track_stream: Enviar los tracks de cada frame al backend (una conexión para todas las cámaras)
+            inference_backend: Runtime de inferencia ('torch', 'onnx' u 'openvino')
+            model_cache_dir: Directorio de cache de los modelos exportados
+            confidence: Confianza mínima de YOLO (baja para la segunda asociación de ByteTracker)
+            tracker_options: Parámetros de ByteTracker de cada cámara (matcher, umbrales)
+        """
+        self.api_url = api_url
+        self.max_batch = max(1, max_batch)
+        self.detector = YOLODetector(model_path=model_path, confidence=confidence,
+                                     backend=inference_backend, cache_dir=model_cache_dir)
+        # Cada mensaje lleva el camera_id: un solo WebSocket alcanza para todas las cámaras
+        self.track_stream = TrackStreamSender(api_url).start() if track_stream else None
+
+        # Tracker y calculador de velocidad independientes por cámara
+        self.processors: Dict[int, VideoProcessor] = {}
+        self.captures = {}
+        for camera_id, source in cameras.items():
+            processor = VideoProcessor(camera_id=camera_id, api_url=api_url, detector=self.detector,
+                                       evidence_dir=evidence_dir, spool_dir=spool_dir,
+                                       tracker_options=tracker_options)
+            if motion_gate:
+                processor.motion_gate = MotionGate()
+            processor.local_output = display
+            processor.track_stream = self.track_stream
+            if frame_transport == 'shm':
+                processor.use_shared_memory_transport(shm_dir)
+            # Sin fuente explícita: usar el substream de detección si la cámara lo tiene
+            main_source = None
+            if source is None:
+                source = processor.camera_info.get('detection_url') or processor.camera_info.get('rtsp_url')
+                if source != processor.camera_info.get('rtsp_url'):
+                    main_source = processor.camera_info.get('rtsp_url')
+            if not source:
+                logger.error(f"Cámara {camera_id} sin fuente de video (ni --camera ni rtsp_url en el backend)")
+                continue
+
+            cap = CameraStream.open_threaded(source, buffer_size=capture_buffer, max_retries=max_retries)
+            if cap is None:
+                logger.error(f"No se pudo abrir la fuente de la cámara {camera_id}: {source}")
+                continue
+
+            if main_source:
+                processor.configure_dual_stream(main_source, (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                                              int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))))
+
+            if preview_fps is not None:
+                processor.viewer_monitor = ViewerMonitor(api_url, camera_id, preview_fps=preview_fps).start()
+
+            self.processors[camera_id] = processor
+            self.captures[camera_id] = cap
+
+        # Post-procesamiento (tracking, dibujo, envío HTTP) de cada cámara en paralelo
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.processors)),
+                                            thread_name_prefix='camera')
+        self.batches = 0
+        self.frames_processed = 0
+        self.frames_detected = 0
+
+        logger.info(f"MultiCameraRunner inicializado con {len(self.processors)} cámara(s)")
+
+    def _collect_frames(self) -> List[tuple]:
+        """Tomar el último frame nuevo de cada cámara (sin esperar a las que no tienen)"""
+        batch = []
+        # Rotar el punto de inicio para que todas las cámaras entren en el batch
+        camera_ids = list(self.captures)
+        start = self.batches % len(camera_ids) if camera_ids else 0
+        for camera_id in camera_ids[start:] + camera_ids[:start]:
+            ret, frame, timestamp = self.captures[camera_id].read_latest(timeout=0)
+            if ret:
+                batch.append((camera_id, frame, timestamp))
+                if len(batch) >= self.max_batch:
+                    break
+        return batch
+
+    def step(self) -> Dict[int, np.ndarray]:
+        """
+        Ejecutar un tick: una inferencia en batch con los frames nuevos de todas las cámaras
+
+        Returns:
+            Diccionario camera_id -> frame anotado de las cámaras procesadas en este tick
+        """
+        batch = self._collect_frames()
+        if not batch:
+            time.sleep(0.005)
+            return {}
+
+        # Solo entran a la inferencia los recortes (región de interés) que pasan la compuerta de movimiento
+        crops = [self.processors[camera_id].detection_input(frame) for camera_id, frame, _ in batch]
+        to_detect = [i for i, (camera_id, _, timestamp) in enumerate(batch)
+                     if self.processors[camera_id].should_detect(crops[i], timestamp)]
+        detections = [Detections.empty() for _ in batch]
+        if to_detect:
+            results = self.detector.detect_batch([crops[i] for i in to_detect])
+            for i, dets in zip(to_detect, results):
+                detections[i] = self.processors[batch[i][0]].detections_to_frame(dets)
+
+        futures = {
+            camera_id: self._executor.submit(
+                self.processors[camera_id].process_detections, frame, dets, timestamp
+            )
+            for (camera_id, frame, timestamp), dets in zip(batch, detections)
+        }
+
+        annotated = {}
+        for camera_id, future in futures.items():
+            try:
+                annotated[camera_id] = future.result()
+            except Exception as e:
+                logger.error(f"Error procesando cámara {camera_id}: {e}", exc_info=True)
+
+        self.batches += 1
+        self.frames_processed += len(batch)
+        self.frames_detected += len(to_detect)
+        return annotated
+
+    def release(self):
+        """Liberar capturas y workers"""
+        for cap in self.captures.values():
+            cap.release()
+        for processor in self.processors.values():
+            processor.publish_stage(processor.flush_violations(), None)
+            if processor.evidence_stream is not None:
+                processor.evidence_stream.release()
+            processor.frame_publisher.stop()
+            processor.incident_sender.stop()
+            if processor.viewer_monitor is not None:
+                processor.viewer_monitor.stop()
+        if self.track_stream is not None:
+            self.track_stream.stop()
+        self._executor.shutdown(wait=True)
+        avg_batch = self.frames_processed / self.batches if self.batches else 0
+        logger.info(f"Procesados {self.frames_processed} frames en {self.batches} batches "
+                    f"(promedio {avg_batch:.1f} frames/batch, {self.frames_detected} con inferencia)")
+
+
+def parse_camera_arg(value: str) -> tuple:
+    """Parsear '--camera ID=FUENTE' (o solo 'ID' para usar la rtsp_url del backend)"""
+    camera_id, _, source = value.partition('=')
+    try:
+        return int(camera_id), source or None
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Formato inválido: '{value}' (usar ID=FUENTE o ID)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Procesador multi-cámara con un único modelo YOLO y detección en batch',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Ejemplos de uso:
+  # Dos streams RTSP explícitos
+  python multi_camera.py --camera 1=rtsp://cam1/stream --camera 2=rtsp://cam2/stream
+
+  # Usar la rtsp_url registrada en el backend para cada cámara
+  python multi_camera.py --camera 1 --camera 2 --camera 3
+        """
+    )
+    parser.add_argument('--camera', type=parse_camera_arg, action='append', required=True,
+                       help='Cámara a procesar: ID=FUENTE o solo ID (repetible)')
+    parser.add_argument('--api-url', type=str, default='http://localhost:8005',
+                       help='URL del backend API')
+    parser.add_argument('--model', type=str, default='yolov8n.pt',
+                       help='Ruta al modelo YOLO')
+    parser.add_argument('--inference-backend', choices=['torch', 'onnx', 'openvino', 'onnx-int8'], default='torch',
+                       help='Runtime de inferencia (onnx/openvino: CPU optimizado, el modelo se exporta y cachea; onnx-int8: cuantizado con tools/quantize_model.py)')
+    parser.add_argument('--model-cache-dir', type=str, default=None,
+                       help='Directorio de cache de modelos exportados (por defecto ~/.cache/voi_models)')
+    parser.add_argument('--max-batch', type=int, default=16,
+                       help='Máximo de frames por inferencia en batch')
+    parser.add_argument('--capture-buffer', type=int, default=2,
+                       help='Tamaño del buffer circular de cada captura')
+    parser.add_argument('--max-retries', type=int, default=3,
+                       help='Número máximo de reintentos para conectar cada fuente')
+    parser.add_argument('--evidence-dir', type=str, default=None,
+                       help='Directorio donde guardar los frames de evidencia de los incidentes')
+    parser.add_argument('--display', action='store_true',
+                       help='Mostrar cada cámara en su propia ventana')
+    parser.add_argument('--motion-gate', action='store_true',
+                       help='Omitir la detección en frames sin movimiento ni tracks activos')
+    parser.add_argument('--preview-fps', type=float, default=5.0,
+                       help='Tasa máxima de frames publicados al navegador por cámara con visores')
+    parser.add_argument('--always-publish', action='store_true',
+                       help='Dibujar y publicar todos los frames aunque nadie esté mirando')
+    parser.add_argument('--spool-dir', type=str, default='spool',
+                       help='Directorio donde se guardan los incidentes que no se pudieron enviar')
+    parser.add_argument('--frame-transport', choices=['http', 'shm'], default='http',
+                       help='Envío de frames al backend: HTTP (JPEG) o memoria compartida (mismo host)')
+    parser.add_argument('--shm-dir', type=str, default=None,
+                       help='Directorio de memoria compartida con el backend (por defecto /dev/shm/voi_frames)')
+    parser.add_argument('--track-stream', action='store_true',
+                       help='Enviar los tracks de cada frame al backend por WebSocket (formato binario)')
+    add_tracking_arguments(parser)
+
+    args = parser.parse_args()
+
+    runner = MultiCameraRunner(
+        cameras=dict(args.camera),
+        api_url=args.api_url,
+        model_path=args.model,
+        max_batch=args.max_batch,
+        capture_buffer=args.capture_buffer,
+        max_retries=args.max_retries,
+        evidence_dir=args.evidence_dir,
+        motion_gate=args.motion_gate,
+        display=args.display,
+        preview_fps=None if args.always_publish else args.preview_fps,
+        frame_transport=args.frame_transport,
+        shm_dir=args.shm_dir,
+        spool_dir=args.spool_dir,
+        track_stream=args.track_stream,
+        inference_backend=args.inference_backend,
+        model_cache_dir=args.model_cache_dir,
+        confidence=args.confidence,
+        tracker_options=tracker_options(args)
+    )
+
+    if not runner.processors:
+        logger.error("No se pudo abrir ninguna cámara")
+        return
+
+    logger.info("Iniciando procesamiento multi-cámara...")
+
+    try:
+        while True:
+            annotated = runner.step()
+            if args.display and annotated:
+                for camera_id, frame in annotated.items():
+                    cv2.imshow(f'Cámara {camera_id} - Presiona Q para salir', frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+    except KeyboardInterrupt:
+        logger.info("Procesamiento interrumpido por el usuario")
+    except Exception as e:
+        logger.error(f"Error durante el procesamiento: {e}", exc_info=True)
+    finally:
+        runner.release()
+        cv2.destroyAllWindows()
+        logger.info("Procesamiento finalizado")
+
+
+if __name__ == "__main__":
+    main()
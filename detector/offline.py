@@ -0,0 +1,431 @@
+import cv2
+import argparse
+import hashlib
+import json
+import logging
+import math
+import multiprocessing
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import requests
+
+# Agregar directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detector.main import VideoProcessor, add_tracking_arguments, tracker_options
+from detector.detection.backends import resolve_model
+from detector.detection.yolo_detector import YOLODetector
+from detector.utils.motion_gate import MotionGate
+from detector.utils.incident_sender import IncidentSender
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _box_iou(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """Calcular matriz IoU entre dos conjuntos de boxes [x1, y1, x2, y2]"""
+    x1 = np.maximum(boxes1[:, None, 0], boxes2[:, 0])
+    y1 = np.maximum(boxes1[:, None, 1], boxes2[:, 1])
+    x2 = np.minimum(boxes1[:, None, 2], boxes2[:, 2])
+    y2 = np.minimum(boxes1[:, None, 3], boxes2[:, 3])
+    intersection = np.maximum(0, x2 - x1) * np.maximum(0, y2 - y1)
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    return intersection / np.maximum(area1[:, None] + area2 - intersection, 1e-8)
+
+
+def _process_chunk(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Procesar un tramo del video en un proceso del pool
+
+    El tramo arranca `overlap` frames antes de su inicio real para que el tracker
+    y las velocidades lleguen confirmados a la frontera. Esos frames de
+    calentamiento también los procesa el tramo anterior, así que en ellos no se
+    abren infracciones: cada muestra cuenta en un solo tramo al unir las partes.
+    """
+    try:
+        import torch
+        torch.set_num_threads(task['threads'])
+    except ImportError:
+        pass
+
+    processor = VideoProcessor(
+        camera_id=task['camera_id'],
+        api_url=task['api_url'],
+        model_path=task['model_path'],
+        detector=YOLODetector(model_path=task['model_path'], confidence=task['confidence'],
+                              imgsz=task['imgsz'], backend=task['inference_backend']),
+        homography_matrix=task['homography_matrix'],
+        speed_limit=task['speed_limit'],
+        evidence_dir=task['evidence_dir'],
+        load_camera_info=False,
+        time_origin=task['time_origin'],
+        roi_points=task['roi_points'],
+        tracker_options=task['tracker_options']
+    )
+    if task['motion_gate']:
+        processor.motion_gate = MotionGate()
+
+    start, end, step = task['start'], task['end'], task['step']
+    overlap = task['overlap']
+    # Alinear al paso global para que tramos vecinos procesen los mismos frames en la zona compartida
+    first = int(math.ceil(max(0, start - overlap) / step) * step)
+
+    cap = cv2.VideoCapture(task['source'])
+    cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+
+    head = defaultdict(list)   # frames de calentamiento [first, start)
+    tail = defaultdict(list)   # últimos frames [end - overlap, end)
+    incidents = []
+    processed = 0
+    wall_start = time.time()
+
+    # Frames muestreados a la espera de completar un batch de inferencia
+    pending = []
+
+    def run_batch():
+        nonlocal processed
+        batch_detections = processor.detect_batch_stage([f for _, f, _ in pending], [t for _, _, t in pending])
+        for (idx, frame, timestamp), detections in zip(pending, batch_detections):
+            tracked, frame_incidents = processor.track_stage(detections, timestamp, frame,
+                                                             record_violations=idx >= start)
+            processed += 1
+
+            boxes = [(track['track_id'], track['bbox']) for track, _ in tracked]
+            if idx < start:
+                head[idx] = boxes
+            if idx >= end - overlap:
+                tail[idx] = boxes
+
+            if frame_incidents:
+                incidents.extend(_keep_chunk_incidents(processor, frame_incidents, task['fps']))
+        pending.clear()
+
+    frame_idx = first
+    while frame_idx < end:
+        if not cap.grab():
+            break
+        if frame_idx % step == 0:
+            ret, frame = cap.retrieve()
+            if ret:
+                pos_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+                timestamp = pos_ms / 1000.0 if pos_ms > 0 else frame_idx / task['fps']
+                pending.append((frame_idx, frame, timestamp))
+                if len(pending) >= task['batch_size']:
+                    run_batch()
+        frame_idx += 1
+    if pending:
+        run_batch()
+
+    cap.release()
+    # Las infracciones abiertas al final del tramo se cierran aquí y se unen en stitch
+    incidents.extend(_keep_chunk_incidents(processor, processor.flush_violations(), task['fps']))
+    elapsed = time.time() - wall_start
+    skipped = processor.motion_gate.skipped_frames if processor.motion_gate else 0
+    logger.info(f"Tramo {task['index']}: frames {start}-{end}, {processed} procesados "
+                f"({skipped} sin movimiento) en {elapsed:.1f}s, {len(incidents)} incidentes")
+
+    return {
+        'index': task['index'],
+        'head': dict(head),
+        'tail': dict(tail),
+        'incidents': incidents,
+        'processed': processed
+    }
+
+
+def _keep_chunk_incidents(processor: VideoProcessor, incidents: List[Dict[str, Any]],
+                          fps: float) -> List[Dict[str, Any]]:
+    """Anotar el frame de cada incidente del tramo y guardar su evidencia"""
+    for incident in incidents:
+        extra = incident['extra_data']
+        extra['frame_idx'] = int(round(extra['stream_time'] * fps))
+    processor._save_evidence(incidents)
+    return incidents
+
+
+def match_boundary_tracks(prev_tail: Dict[int, list], cur_head: Dict[int, list],
+                          iou_threshold: float = 0.5, min_votes: int = 2) -> Dict[int, int]:
+    """
+    Emparejar IDs de tracks entre dos tramos a partir de los frames que ambos procesaron
+
+    Args:
+        prev_tail: frame_idx -> [(track_id, bbox)] del final del tramo anterior
+        cur_head: frame_idx -> [(track_id, bbox)] del calentamiento del tramo actual
+        iou_threshold: IoU mínimo para considerar que dos boxes son el mismo objeto
+        min_votes: Frames coincidentes mínimos para aceptar un emparejamiento
+
+    Returns:
+        Diccionario track_id actual -> track_id del tramo anterior
+    """
+    votes = defaultdict(int)
+    for frame_idx, cur_tracks in cur_head.items():
+        prev_tracks = prev_tail.get(frame_idx)
+        if not cur_tracks or not prev_tracks:
+            continue
+        iou = _box_iou(np.array([b for _, b in cur_tracks]), np.array([b for _, b in prev_tracks]))
+        for i, (cur_id, _) in enumerate(cur_tracks):
+            j = int(np.argmax(iou[i]))
+            if iou[i, j] >= iou_threshold:
+                votes[(cur_id, prev_tracks[j][0])] += 1
+
+    mapping = {}
+    used_prev = set()
+    for (cur_id, prev_id), count in sorted(votes.items(), key=lambda item: -item[1]):
+        if count < min_votes or cur_id in mapping or prev_id in used_prev:
+            continue
+        mapping[cur_id] = prev_id
+        used_prev.add(prev_id)
+    return mapping
+
+
+def stitch_chunks(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Unir los incidentes de todos los tramos con IDs de track globales y continuos"""
+    results = sorted(results, key=lambda r: r['index'])
+    incidents = []
+    next_global = 1
+    prev_result = None
+    prev_ids: Dict[int, int] = {}
+
+    for result in results:
+        carried = {}
+        if prev_result is not None:
+            mapping = match_boundary_tracks(prev_result['tail'], result['head'])
+            carried = {cur: prev_ids[prev] for cur, prev in mapping.items() if prev in prev_ids}
+
+        local_ids: Dict[int, int] = {}
+
+        def to_global(local_id: int) -> int:
+            nonlocal next_global
+            if local_id not in local_ids:
+                if local_id in carried:
+                    local_ids[local_id] = carried[local_id]
+                else:
+                    local_ids[local_id] = next_global
+                    next_global += 1
+            return local_ids[local_id]
+
+        for incident in result['incidents']:
+            incident['track_id'] = to_global(incident['track_id'])
+            incidents.append(incident)
+        # Los tracks vivos al final del tramo deben tener ID global para el siguiente
+        for tracks in result['tail'].values():
+            for track_id, _ in tracks:
+                to_global(track_id)
+
+        prev_result = result
+        prev_ids = local_ids
+
+    return incidents
+
+
+def _bbox_area(bbox: List[float]) -> float:
+    return (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])
+
+
+def merge_split_violations(incidents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Unir las partes de una misma infracción cortada en la frontera entre tramos
+
+    Cada tramo cierra las infracciones abiertas al terminar; con IDs de track
+    globales, las partes de un mismo vehículo se combinan en un único incidente.
+    """
+    merged: Dict[tuple, Dict[str, Any]] = {}
+    for incident in sorted(incidents, key=lambda i: i['extra_data']['start_stream_time']):
+        key = (incident['track_id'], incident['incident_type'])
+        current = merged.get(key)
+        if current is None:
+            merged[key] = incident
+            continue
+
+        a, b = current['extra_data'], incident['extra_data']
+        samples = a['samples'] + b['samples']
+        avg_speed = (a['avg_speed_kmh'] * a['samples'] + b['avg_speed_kmh'] * b['samples']) / samples
+
+        # Conservar la parte con mejor evidencia (bbox más grande)
+        keep, other = ((incident, current) if _bbox_area(incident['bbox']) > _bbox_area(current['bbox'])
+                       else (current, incident))
+        if other.get('frame_path') and other['frame_path'] != keep.get('frame_path'):
+            try:
+                os.remove(other['frame_path'])
+            except OSError:
+                pass
+
+        extra = keep['extra_data']
+        extra['samples'] = samples
+        extra['avg_speed_kmh'] = round(avg_speed, 2)
+        extra['max_speed_kmh'] = max(a['max_speed_kmh'], b['max_speed_kmh'])
+        extra['start_stream_time'] = min(a['start_stream_time'], b['start_stream_time'])
+        extra['end_stream_time'] = max(a['end_stream_time'], b['end_stream_time'])
+        extra['duration_s'] = round(extra['end_stream_time'] - extra['start_stream_time'], 3)
+        keep['speed_kmh'] = extra['max_speed_kmh']
+        merged[key] = keep
+
+    return sorted(merged.values(), key=lambda i: i['extra_data']['stream_time'])
+
+
+def fetch_camera_info(api_url: str, camera_id: int) -> dict:
+    """Obtener calibración y límite de velocidad de la cámara desde el backend"""
+    try:
+        response = requests.get(f"{api_url}/api/cameras/{camera_id}", timeout=5)
+        if response.status_code == 200:
+            return response.json()
+    except Exception as e:
+        logger.warning(f"No se pudo cargar información de la cámara: {e}")
+    return {}
+
+
+def assign_idempotency_keys(incidents: List[Dict[str, Any]], camera_id: int, source: str):
+    """
+    Asignar claves de idempotencia deterministas (cámara, archivo, frame y track)
+
+    Reprocesar la misma grabación no duplica incidentes en el backend.
+    """
+    name = os.path.basename(source)
+    for incident in incidents:
+        raw = f"{camera_id}:{name}:{incident['extra_data'].get('frame_idx')}:{incident['track_id']}"
+        incident['idempotency_key'] = hashlib.sha1(raw.encode()).hexdigest()[:32]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Reprocesamiento offline de archivos de video en paralelo',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Ejemplos de uso:
+  # Usar todos los núcleos y enviar los incidentes al backend
+  python offline.py --source grabacion.mp4 --camera-id 1
+
+  # Guardar incidentes en JSON sin enviarlos
+  python offline.py --source grabacion.mp4 --camera-id 1 --output-json incidentes.json --no-upload
+        """
+    )
+    parser.add_argument('--source', type=str, required=True, help='Archivo de video')
+    parser.add_argument('--camera-id', type=int, required=True, help='ID de la cámara en el sistema')
+    parser.add_argument('--api-url', type=str, default='http://localhost:8005', help='URL del backend API')
+    parser.add_argument('--model', type=str, default='yolov8n.pt', help='Ruta al modelo YOLO')
+    parser.add_argument('--inference-backend', choices=['torch', 'onnx', 'openvino', 'onnx-int8'], default='torch',
+                       help='Runtime de inferencia (onnx/openvino: CPU optimizado, el modelo se exporta y cachea; onnx-int8: cuantizado con tools/quantize_model.py)')
+    parser.add_argument('--model-cache-dir', type=str, default=None,
+                       help='Directorio de cache de modelos exportados (por defecto ~/.cache/voi_models)')
+    parser.add_argument('--imgsz', type=int, default=640, help='Lado de la imagen de entrada (múltiplo de 32)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                       help='Procesos en paralelo (por defecto, todos los núcleos)')
+    parser.add_argument('--chunk-seconds', type=float, default=300.0,
+                       help='Duración de cada tramo de video')
+    parser.add_argument('--overlap-seconds', type=float, default=3.0,
+                       help='Solapamiento entre tramos para unir tracks')
+    parser.add_argument('--target-fps', type=float, default=10.0,
+                       help='Frames de video procesados por segundo de video')
+    parser.add_argument('--batch-size', type=int, default=8,
+                       help='Frames consecutivos por forward del modelo en cada proceso')
+    parser.add_argument('--motion-gate', action='store_true',
+                       help='Omitir la detección en frames sin movimiento ni tracks activos')
+    parser.add_argument('--start-time', type=str, default=None,
+                       help='Fecha/hora ISO del inicio de la grabación (por defecto, según el archivo)')
+    parser.add_argument('--evidence-dir', type=str, default=None,
+                       help='Directorio donde guardar los frames de evidencia')
+    parser.add_argument('--output-json', type=str, default=None,
+                       help='Guardar los incidentes en un archivo JSON')
+    parser.add_argument('--no-upload', action='store_true',
+                       help='No enviar los incidentes al backend')
+    parser.add_argument('--spool-dir', type=str, default='spool',
+                       help='Directorio donde se guardan los incidentes que no se pudieron enviar')
+    add_tracking_arguments(parser)
+
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.source)
+    if not cap.isOpened():
+        logger.error(f"No se pudo abrir el archivo de video: {args.source}")
+        return
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if total_frames <= 0:
+        logger.error("No se pudo determinar la cantidad de frames del video")
+        return
+
+    duration = total_frames / fps
+    if args.start_time:
+        time_origin = datetime.fromisoformat(args.start_time).timestamp()
+    else:
+        # Aproximación: el archivo se terminó de escribir al final de la grabación
+        time_origin = os.path.getmtime(args.source) - duration
+
+    camera_info = fetch_camera_info(args.api_url, args.camera_id)
+    # Exportar (o tomar de la cache) una sola vez antes de lanzar los procesos; los workers
+    # cargan ese artefacto con el mismo backend e imgsz con que se exportó
+    imgsz = max(32, int(round(args.imgsz / 32)) * 32)
+    model_path = resolve_model(args.model, args.inference_backend, imgsz, cache_dir=args.model_cache_dir)
+
+    step = max(1, round(fps / args.target_fps))
+    chunk_frames = max(step, int(args.chunk_seconds * fps))
+    overlap = int(args.overlap_seconds * fps)
+    workers = max(1, args.workers)
+
+    tasks = []
+    for index, start in enumerate(range(0, total_frames, chunk_frames)):
+        tasks.append({
+            'index': index,
+            'source': args.source,
+            'start': start,
+            'end': min(total_frames, start + chunk_frames),
+            'overlap': overlap,
+            'step': step,
+            'fps': fps,
+            'camera_id': args.camera_id,
+            'api_url': args.api_url,
+            'model_path': model_path,
+            'inference_backend': args.inference_backend,
+            'imgsz': imgsz,
+            'homography_matrix': camera_info.get('calibration_matrix'),
+            'speed_limit': camera_info.get('speed_limit'),
+            'roi_points': camera_info.get('roi_points'),
+            'evidence_dir': args.evidence_dir,
+            'time_origin': time_origin,
+            'motion_gate': args.motion_gate,
+            'threads': max(1, (os.cpu_count() or 1) // workers),
+            'batch_size': max(1, args.batch_size),
+            'confidence': args.confidence,
+            'tracker_options': tracker_options(args)
+        })
+
+    logger.info(f"Video: {total_frames} frames @ {fps:.2f} FPS ({duration / 60:.1f} min), "
+                f"{len(tasks)} tramos en {workers} procesos, 1 de cada {step} frames")
+
+    wall_start = time.time()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        results = list(executor.map(_process_chunk, tasks))
+    elapsed = time.time() - wall_start
+
+    incidents = merge_split_violations(stitch_chunks(results))
+    assign_idempotency_keys(incidents, args.camera_id, args.source)
+    processed = sum(r['processed'] for r in results)
+    logger.info(f"Procesados {processed} frames en {elapsed:.1f}s "
+                f"({duration / elapsed:.1f}x tiempo real), {len(incidents)} incidentes")
+
+    if args.output_json:
+        with open(args.output_json, 'w') as f:
+            json.dump(incidents, f, indent=2, default=float)
+        logger.info(f"Incidentes guardados en: {args.output_json}")
+
+    if not args.no_upload and incidents:
+        sender = IncidentSender(args.api_url, args.camera_id, spool_dir=args.spool_dir)
+        sender.submit(incidents)
+        sender.stop(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from detector.speed.speed_calculator import SpeedCalculator, calculate_homography_matrix, pixel_to_real, calculate_speed
+from detector.speed.speed_calculator import SpeedCalculator, calculate_homography_matrix, pixel_to_real, calculate_speed, scale_homography
 
-__all__ = ['SpeedCalculator', 'calculate_homography_matrix', 'pixel_to_real', 'calculate_speed']
+__all__ = ['SpeedCalculator', 'calculate_homography_matrix', 'pixel_to_real', 'calculate_speed', 'scale_homography']
 
@@ -33,6 +33,23 @@ def calculate_homography_matrix(pixel_points: np.ndarray, real_points: np.ndarra
     return H
 
 
+def scale_homography(homography_matrix: np.ndarray, scale_x: float, scale_y: float) -> np.ndarray:
+    """
+    Adaptar una homografía calibrada en resolución nativa a frames reescalados
+    
+    Args:
+        homography_matrix: Matriz de homografía (3x3) calibrada en píxeles nativos
+        scale_x: Factor ancho nativo / ancho del frame reescalado
+        scale_y: Factor alto nativo / alto del frame reescalado
+        
+    Returns:
+        Matriz de homografía (3x3) que recibe píxeles del frame reescalado
+    """
+    if scale_x == 1.0 and scale_y == 1.0:
+        return homography_matrix
+    return homography_matrix @ np.diag([scale_x, scale_y, 1.0])
+
+
 def pixel_to_real(pixel_point: np.ndarray, homography_matrix: np.ndarray) -> np.ndarray:
     """
     Convertir punto de píxeles a coordenadas reales
@@ -50,6 +67,22 @@ def pixel_to_real(pixel_point: np.ndarray, homography_matrix: np.ndarray) -> np.
     return real_point
 
 
+def pixels_to_real(pixel_points: np.ndarray, homography_matrix: np.ndarray) -> np.ndarray:
+    """
+    Convertir varios puntos de píxeles a coordenadas reales en una sola operación
+    
+    Args:
+        pixel_points: Array de puntos en píxeles (N, 2)
+        homography_matrix: Matriz de homografía (3x3)
+        
+    Returns:
+        Array de puntos en coordenadas reales (N, 2) en metros
+    """
+    pixel_points = np.asarray(pixel_points, dtype=np.float64).reshape(-1, 2)
+    real_homogeneous = pixel_points @ homography_matrix[:, :2].T + homography_matrix[:, 2]
+    return real_homogeneous[:, :2] / real_homogeneous[:, 2:3]
+
+
 def calculate_speed(bbox1: List[float], bbox2: List[float], 
                     homography_matrix: np.ndarray,
                     time_delta: float) -> float:
@@ -134,48 +167,63 @@ class SpeedCalculator:
         Returns:
             Velocidad en km/h o None si no se puede calcular
         """
-        if self.homography_matrix is None:
-            logger.warning("Matriz de homografía no configurada")
-            return None
-        
-        # Inicializar historial si no existe
-        if track_id not in self.track_histories:
-            self.track_histories[track_id] = []
-        
-        # Agregar punto actual
-        self.track_histories[track_id].append({
-            'bbox': bbox,
-            'timestamp': timestamp
-        })
-        
-        # Mantener solo ventana reciente
-        if len(self.track_histories[track_id]) > self.filter_window * 2:
-            self.track_histories[track_id] = self.track_histories[track_id][-self.filter_window * 2:]
-        
-        history = self.track_histories[track_id]
+        speed = self.calculate_speeds([track_id], np.asarray([bbox]), timestamp)[0]
+        return None if np.isnan(speed) else float(speed)
+    
+    def calculate_speeds(self, track_ids, boxes: np.ndarray, timestamp: float) -> np.ndarray:
+        """
+        Calcular la velocidad de todos los tracks de un frame
         
-        # Necesitamos al menos 2 puntos
-        if len(history) < 2:
-            return None
+        La homografía se aplica a todos los centros en una sola operación y el
+        historial guarda posiciones reales, así no se reproyecta en cada frame.
         
-        # Calcular velocidad usando puntos separados por filter_window
-        if len(history) >= self.filter_window:
-            idx1 = len(history) - self.filter_window
-            idx2 = len(history) - 1
-            
-            bbox1 = history[idx1]['bbox']
-            bbox2 = history[idx2]['bbox']
-            time_delta = history[idx2]['timestamp'] - history[idx1]['timestamp']
-            
-            speed = calculate_speed(bbox1, bbox2, self.homography_matrix, time_delta)
+        Args:
+            track_ids: IDs de los tracks (N,)
+            boxes: Bounding boxes actuales (N, 4) [x1, y1, x2, y2]
+            timestamp: Timestamp del frame
             
-            # Filtrar velocidades muy bajas o erróneas
-            if speed < 0 or speed > 200:  # Velocidad máxima razonable
-                return None
+        Returns:
+            Velocidades en km/h (N,), NaN donde no se puede calcular
+        """
+        speeds = np.full(len(track_ids), np.nan)
+        if self.homography_matrix is None:
+            logger.warning("Matriz de homografía no configurada")
+            return speeds
+        if len(track_ids) == 0:
+            return speeds
+        
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        real_points = pixels_to_real(centers, self.homography_matrix)
+        
+        # Índices de los tracks con historial suficiente y sus puntos extremos
+        indices, start_points, start_times = [], [], []
+        max_history = self.filter_window * 2
+        for i, track_id in enumerate(track_ids):
+            history = self.track_histories.setdefault(int(track_id), [])
+            history.append({'point': real_points[i], 'timestamp': timestamp})
+            if len(history) > max_history:
+                del history[:-max_history]
             
-            return speed
-        
-        return None
+            # Calcular velocidad usando puntos separados por filter_window
+            if len(history) >= max(2, self.filter_window):
+                first = history[len(history) - self.filter_window]
+                indices.append(i)
+                start_points.append(first['point'])
+                start_times.append(first['timestamp'])
+        
+        if not indices:
+            return speeds
+        
+        distance_m = np.linalg.norm(real_points[indices] - np.array(start_points), axis=1)
+        time_delta = timestamp - np.array(start_times)
+        # m/s -> km/h; sin tiempo transcurrido la velocidad es 0
+        track_speeds = np.where(time_delta > 0, distance_m / np.maximum(time_delta, 1e-9) * 3.6, 0.0)
+        
+        # Filtrar velocidades erróneas (velocidad máxima razonable)
+        track_speeds[(track_speeds < 0) | (track_speeds > 200)] = np.nan
+        speeds[indices] = track_speeds
+        return speeds
     
     def get_average_speed(self, track_id: int) -> Optional[float]:
         """Obtener velocidad promedio de un track"""
@@ -186,19 +234,16 @@ class SpeedCalculator:
         if len(history) < 2:
             return None
         
-        speeds = []
-        for i in range(1, len(history)):
-            bbox1 = history[i-1]['bbox']
-            bbox2 = history[i]['bbox']
-            time_delta = history[i]['timestamp'] - history[i-1]['timestamp']
-            
-            if time_delta > 0:
-                speed = calculate_speed(bbox1, bbox2, self.homography_matrix, time_delta)
-                if 0 < speed < 200:
-                    speeds.append(speed)
+        points = np.array([h['point'] for h in history])
+        times = np.array([h['timestamp'] for h in history])
+        distances = np.linalg.norm(np.diff(points, axis=0), axis=1)
+        time_deltas = np.diff(times)
+        valid = time_deltas > 0
+        speeds = distances[valid] / time_deltas[valid] * 3.6
+        speeds = speeds[(speeds > 0) & (speeds < 200)]
         
         if len(speeds) > 0:
-            return np.mean(speeds)
+            return float(np.mean(speeds))
         
         return None
     
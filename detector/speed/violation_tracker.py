@@ -0,0 +1,128 @@
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Violation:
+    """Infracción de velocidad abierta de un track, acumulada mientras dure"""
+
+    def __init__(self, track: Dict[str, Any], timestamp: float):
+        self.track_id = track['track_id']
+        self.start_time = timestamp
+        self.end_time = timestamp
+        self.samples = 0
+        self.speed_sum = 0.0
+        self.max_speed = 0.0
+
+        # Mejor evidencia: observación con el bbox más grande (vehículo más cerca de la cámara)
+        self.best_track: Dict[str, Any] = track
+        self.best_time = timestamp
+        self.best_area = -1.0
+        self.evidence_frame: Optional[np.ndarray] = None
+
+    @property
+    def avg_speed(self) -> float:
+        return self.speed_sum / self.samples if self.samples else 0.0
+
+    def add(self, track: Dict[str, Any], speed_kmh: float, timestamp: float) -> bool:
+        """
+        Sumar una observación por encima del límite
+
+        Returns:
+            True si la observación es la nueva mejor evidencia
+        """
+        self.samples += 1
+        self.speed_sum += speed_kmh
+        self.max_speed = max(self.max_speed, speed_kmh)
+        self.end_time = timestamp
+
+        x1, y1, x2, y2 = track['bbox']
+        area = (x2 - x1) * (y2 - y1)
+        if area > self.best_area:
+            self.best_area = area
+            self.best_track = track
+            self.best_time = timestamp
+            return True
+        return False
+
+
+class ViolationTracker:
+    """Máquina de estados por track: una infracción por vehículo en lugar de una por frame"""
+
+    def __init__(self, speed_limit: float, tolerance: float = 1.1, max_missing: int = 10,
+                 min_samples: int = 1):
+        """
+        Inicializar tracker de infracciones
+
+        Args:
+            speed_limit: Límite de velocidad en km/h
+            tolerance: Factor sobre el límite a partir del cual hay infracción
+            max_missing: Frames procesados sin ver un track para darlo por terminado
+                (debe coincidir con el max_age del tracker, que puede reactivar el track hasta entonces)
+            min_samples: Observaciones por encima del límite necesarias para emitir la infracción
+        """
+        self.speed_limit = speed_limit
+        self.tolerance = tolerance
+        self.max_missing = max_missing
+        self.min_samples = max(1, min_samples)
+
+        self.open_violations: Dict[int, Violation] = {}
+        self._last_seen: Dict[int, int] = {}
+        self.frame_count = 0
+
+        self.opened = 0
+        self.emitted = 0
+
+    def update(self, tracked: List[Tuple[Dict[str, Any], Optional[float]]], timestamp: float,
+               evidence_getter: Optional[Callable[[], Optional[np.ndarray]]] = None
+               ) -> Tuple[List[Violation], List[int]]:
+        """
+        Procesar los tracks de un frame
+
+        Args:
+            tracked: Lista de (track, velocidad) del frame
+            timestamp: Momento de captura del frame
+            evidence_getter: Función que retorna el frame de evidencia (se llama solo si hace falta)
+
+        Returns:
+            Tupla (infracciones cerradas en este frame, IDs de tracks terminados)
+        """
+        self.frame_count += 1
+        threshold = self.speed_limit * self.tolerance
+
+        for track, speed_kmh in tracked:
+            track_id = track['track_id']
+            self._last_seen[track_id] = self.frame_count
+            if not speed_kmh or speed_kmh <= threshold:
+                continue
+
+            violation = self.open_violations.get(track_id)
+            if violation is None:
+                violation = Violation(track, timestamp)
+                self.open_violations[track_id] = violation
+                self.opened += 1
+            if violation.add(track, speed_kmh, timestamp) and evidence_getter is not None:
+                violation.evidence_frame = evidence_getter()
+
+        # Tracks que dejaron de verse (terminados o fuera de la región de interés)
+        ended = [track_id for track_id, last in self._last_seen.items()
+                 if self.frame_count - last > self.max_missing]
+        closed = []
+        for track_id in ended:
+            del self._last_seen[track_id]
+            violation = self.open_violations.pop(track_id, None)
+            if violation is not None and violation.samples >= self.min_samples:
+                closed.append(violation)
+
+        self.emitted += len(closed)
+        return closed, ended
+
+    def flush(self) -> List[Violation]:
+        """Cerrar todas las infracciones abiertas (fin del video o del procesamiento)"""
+        closed = [v for v in self.open_violations.values() if v.samples >= self.min_samples]
+        self.open_violations.clear()
+        self._last_seen.clear()
+        self.emitted += len(closed)
+        return closed
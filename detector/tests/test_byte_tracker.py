@@ -0,0 +1,99 @@
+"""
+Pruebas del tracker ByteTrack
+
+Uso:
+  python -m pytest detector/tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from detector.detection.detections import Detections
+from detector.tracking.byte_tracker import ByteTracker
+
+FPS = 10.0
+
+
+def _detections(boxes, scores=None) -> Detections:
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    scores = np.full(len(boxes), 0.9) if scores is None else scores
+    return Detections(boxes, scores, np.full(len(boxes), 2), {2: 'car'})
+
+
+def _cars(frame: int, count: int = 3) -> list:
+    """Autos en carriles separados, avanzando 4 px por frame"""
+    return [[20 + 4 * frame, 100 + 60 * lane, 60 + 4 * frame, 130 + 60 * lane] for lane in range(count)]
+
+
+@pytest.mark.parametrize('matcher', ['greedy', 'hungarian'])
+def test_ids_are_stable_across_a_gap(matcher):
+    tracker = ByteTracker(min_hits=1, matcher=matcher)
+    ids_before = None
+    for frame in range(10):
+        tracks = tracker.update(_detections(_cars(frame)), frame / FPS)
+        ids_before = tracks.track_ids.tolist()
+    assert len(ids_before) == 3
+
+    # Oclusión de 5 frames: los tracks quedan perdidos y el filtro sigue prediciendo
+    for frame in range(10, 15):
+        assert len(tracker.update(_detections([]), frame / FPS)) == 0
+    assert len(tracker.lost_tracks) == 3
+
+    tracks = tracker.update(_detections(_cars(15)), 15 / FPS)
+    assert tracks.track_ids.tolist() == ids_before
+    assert tracker.next_id == 4
+
+
+def test_hungarian_maximizes_total_iou_where_greedy_does_not():
+    # El mejor par individual (d0, t0) deja a d1 sin track; la asignación cruzada suma más IoU
+    iou = np.array([[0.9, 0.8],
+                    [0.7, 0.0]])
+    greedy = ByteTracker(matcher='greedy')._match_greedy(iou, 0.3)
+    hungarian = ByteTracker(matcher='hungarian')._match_hungarian(iou, 0.3)
+
+    assert sorted(zip(*map(np.ndarray.tolist, greedy))) == [(0, 0)]
+    assert sorted(zip(*map(np.ndarray.tolist, hungarian))) == [(0, 1), (1, 0)]
+
+
+def test_matchers_respect_threshold():
+    rng = np.random.default_rng(0)
+    iou = rng.random((12, 9))
+    for tracker in (ByteTracker(matcher='greedy'), ByteTracker(matcher='hungarian')):
+        det_idx, trk_idx = (tracker._match_greedy if tracker.matcher == 'greedy'
+                            else tracker._match_hungarian)(iou, 0.5)
+        assert len(set(det_idx.tolist())) == len(det_idx)
+        assert len(set(trk_idx.tolist())) == len(trk_idx)
+        assert (iou[det_idx, trk_idx] > 0.5).all()
+
+
+def test_unknown_matcher_is_rejected():
+    with pytest.raises(ValueError):
+        ByteTracker(matcher='lapjv')
+
+
+def test_low_confidence_detections_keep_tracks_alive():
+    tracker = ByteTracker(min_hits=1)
+    for frame in range(5):
+        tracker.update(_detections(_cars(frame, count=1)), frame / FPS)
+
+    # Vehículo parcialmente ocluido: solo la segunda asociación lo empareja
+    tracks = tracker.update(_detections(_cars(5, count=1), scores=np.array([0.3])), 5 / FPS)
+    assert tracks.track_ids.tolist() == [1]
+    # Una detección de baja confianza sin track no crea uno nuevo
+    tracks = tracker.update(_detections(_cars(6, count=1) + [[400, 400, 440, 430]],
+                                        scores=np.array([0.9, 0.3])), 6 / FPS)
+    assert tracks.track_ids.tolist() == [1]
+    assert tracker.next_id == 2
+
+
+@pytest.mark.parametrize('remove_unconfirmed, survives', [(False, True), (True, False)])
+def test_tracks_seen_once(remove_unconfirmed, survives):
+    tracker = ByteTracker(min_hits=1, remove_unconfirmed=remove_unconfirmed)
+    tracker.update(_detections(_cars(0, count=1)), 0.0)
+    tracker.update(_detections([]), 1 / FPS)
+    assert (len(tracker.lost_tracks) == 1) == survives
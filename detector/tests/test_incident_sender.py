@@ -0,0 +1,125 @@
+"""
+Pruebas del envío de incidentes con spool local
+
+Uso:
+  python -m pytest detector/tests
+"""
+
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from detector.utils.incident_sender import IncidentSender
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, payload=None):
+        self.status_code = status_code
+        self._payload = payload or {}
+        self.text = json.dumps(self._payload)
+
+    def json(self):
+        return self._payload
+
+
+class FakeBackend:
+    """Backend en memoria: idempotente por idempotency_key y con validación como pydantic (422)"""
+
+    def __init__(self):
+        self.incidents = {}
+        self.available = True
+
+    @staticmethod
+    def _valid(incident: dict) -> bool:
+        return len(incident.get('bbox', [])) == 4
+
+    def post(self, path: str, payload) -> FakeResponse:
+        if not self.available:
+            return FakeResponse(503)
+        if path == '/api/incidents/bulk':
+            if not all(self._valid(incident) for incident in payload['incidents']):
+                return FakeResponse(422, {'detail': 'bbox inválido'})
+            created = duplicates = 0
+            for incident in payload['incidents']:
+                if incident['idempotency_key'] in self.incidents:
+                    duplicates += 1
+                else:
+                    self.incidents[incident['idempotency_key']] = incident
+                    created += 1
+            return FakeResponse(200, {'created': created, 'duplicates': duplicates, 'rejected': []})
+        if not self._valid(payload):
+            return FakeResponse(422, {'detail': 'bbox inválido'})
+        self.incidents.setdefault(payload['idempotency_key'], payload)
+        return FakeResponse(200, payload)
+
+
+def _sender(tmp_path, backend: FakeBackend) -> IncidentSender:
+    sender = IncidentSender('http://backend', camera_id=1, spool_dir=str(tmp_path), flush_interval=0.01)
+    sender._post = backend.post
+    return sender
+
+
+def _incidents(count: int, start: int = 0) -> list:
+    return [{'camera_id': 1, 'incident_type': 'speed', 'bbox': [0, 0, 10, 10], 'track_id': start + i}
+            for i in range(count)]
+
+
+def _read_jsonl(path: str) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_invalid_incident_does_not_reject_its_batch(tmp_path):
+    backend = FakeBackend()
+    sender = _sender(tmp_path, backend)
+    incidents = _incidents(5)
+    incidents[2]['bbox'] = [0, 0, 10]
+    sender.submit(incidents)
+    sender.stop()
+
+    assert len(backend.incidents) == 4
+    rejected = _read_jsonl(f'{sender.spool_path}.rejected')
+    assert [incident['track_id'] for incident in rejected] == [2]
+    assert not os.path.exists(sender.spool_path)
+
+
+def test_spool_replay_after_restart_does_not_duplicate(tmp_path):
+    backend = FakeBackend()
+    backend.available = False
+    sender = _sender(tmp_path, backend)
+    sender.submit(_incidents(7))
+    sender.stop()
+    assert len(_read_jsonl(sender.spool_path)) == 7
+    assert backend.incidents == {}
+
+    # Reinicio con el backend disponible: el spool se reenvía al arrancar
+    backend.available = True
+    restarted = _sender(tmp_path, backend)
+    restarted.batch_size = 3
+    restarted.submit(_incidents(1, start=7))
+    restarted.stop()
+    assert sorted(incident['track_id'] for incident in backend.incidents.values()) == list(range(8))
+    assert restarted.replayed == 7
+    assert not os.path.exists(restarted.spool_path)
+
+
+def test_interrupted_replay_is_resumed_without_duplicates(tmp_path):
+    backend = FakeBackend()
+    sender = _sender(tmp_path, backend)
+    incidents = _incidents(6)
+    for incident in incidents:
+        incident['idempotency_key'] = f"key-{incident['track_id']}"
+    # Corte a mitad de un reenvío: los primeros 4 llegaron, el archivo .replay quedó completo
+    for incident in incidents[:4]:
+        backend.incidents[incident['idempotency_key']] = incident
+    sender._append(f'{sender.spool_path}.replay', incidents)
+
+    sender._start()
+    sender.stop()
+    assert len(backend.incidents) == 6
+    assert sender.duplicates == 4
+    assert not os.path.exists(f'{sender.spool_path}.replay')
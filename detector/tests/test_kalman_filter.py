@@ -0,0 +1,77 @@
+"""
+Pruebas del filtro de Kalman vectorizado
+
+Uso:
+  python -m pytest detector/tests
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from detector.tracking.kalman_filter import KalmanFilter, cxcywh_to_xyxy, xyxy_to_cxcywh
+
+
+def test_box_conversions_round_trip():
+    boxes = np.array([[10, 20, 50, 80], [0, 0, 4, 2]], dtype=np.float64)
+    np.testing.assert_allclose(xyxy_to_cxcywh(boxes), [[30, 50, 40, 60], [2, 1, 4, 2]])
+    np.testing.assert_allclose(cxcywh_to_xyxy(xyxy_to_cxcywh(boxes)), boxes)
+
+
+def test_initiate_and_predict_without_velocity():
+    kf = KalmanFilter()
+    boxes = np.array([[10, 20, 50, 80], [100, 100, 120, 110]])
+    mean, covariance = kf.initiate(boxes)
+    assert mean.shape == (2, 8) and covariance.shape == (2, 8, 8)
+    np.testing.assert_allclose(mean[:, 4:], 0)
+
+    predicted, predicted_cov = kf.predict(mean, covariance, dt=0.1)
+    np.testing.assert_allclose(kf.boxes(predicted), boxes)
+    # La incertidumbre crece al predecir
+    assert (np.diagonal(predicted_cov, axis1=1, axis2=2) > np.diagonal(covariance, axis1=1, axis2=2)).all()
+
+
+def test_learns_constant_velocity_independently_per_track():
+    kf = KalmanFilter()
+    velocities = np.array([[50.0, 0.0], [-20.0, 30.0], [0.0, 0.0]])  # px/s
+    start = np.array([[0, 0, 40, 30], [200, 100, 240, 130], [300, 300, 340, 330]], dtype=np.float64)
+    dt = 0.1
+
+    mean, covariance = kf.initiate(start)
+    for step in range(1, 30):
+        mean, covariance = kf.predict(mean, covariance, dt)
+        shift = np.tile(velocities * dt * step, 2)
+        mean, covariance = kf.update(mean, covariance, start + shift)
+
+    np.testing.assert_allclose(mean[:, 4:6], velocities, atol=1.0)
+    np.testing.assert_allclose(mean[:, 6:], 0, atol=1.0)
+
+    # La predicción avanza según el tiempo transcurrido (frames salteados)
+    predicted, _ = kf.predict(mean, covariance, dt=0.5)
+    expected = start + np.tile(velocities * (dt * 29 + 0.5), 2)
+    np.testing.assert_allclose(kf.boxes(predicted), expected, atol=1.0)
+
+
+def test_batched_update_matches_single_track_updates():
+    kf = KalmanFilter()
+    rng = np.random.default_rng(1)
+    corners = rng.uniform(0, 500, (6, 2))
+    boxes = np.hstack([corners, corners + rng.uniform(10, 80, (6, 2))])
+    mean, covariance = kf.predict(*kf.initiate(boxes), dt=0.1)
+    measurements = boxes + rng.normal(0, 2, boxes.shape)
+
+    batched_mean, batched_cov = kf.update(mean, covariance, measurements)
+    for i in range(len(boxes)):
+        single_mean, single_cov = kf.update(mean[i:i + 1], covariance[i:i + 1], measurements[i:i + 1])
+        np.testing.assert_allclose(batched_mean[i], single_mean[0])
+        np.testing.assert_allclose(batched_cov[i], single_cov[0])
+
+
+def test_empty_inputs():
+    kf = KalmanFilter()
+    mean, covariance = np.zeros((0, 8)), np.zeros((0, 8, 8))
+    assert kf.predict(mean, covariance, 0.1)[0].shape == (0, 8)
+    assert kf.update(mean, covariance, np.zeros((0, 4)))[0].shape == (0, 8)
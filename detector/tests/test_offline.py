@@ -0,0 +1,60 @@
+"""
+Pruebas del procesamiento offline por tramos
+
+Uso:
+  python -m pytest detector/tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+pytest.importorskip('torch')
+pytest.importorskip('ultralytics')
+
+from detector.detection.detections import Detections
+from detector.main import VideoProcessor
+from detector.offline import merge_split_violations
+
+FPS = 10.0
+SPEED_PX_PER_FRAME = 2.5  # Con homografía identidad (1 px = 1 m): 90 km/h, límite 50
+
+
+def _processor(tmp_path) -> VideoProcessor:
+    return VideoProcessor(camera_id=1, detector=object(), homography_matrix=np.eye(3), speed_limit=50.0,
+                          load_camera_info=False, time_origin=0.0, spool_dir=str(tmp_path))
+
+
+def _run(processor: VideoProcessor, frames: range, record_from: int) -> list:
+    """Procesar un vehículo a velocidad constante, como el bucle de _process_chunk"""
+    incidents = []
+    for idx in frames:
+        x = 10 + SPEED_PX_PER_FRAME * idx
+        detections = Detections([[x, 100, x + 40, 130]], [0.9], [2], {2: 'car'})
+        _, closed = processor.track_stage(detections, idx / FPS, record_violations=idx >= record_from)
+        incidents.extend(closed)
+    return incidents + processor.flush_violations()
+
+
+def test_violation_across_chunk_boundary_counts_overlap_once(tmp_path):
+    start, overlap, end = 20, 10, 40
+
+    single = _run(_processor(tmp_path), range(0, end), record_from=0)
+    # Tramo anterior [0, start) y tramo actual con calentamiento [start - overlap, end)
+    previous = _run(_processor(tmp_path), range(0, start), record_from=0)
+    current = _run(_processor(tmp_path), range(start - overlap, end), record_from=start)
+    assert current[0]['extra_data']['start_stream_time'] >= start / FPS
+
+    merged = merge_split_violations(previous + current)
+
+    assert len(single) == 1 and len(merged) == 1
+    expected, result = single[0]['extra_data'], merged[0]['extra_data']
+    assert result['samples'] == expected['samples']
+    assert result['avg_speed_kmh'] == pytest.approx(expected['avg_speed_kmh'], rel=1e-3)
+    assert result['max_speed_kmh'] == pytest.approx(expected['max_speed_kmh'], rel=1e-3)
+    assert result['start_stream_time'] == expected['start_stream_time']
+    assert result['end_stream_time'] == expected['end_stream_time']
@@ -0,0 +1,75 @@
+"""
+Pruebas del pipeline por etapas
+
+Uso:
+  python -m pytest detector/tests
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from detector.utils.pipeline import FramePipeline
+from detector.utils.rate_controller import AdaptiveRateController
+
+DETECT_TIME = 0.02
+
+
+class FakeProcessor:
+    """Etapas de VideoProcessor con una detección lenta y el resto instantáneo"""
+
+    def detect_stage(self, frame, timestamp):
+        time.sleep(DETECT_TIME)
+        return []
+
+    def track_stage(self, detections, timestamp, frame):
+        return [], []
+
+    def output_plan(self):
+        return True, False
+
+    def annotate_stage(self, frame, tracked):
+        return frame.copy()
+
+    def encode_stage(self, frame):
+        return None
+
+    def publish_stage(self, incidents, jpeg_bytes):
+        pass
+
+    def finish_stage(self, annotated_frame, draw_overlay=True):
+        return annotated_frame
+
+
+def test_pipeline_reports_stage_times_and_releases_frames():
+    timings, released = [], []
+    pipeline = FramePipeline(FakeProcessor(), drop_when_full=False, release_frame=released.append,
+                             on_processed=lambda stage_times, ts: timings.append((stage_times, ts))).start()
+    frames = [np.full((4, 4, 3), i, dtype=np.uint8) for i in range(5)]
+    results = []
+    for i, frame in enumerate(frames):
+        pipeline.submit(frame, float(i), on_result=results.append)
+    pipeline.stop(on_result=results.append)
+
+    assert len(results) == len(frames)
+    assert [ts for _, ts in timings] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    for stage_times, _ in timings:
+        assert len(stage_times) == 4
+        assert max(stage_times) == stage_times[0] >= DETECT_TIME * 0.9
+    # Las anotaciones son copias: todos los frames de la captura se devuelven
+    assert [id(frame) for frame in released] == [id(frame) for frame in frames]
+
+
+def test_rate_controller_skips_with_pipeline_timing():
+    controller = AdaptiveRateController(source_fps=25, target_fps=25, latency_budget=0.5)
+    # Cuello de botella de 100 ms: hace falta procesar 1 de cada 3 frames para seguir el ritmo
+    for _ in range(20):
+        controller.record(0.1, latency=0.3, waiting=0.0)
+    assert controller.skip == 3
+    # Latencia sobre el presupuesto por frames esperando en cola: se salta más
+    controller.record(0.1, latency=1.0, waiting=0.8)
+    assert controller.skip == 4
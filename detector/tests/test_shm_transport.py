@@ -0,0 +1,86 @@
+"""
+Pruebas del transporte de frames por memoria compartida (detector -> backend)
+
+Uso:
+  python -m pytest detector/tests
+"""
+
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend'))
+
+from detector.utils.shm_transport import SharedFrameWriter
+from app.services.shared_frames import SharedFrameReader
+
+
+def _frame(value: int, shape=(36, 64, 3)) -> np.ndarray:
+    frame = np.zeros(shape, dtype=np.uint8)
+    frame[..., 0] = value
+    frame[..., 1] = np.arange(shape[1], dtype=np.uint8)
+    return frame
+
+
+def test_round_trip_returns_latest_frame(tmp_path):
+    writer = SharedFrameWriter(camera_id=3, shm_dir=str(tmp_path), num_slots=3)
+    reader = SharedFrameReader(writer.path)
+    assert reader.read(np.copy) is None
+
+    for value in range(5):
+        writer.publish(_frame(value))
+        result = reader.read(np.copy)
+        assert result is not None
+        frame, timestamp = result
+        assert np.array_equal(frame, _frame(value))
+        assert timestamp > 0
+    writer.stop()
+
+
+def test_reader_skips_slot_being_written(tmp_path):
+    writer = SharedFrameWriter(camera_id=3, shm_dir=str(tmp_path), num_slots=2)
+    reader = SharedFrameReader(writer.path)
+    writer.publish(_frame(1))
+
+    # Seqlock impar: el escritor está a mitad del frame
+    slot = writer._slots[0]
+    slot['seq'] = slot['seq'] + 1
+    assert reader.read(np.copy) is None
+    slot['seq'] = slot['seq'] + 1
+    assert reader.read(np.copy) is None  # Ya no coincide con write_seq (slot reutilizado)
+    writer.stop()
+
+
+def test_reader_discards_frame_overwritten_while_consumed(tmp_path):
+    writer = SharedFrameWriter(camera_id=3, shm_dir=str(tmp_path), num_slots=2)
+    reader = SharedFrameReader(writer.path)
+    writer.publish(_frame(1))
+    writer.publish(_frame(2))
+
+    def consume_while_writer_wraps(frame: np.ndarray) -> np.ndarray:
+        copy = frame.copy()
+        # El escritor da la vuelta al ring y reutiliza el slot que se está leyendo
+        writer.publish(_frame(3))
+        writer.publish(_frame(4))
+        return copy
+
+    assert reader.read(consume_while_writer_wraps, retries=1) is None
+    frame, _ = reader.read(np.copy)
+    assert np.array_equal(frame, _frame(4))
+    writer.stop()
+
+
+def test_reader_reopens_recreated_buffer(tmp_path):
+    writer = SharedFrameWriter(camera_id=3, shm_dir=str(tmp_path), num_slots=2)
+    reader = SharedFrameReader(writer.path)
+    writer.publish(_frame(1))
+    assert reader.read(np.copy) is not None
+
+    # Frame más grande: el escritor recrea el archivo y el lector debe seguirlo
+    writer.publish(_frame(2, shape=(72, 128, 3)))
+    frame, _ = reader.read(np.copy)
+    assert frame.shape == (72, 128, 3)
+    writer.stop()
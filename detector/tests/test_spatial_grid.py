@@ -0,0 +1,93 @@
+"""
+Pruebas de la grilla espacial y de la asociación dispersa del tracker
+
+Uso:
+  python -m pytest detector/tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from detector.detection.detections import Detections
+from detector.tracking.byte_tracker import ByteTracker
+from detector.tracking.spatial_grid import candidate_pairs, pair_iou
+
+
+def _boxes(rng, count: int, extent: float = 2000.0) -> np.ndarray:
+    corners = rng.uniform(0, extent, (count, 2))
+    sizes = rng.uniform(15, 120, (count, 2))
+    return np.hstack([corners, corners + sizes])
+
+
+def test_candidates_include_every_overlapping_pair():
+    rng = np.random.default_rng(0)
+    boxes1, boxes2 = _boxes(rng, 300), _boxes(rng, 250)
+    # Un box muy grande (vehículo cercano) agranda las celdas sin perder pares
+    boxes2[0] = [100, 100, 1500, 900]
+
+    idx1, idx2 = candidate_pairs(boxes1, boxes2)
+    dense = ByteTracker()._compute_iou(boxes1, boxes2)
+    overlapping = set(zip(*np.nonzero(dense > 0)))
+    assert overlapping <= set(zip(idx1.tolist(), idx2.tolist()))
+    assert len(idx1) < dense.size // 10
+    np.testing.assert_allclose(pair_iou(boxes1, boxes2, idx1, idx2), dense[idx1, idx2])
+
+
+def test_candidates_are_unique_and_sorted():
+    rng = np.random.default_rng(1)
+    boxes1, boxes2 = _boxes(rng, 50, extent=300), _boxes(rng, 40, extent=300)
+    idx1, idx2 = candidate_pairs(boxes1, boxes2, cell_size=10.0)
+    keys = idx1 * len(boxes2) + idx2
+    assert (np.diff(keys) > 0).all()
+
+
+def test_empty_inputs():
+    idx1, idx2 = candidate_pairs(np.zeros((0, 4)), np.array([[0, 0, 10, 10]]))
+    assert len(idx1) == len(idx2) == 0
+
+
+@pytest.mark.parametrize('matcher', ['greedy', 'hungarian'])
+def test_sparse_and_dense_association_agree(matcher):
+    rng = np.random.default_rng(2)
+    trackers = _boxes(rng, 400)
+    detections = np.vstack([trackers[:350] + rng.normal(0, 6, (350, 4)), _boxes(rng, 30)])
+    tracker = ByteTracker(matcher=matcher)
+
+    dense, dense_dets, dense_trks = tracker._associate_detections_to_trackers(
+        tracker._compute_iou(detections, trackers), detections, trackers, 0.3)
+    sparse, sparse_dets, sparse_trks = tracker._associate_sparse(detections, trackers, 0.3)
+
+    iou = tracker._compute_iou(detections, trackers)
+    if matcher == 'greedy':
+        assert sorted(sparse) == sorted(dense)
+        assert (sparse_dets, sparse_trks) == (dense_dets, dense_trks)
+    else:
+        # Puede haber varias asignaciones óptimas: comparar cantidad e IoU total
+        assert len(sparse) == len(dense)
+        assert sum(iou[d, t] for d, t in sparse) == pytest.approx(sum(iou[d, t] for d, t in dense))
+
+
+def test_tracker_ids_do_not_depend_on_dense_or_sparse_path():
+    rng = np.random.default_rng(3)
+    start = _boxes(rng, 200)
+    velocity = rng.uniform(-3, 3, (200, 2))
+    # Cada vehículo falta en ~10% de los frames (oclusiones)
+    visible = rng.random((15, 200)) > 0.1
+    visible[0] = True
+
+    results = []
+    for dense_max_pairs in (10 ** 9, 0):
+        tracker = ByteTracker(min_hits=1, dense_max_pairs=dense_max_pairs)
+        ids = []
+        for frame in range(15):
+            boxes = (start + np.tile(velocity * frame, 2))[visible[frame]]
+            detections = Detections(boxes, np.full(len(boxes), 0.9), np.full(len(boxes), 2), {2: 'car'})
+            ids.append(tracker.update(detections, frame / 10).track_ids.tolist())
+        results.append(ids)
+    assert results[0] == results[1]
+    assert results[0][-1]
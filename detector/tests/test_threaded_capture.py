@@ -0,0 +1,102 @@
+"""
+Pruebas de la captura en segundo plano
+
+Uso:
+  python -m pytest detector/tests
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from detector.utils.threaded_capture import ThreadedCapture
+
+SHAPE = (48, 64, 3)
+
+
+class FastCapture:
+    """Captura falsa que, como FFmpegCapture, escribe sobre buffers en rotación o sobre el array dado"""
+
+    def __init__(self, num_buffers: int = 2):
+        self._buffers = np.zeros((num_buffers,) + SHAPE, dtype=np.uint8)
+        self._next_buffer = 0
+        self.frames_read = 0
+
+    def read(self, image=None):
+        time.sleep(0.001)
+        if image is None:
+            image = self._buffers[self._next_buffer]
+            self._next_buffer = (self._next_buffer + 1) % len(self._buffers)
+        self.frames_read += 1
+        # Escritura por filas, como un frame que llega por partes desde el pipe
+        for row in range(SHAPE[0]):
+            image[row] = self.frames_read % 256
+        return True, image
+
+    def get(self, prop_id):
+        return 0.0
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+
+def _consume_slowly(capture: ThreadedCapture, frames: int, release: bool) -> list:
+    """Consumidor más lento que la captura: verifica que el frame no cambie mientras lo usa"""
+    torn = []
+    for _ in range(frames):
+        ret, frame, _ = capture.read_latest(timeout=1.0)
+        assert ret
+        value = int(frame[0, 0, 0])
+        time.sleep(0.03)  # Detección + tracking
+        if not (frame == value).all():
+            torn.append(value)
+        if release:
+            capture.release_frame(frame)
+    return torn
+
+
+def test_slow_consumer_frames_are_not_overwritten():
+    capture = ThreadedCapture(FastCapture(), buffer_size=2).start()
+    try:
+        assert _consume_slowly(capture, frames=10, release=True) == []
+        assert capture.frames_captured > 5 * capture.frames_delivered
+    finally:
+        capture.release()
+
+
+def test_frames_kept_by_consumer_are_not_overwritten():
+    capture = ThreadedCapture(FastCapture(), buffer_size=2).start()
+    try:
+        kept = []
+        for _ in range(5):
+            ret, frame, _ = capture.read_latest(timeout=1.0)
+            assert ret
+            kept.append((frame, int(frame[0, 0, 0])))
+            time.sleep(0.01)
+        time.sleep(0.05)
+        assert all((frame == value).all() for frame, value in kept)
+        assert len({id(frame) for frame, _ in kept}) == len(kept)
+    finally:
+        capture.release()
+
+
+def test_released_buffers_are_reused():
+    capture = ThreadedCapture(FastCapture(), buffer_size=2).start()
+    try:
+        seen = set()
+        for _ in range(20):
+            ret, frame, _ = capture.read_latest(timeout=1.0)
+            assert ret
+            seen.add(id(frame))
+            capture.release_frame(frame)
+        # Buffer circular + frame entregado + el que se está leyendo
+        assert len(seen) <= capture.buffer_size + 3
+    finally:
+        capture.release()
@@ -0,0 +1,101 @@
+"""
+Pruebas del formato binario del stream de tracks (detector -> backend)
+
+Uso:
+  python -m pytest detector/tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend'))
+
+from detector.detection.detections import Detections
+from detector.utils.track_stream import encode_tracks
+from app.services.track_stream import decode_track_message, tracks_to_json
+
+
+def _tracks() -> Detections:
+    return Detections(
+        [[10, 20, 50, 60], [100, 120, 180, 200], [5, 5, 15, 15]],
+        [0.9, 0.75, 0.6],
+        [2, 7, 3],
+        {2: 'car', 3: 'motorcycle', 7: 'truck'},
+        track_ids=[4, 11, 12]
+    )
+
+
+def test_round_trip():
+    speeds = np.array([72.0, np.nan, 40.0])
+    message = encode_tracks(5, 1700000000.25, _tracks(), speeds, speed_limit=50.0, scale=(2.0, 1.5))
+    assert len(message) == 24 + 32 * 3
+
+    camera_id, timestamp, tracks = decode_track_message(message)
+    assert camera_id == 5
+    assert timestamp == 1700000000.25
+    assert tracks['track_id'].tolist() == [4, 11, 12]
+    assert tracks['class_id'].tolist() == [2, 7, 3]
+    np.testing.assert_allclose(tracks['bbox'][0], [20, 30, 100, 90])
+    np.testing.assert_allclose(tracks['confidence'], [0.9, 0.75, 0.6], rtol=1e-6)
+
+    payload = tracks_to_json(camera_id, timestamp, tracks)
+    assert [track['speed_kmh'] for track in payload['tracks']] == [pytest.approx(72.0), None, pytest.approx(40.0)]
+    assert [track['over_limit'] for track in payload['tracks']] == [True, False, False]
+
+
+def test_empty_frame():
+    # Salida del tracker sin tracks activos
+    tracks = Detections(np.empty((0, 4)), np.empty(0), np.empty(0), track_ids=np.empty(0))
+    message = encode_tracks(1, 0.0, tracks, np.empty(0))
+    camera_id, _, tracks = decode_track_message(message)
+    assert camera_id == 1 and len(tracks) == 0
+
+
+def test_invalid_messages_are_rejected():
+    message = encode_tracks(5, 1.0, _tracks(), np.zeros(3))
+    with pytest.raises(ValueError):
+        decode_track_message(message[:10])
+    with pytest.raises(ValueError):
+        decode_track_message(message[:-1])
+    with pytest.raises(ValueError):
+        decode_track_message(b'XXXX' + message[4:])
+
+
+def test_stream_client_is_unsubscribed_on_disconnect():
+    import asyncio
+    from app.api import tracks as tracks_api
+
+    class FakeWebSocket:
+        def __init__(self):
+            self.inbox = asyncio.Queue()
+            self.sent = []
+
+        async def accept(self):
+            pass
+
+        async def receive(self):
+            return await self.inbox.get()
+
+        async def send_bytes(self, message):
+            self.sent.append(message)
+
+    async def run():
+        hub = tracks_api.track_hub
+        websocket = FakeWebSocket()
+        handler = asyncio.ensure_future(tracks_api.stream_tracks(websocket, 42))
+        await asyncio.sleep(0.01)
+        hub.publish(encode_tracks(42, 1.0, _tracks(), np.zeros(3)))
+        await asyncio.sleep(0.01)
+        assert len(websocket.sent) == 1
+
+        # La cámara no publica más: el cierre se detecta igual por el lado de recepción
+        websocket.inbox.put_nowait({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(handler, timeout=1.0)
+        assert not hub._subscribers.get(42)
+
+    asyncio.run(run())
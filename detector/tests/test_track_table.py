@@ -0,0 +1,84 @@
+"""
+Pruebas de la tabla de tracks en columnas
+
+Uso:
+  python -m pytest detector/tests
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from detector.detection.detections import Detections
+from detector.tracking.track_table import FREE, LOST, TRACKED, TrackTable
+
+
+def _detections(count: int, offset: float = 0.0) -> Detections:
+    x = offset + 50.0 * np.arange(count)
+    boxes = np.stack([x, np.zeros(count), x + 40, np.full(count, 30.0)], axis=1)
+    return Detections(boxes, np.full(count, 0.8), np.full(count, 2), {2: 'car'})
+
+
+def _add(table: TrackTable, track_ids, detections: Detections, frame_id: int = 1) -> np.ndarray:
+    count = len(track_ids)
+    return table.add(np.asarray(track_ids), detections, np.arange(count), frame_id,
+                     np.zeros((count, 8)), np.zeros((count, 8, 8)))
+
+
+def test_add_update_and_state_transitions():
+    table = TrackTable(capacity=4)
+    slots = _add(table, [1, 2, 3], _detections(3))
+    assert len(table) == 3 and table.count(TRACKED) == 3
+    np.testing.assert_array_equal(table.hits[slots], 1)
+    np.testing.assert_array_equal(table.ages[slots], 0)
+
+    table.mark_lost(slots[:1])
+    assert table.count(LOST) == 1 and table.time_since_update[slots[0]] == 1
+
+    # Una detección reactiva el track perdido
+    table.update(slots[:1], _detections(1, offset=5), np.array([0]), frame_id=2)
+    assert table.state[slots[0]] == TRACKED
+    assert table.hits[slots[0]] == 2 and table.time_since_update[slots[0]] == 0
+    np.testing.assert_allclose(table.boxes[slots[0]], [5, 0, 45, 30])
+
+    table.remove(slots[1:2])
+    assert len(table) == 2 and table.state[slots[1]] == FREE
+
+
+def test_freed_slots_are_reused_and_capacity_grows():
+    table = TrackTable(capacity=2)
+    first = _add(table, [1, 2], _detections(2))
+    table.remove(first[:1])
+    reused = _add(table, [3], _detections(1))
+    assert reused.tolist() == first[:1].tolist()
+    assert table.track_ids[reused[0]] == 3 and table.hits[reused[0]] == 1
+
+    # Sin filas libres la tabla crece conservando los tracks existentes
+    grown = _add(table, [4, 5, 6], _detections(3))
+    assert table.capacity >= 5
+    assert sorted(table.track_ids[table.slots(TRACKED)].tolist()) == [2, 3, 4, 5, 6]
+    assert len(set(grown.tolist()) | {int(first[1]), int(reused[0])}) == 5
+
+
+def test_history_ring_buffer_keeps_latest_boxes_in_order():
+    table = TrackTable(capacity=1, history_size=4)
+    slot = _add(table, [1], _detections(1))
+    for frame in range(2, 8):
+        table.update(slot, _detections(1, offset=frame), np.array([0]), frame)
+
+    history = table.box_history(int(slot[0]))
+    assert history.shape == (4, 4)
+    np.testing.assert_allclose(history[:, 0], [4, 5, 6, 7])
+
+
+def test_view_reads_row_without_copying():
+    table = TrackTable()
+    slot = int(_add(table, [7], _detections(1))[0])
+    view = table.view(slot)
+    assert (view.track_id, view.state, view.hits, view.age) == (7, 'tracked', 1, 0)
+    table.mark_lost(np.array([slot]))
+    assert view.state == 'lost' and view.time_since_update == 1
+    assert not hasattr(view, '__dict__')
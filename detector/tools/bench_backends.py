@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark de backends de inferencia: PyTorch vs ONNX Runtime vs OpenVINO
+
+Para cada backend mide el tiempo por frame (detect() de a un frame y
+detect_batch() con los tamaños de batch pedidos) y compara sus detecciones
+con las de PyTorch sobre los mismos frames:
+
+  - coincidencia: detecciones de PyTorch con un par en el backend (misma clase, IoU >= 0.5)
+  - extra: detecciones del backend sin par en PyTorch
+  - IoU medio y diferencia media de confianza de los pares
+
+Los modelos exportados quedan en la cache (--model-cache-dir), así que la
+primera corrida incluye el export y las siguientes no.
+
+Uso:
+  python tools/bench_backends.py --source video.mp4 --backends torch onnx openvino
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from detector.detection.detections import Detections
+from detector.detection.yolo_detector import YOLODetector
+
+
+def sample_frames(source: str, count: int) -> List[np.ndarray]:
+    """Tomar `count` frames repartidos a lo largo del video"""
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise RuntimeError(f"No se pudo abrir la fuente: {source}")
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = []
+    for index in np.linspace(0, max(0, total - 1), count).astype(int):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+        ret, frame = cap.read()
+        if ret:
+            frames.append(frame)
+    cap.release()
+    return frames
+
+
+def box_iou(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """Matriz IoU entre dos conjuntos de boxes [x1, y1, x2, y2]"""
+    x1 = np.maximum(boxes1[:, None, 0], boxes2[:, 0])
+    y1 = np.maximum(boxes1[:, None, 1], boxes2[:, 1])
+    x2 = np.minimum(boxes1[:, None, 2], boxes2[:, 2])
+    y2 = np.minimum(boxes1[:, None, 3], boxes2[:, 3])
+    intersection = np.maximum(0, x2 - x1) * np.maximum(0, y2 - y1)
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    return intersection / np.maximum(area1[:, None] + area2 - intersection, 1e-8)
+
+
+def compare(reference: List[Detections], candidate: List[Detections], iou_threshold: float = 0.5) -> dict:
+    """Emparejar detecciones (greedy por IoU, misma clase) y resumir las diferencias"""
+    total_ref = total_cand = matched = 0
+    ious, conf_deltas = [], []
+    for ref, cand in zip(reference, candidate):
+        total_ref += len(ref)
+        total_cand += len(cand)
+        if len(ref) == 0 or len(cand) == 0:
+            continue
+        iou = box_iou(ref.boxes, cand.boxes)
+        iou[ref.class_ids[:, None] != cand.class_ids[None, :]] = 0
+        while True:
+            i, j = np.unravel_index(np.argmax(iou), iou.shape)
+            if iou[i, j] < iou_threshold:
+                break
+            matched += 1
+            ious.append(iou[i, j])
+            conf_deltas.append(abs(float(ref.scores[i]) - float(cand.scores[j])))
+            iou[i, :] = 0
+            iou[:, j] = 0
+
+    return {
+        'match': matched / total_ref if total_ref else 1.0,
+        'extra': (total_cand - matched) / total_cand if total_cand else 0.0,
+        'iou': float(np.mean(ious)) if ious else 0.0,
+        'conf_delta': float(np.mean(conf_deltas)) if conf_deltas else 0.0
+    }
+
+
+def time_detector(detector: YOLODetector, frames: List[np.ndarray], batch_size: int) -> float:
+    """Milisegundos por frame con detect() (batch 1) o detect_batch()"""
+    start = time.perf_counter()
+    if batch_size == 1:
+        for frame in frames:
+            detector.detect(frame)
+    else:
+        for i in range(0, len(frames), batch_size):
+            detector.detect_batch(frames[i:i + batch_size])
+    return 1000 * (time.perf_counter() - start) / len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark y paridad de backends de inferencia')
+    parser.add_argument('--source', type=str, required=True, help='Video de donde tomar los frames')
+    parser.add_argument('--model', type=str, default='yolov8n.pt', help='Modelo YOLO (.pt)')
+    parser.add_argument('--backends', nargs='+', default=['torch', 'onnx'],
+                       choices=['torch', 'onnx', 'openvino'], help='Backends a medir')
+    parser.add_argument('--frames', type=int, default=100, help='Frames a evaluar')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8],
+                       help='Tamaños de batch a medir (1 = detect())')
+    parser.add_argument('--imgsz', type=int, default=640, help='Lado de la imagen de entrada')
+    parser.add_argument('--model-cache-dir', type=str, default=None,
+                       help='Directorio de cache de modelos exportados')
+    args = parser.parse_args()
+
+    frames = sample_frames(args.source, args.frames)
+    print(f"{len(frames)} frames de {args.source}\n")
+
+    backends = ['torch'] + [b for b in args.backends if b != 'torch']
+    reference = None
+    rows = []
+    for backend in backends:
+        detector = YOLODetector(model_path=args.model, imgsz=args.imgsz, backend=backend,
+                                cache_dir=args.model_cache_dir)
+        for frame in frames[:3]:
+            detector.detect(frame)  # Calentamiento
+
+        timings = {bs: time_detector(detector, frames, bs) for bs in args.batch_sizes}
+        detections = [detector.detect(frame) for frame in frames]
+        if reference is None:
+            reference = detections
+        rows.append((backend, timings, compare(reference, detections)))
+
+    header = f"{'backend':>8} | " + " | ".join(f"{'bs=' + str(bs) + ' ms/frame':>15}" for bs in args.batch_sizes)
+    header += f" | {'coincid.':>8} | {'extra':>6} | {'IoU':>5} | {'Δconf':>6}"
+    print(header)
+    print("-" * len(header))
+    for backend, timings, parity in rows:
+        line = f"{backend:>8} | " + " | ".join(f"{timings[bs]:>15.1f}" for bs in args.batch_sizes)
+        line += (f" | {100 * parity['match']:>7.1f}% | {100 * parity['extra']:>5.1f}% | "
+                 f"{parity['iou']:>5.3f} | {parity['conf_delta']:>6.3f}")
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
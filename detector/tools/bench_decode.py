@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark de decodificación: cap.read() en todos los frames vs grab()/retrieve()
+
+Mide el CPU consumido al recorrer un video procesando uno de cada N frames,
+comparando la lectura completa de todos los frames (comportamiento anterior
+del detector) con avanzar el stream con grab() y convertir con retrieve()
+solo los frames que se procesan.
+
+Nota: con el backend FFmpeg de OpenCV, grab() sigue decodificando el paquete
+comprimido (los códecs con frames P/B lo requieren); lo que se ahorra en los
+frames saltados es la conversión de color a BGR y la copia del frame.
+
+Uso:
+  python tools/bench_decode.py --source video.mp4 --skips 1 2 3 5 10
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def run(source: str, skip: int, split: bool, max_frames: int) -> dict:
+    """Recorrer el video y medir tiempo de CPU y de pared"""
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise RuntimeError(f"No se pudo abrir la fuente: {source}")
+
+    frames = 0
+    decoded = 0
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+
+    while frames < max_frames:
+        if split:
+            if not cap.grab():
+                break
+            frames += 1
+            if frames % skip == 0:
+                ret, _ = cap.retrieve()
+                decoded += int(ret)
+        else:
+            ret, _ = cap.read()
+            if not ret:
+                break
+            frames += 1
+            if frames % skip == 0:
+                decoded += 1
+
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    cap.release()
+
+    return {
+        'frames': frames,
+        'decoded': decoded,
+        'cpu_s': cpu,
+        'wall_s': wall,
+        'cpu_ms_per_frame': 1000 * cpu / frames if frames else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de decodificación con salto de frames')
+    parser.add_argument('--source', type=str, required=True, help='Archivo de video a recorrer')
+    parser.add_argument('--skips', type=int, nargs='+', default=[1, 2, 3, 5, 10],
+                       help='Factores de salto a medir')
+    parser.add_argument('--max-frames', type=int, default=600,
+                       help='Máximo de frames a recorrer por corrida')
+    args = parser.parse_args()
+
+    print(f"{'salto':>5} | {'read() CPU ms/frame':>19} | {'grab/retrieve CPU ms/frame':>26} | {'ahorro':>6}")
+    print("-" * 68)
+    for skip in args.skips:
+        baseline = run(args.source, skip, split=False, max_frames=args.max_frames)
+        split = run(args.source, skip, split=True, max_frames=args.max_frames)
+        saving = 0.0
+        if baseline['cpu_s'] > 0:
+            saving = 100 * (1 - split['cpu_s'] / baseline['cpu_s'])
+        print(f"{skip:>5} | {baseline['cpu_ms_per_frame']:>19.2f} | "
+              f"{split['cpu_ms_per_frame']:>26.2f} | {saving:>5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
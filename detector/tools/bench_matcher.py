@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark de asociación de ByteTracker: matcher greedy vs asignación óptima (húngaro)
+
+Genera escenas sintéticas con N tracks (vehículos de tamaño variable, algunos
+muy cercanos entre sí), desplaza y perturba sus boxes para obtener las
+detecciones del frame siguiente (más un 10% de detecciones nuevas y un 10% de
+tracks sin detección) y mide el tiempo de asociación de cada matcher con la
+matriz IoU completa (_associate_detections_to_trackers) y con la grilla
+espacial (_associate_sparse), junto con la fracción de pares correctos.
+
+Uso:
+  python tools/bench_matcher.py --counts 10 50 100 200 400 1000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from detector.tracking.byte_tracker import ByteTracker
+
+
+def make_scene(count: int, rng: np.random.Generator):
+    """Boxes de tracks y de detecciones, con el índice del track verdadero de cada detección (-1 = nueva)"""
+    sizes = rng.uniform(20, 120, size=(count, 1)) * np.array([[1.6, 1.0]])
+    # Escena densa: el área crece menos que la cantidad de objetos
+    extent = 400 * np.sqrt(count)
+    origins = rng.uniform(0, extent, size=(count, 2))
+    tracks = np.hstack([origins, origins + sizes])
+
+    visible = rng.random(count) > 0.1
+    motion = rng.normal(0, 4, size=(count, 2))
+    jitter = rng.normal(0, 2, size=(count, 4))
+    detections = tracks[visible] + np.hstack([motion, motion])[visible] + jitter[visible]
+    truth = np.flatnonzero(visible)
+
+    new = max(1, count // 10)
+    new_origins = rng.uniform(0, extent, size=(new, 2))
+    new_boxes = np.hstack([new_origins, new_origins + rng.uniform(20, 120, size=(new, 2))])
+    detections = np.vstack([detections, new_boxes])
+    truth = np.concatenate([truth, -np.ones(new, dtype=int)])
+    return tracks, detections, truth
+
+
+def run(matcher: str, sparse: bool, tracks: np.ndarray, detections: np.ndarray, truth: np.ndarray,
+        repeats: int):
+    tracker = ByteTracker(matcher=matcher)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        if sparse:
+            matched, _, _ = tracker._associate_sparse(detections, tracks)
+        else:
+            iou = tracker._compute_iou(detections, tracks)
+            matched, _, _ = tracker._associate_detections_to_trackers(iou, detections, tracks)
+    elapsed = (time.perf_counter() - start) / repeats
+    correct = sum(1 for det, trk in matched if truth[det] == trk)
+    return 1000 * elapsed, correct / max(1, int((truth >= 0).sum()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de matchers de ByteTracker')
+    parser.add_argument('--counts', type=int, nargs='+', default=[10, 50, 100, 200, 400, 1000],
+                       help='Cantidad de objetos por escena')
+    parser.add_argument('--repeats', type=int, default=20, help='Repeticiones por medición')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    columns = [(matcher, sparse) for matcher in ('greedy', 'hungarian') for sparse in (False, True)]
+    names = {'greedy': 'greedy', 'hungarian': 'húngaro'}
+    header = f"{'objetos':>7} | " + " | ".join(
+        f"{names[matcher] + (' grilla' if sparse else '') + ' ms':>17}" for matcher, sparse in columns
+    ) + f" | {'greedy ok':>9} | {'húngaro ok':>10}"
+    print(header)
+    print("-" * len(header))
+    for count in args.counts:
+        tracks, detections, truth = make_scene(count, rng)
+        results = {column: run(*column, tracks, detections, truth, args.repeats) for column in columns}
+        print(f"{count:>7} | " + " | ".join(f"{results[column][0]:>17.2f}" for column in columns) +
+              f" | {100 * results[('greedy', True)][1]:>8.1f}% | {100 * results[('hungarian', True)][1]:>9.1f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Cuantización INT8 del modelo de detección, calibrada con grabaciones propias
+
+1. Exporta el modelo a ONNX FP32 (o lo toma de la cache de modelos).
+2. Toma frames de las grabaciones del sitio: el primer tramo de cada video se usa
+   para calibrar y el último (--eval-fraction) queda reservado para evaluar, así
+   los frames de evaluación no son casi iguales a los de calibración.
+3. Cuantiza de forma estática (ONNX Runtime, formato QDQ, pesos por canal). La
+   cabeza de detección queda en FP32 salvo con --quantize-head.
+4. Guarda el modelo en la cache como `<modelo>-<hash>-<imgsz>-int8.onnx`, donde lo
+   encuentra `--inference-backend onnx-int8` del detector.
+5. Reporta la velocidad y el mAP del modelo INT8 frente al FP32:
+   - con --eval-data (dataset YOLO etiquetado): mAP50 y mAP50-95 reales de ambos
+   - sin etiquetas: mAP del INT8 tomando como referencia las detecciones FP32
+     (confianza >= 0.25) sobre los frames reservados
+
+Uso:
+  python tools/quantize_model.py --model yolov8n.pt --videos sitio1.mp4 sitio2.mp4
+  python tools/quantize_model.py --model yolov8n.pt --videos sitio1.mp4 --eval-data dataset.yaml
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from detector.detection.backends import artifact_path, resolve_model
+from detector.detection.detections import Detections
+from detector.detection.yolo_detector import YOLODetector, letterbox_into
+
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+
+def sample_frames(videos: List[str], calibration_frames: int, eval_frames: int,
+                  eval_fraction: float) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """
+    Repartir frames de calibración y de evaluación entre los videos
+
+    Returns:
+        Tupla (frames de calibración, frames reservados para evaluación)
+    """
+    calibration, evaluation = [], []
+    for i, video in enumerate(videos):
+        cap = cv2.VideoCapture(video)
+        if not cap.isOpened():
+            raise RuntimeError(f"No se pudo abrir el video: {video}")
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        split = int(total * (1 - eval_fraction))
+        # Repartir la cantidad pedida entre los videos (los primeros reciben el resto)
+        n_cal = calibration_frames // len(videos) + (i < calibration_frames % len(videos))
+        n_eval = eval_frames // len(videos) + (i < eval_frames % len(videos))
+
+        for target, start, end, count in ((calibration, 0, split, n_cal), (evaluation, split, total, n_eval)):
+            if count <= 0 or end <= start:
+                continue
+            for index in np.linspace(start, end - 1, count).astype(int):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+                ret, frame = cap.read()
+                if ret:
+                    target.append(frame)
+        cap.release()
+    return calibration, evaluation
+
+
+def preprocess(frame: np.ndarray, imgsz: int) -> np.ndarray:
+    """Frame BGR -> tensor (1, 3, imgsz, imgsz) RGB float32 en [0, 1], como en inferencia"""
+    slot = np.empty((imgsz, imgsz, 3), dtype=np.uint8)
+    letterbox_into(frame, slot)
+    return np.ascontiguousarray(slot[..., ::-1].transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+
+
+def head_nodes(onnx_path: str) -> List[str]:
+    """Nodos del último módulo (cabeza de detección: DFL, concatenación de cajas y clases)"""
+    import onnx
+    graph = onnx.load(onnx_path).graph
+    modules = {}
+    for node in graph.node:
+        parts = node.name.split('/')
+        if len(parts) > 1 and parts[1].startswith('model.'):
+            modules.setdefault(parts[1], []).append(node.name)
+    if not modules:
+        return []
+    last = max(modules, key=lambda name: int(name.split('.')[1]) if name.split('.')[1].isdigit() else -1)
+    return modules[last]
+
+
+def quantize(fp32_path: str, output_path: str, frames: List[np.ndarray], imgsz: int,
+             method: str, quantize_head: bool):
+    """Cuantización estática INT8 (QDQ) con los frames de calibración"""
+    import onnx
+    import onnxruntime as ort
+    from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat,
+                                          QuantType, quantize_static)
+
+    input_name = ort.InferenceSession(fp32_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self._frames = iter(frames)
+
+        def get_next(self):
+            frame = next(self._frames, None)
+            return None if frame is None else {input_name: preprocess(frame, imgsz)}
+
+    methods = {
+        'minmax': CalibrationMethod.MinMax,
+        'entropy': CalibrationMethod.Entropy,
+        'percentile': CalibrationMethod.Percentile,
+    }
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    quantize_static(
+        fp32_path, tmp_path, FrameReader(),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        weight_type=QuantType.QInt8,
+        activation_type=QuantType.QUInt8,
+        calibrate_method=methods[method],
+        nodes_to_exclude=[] if quantize_head else head_nodes(fp32_path)
+    )
+
+    # Conservar los metadatos del export (nombres de clase, stride, imgsz) que lee ultralytics
+    fp32_model = onnx.load(fp32_path)
+    int8_model = onnx.load(tmp_path)
+    del int8_model.metadata_props[:]
+    int8_model.metadata_props.extend(fp32_model.metadata_props)
+    onnx.save(int8_model, tmp_path)
+    os.replace(tmp_path, output_path)
+
+
+def average_precision(references: List[Detections], predictions: List[Detections]) -> Dict[str, float]:
+    """
+    mAP50 y mAP50-95 de las predicciones frente a las referencias (interpolación de 101 puntos)
+
+    Args:
+        references: Detecciones tomadas como verdad por frame
+        predictions: Detecciones a evaluar por frame (con confianza baja, ordenables por score)
+    """
+    classes = sorted({int(c) for ref in references for c in ref.class_ids})
+    if not classes:
+        return {'map50': 0.0, 'map': 0.0}
+
+    ap = np.zeros((len(classes), len(IOU_THRESHOLDS)))
+    for ci, class_id in enumerate(classes):
+        ref_boxes = [ref.boxes[ref.class_ids == class_id] for ref in references]
+        n_ref = sum(len(b) for b in ref_boxes)
+        preds = [(float(score), frame, box)
+                 for frame, pred in enumerate(predictions)
+                 for score, box in zip(pred.scores[pred.class_ids == class_id],
+                                       pred.boxes[pred.class_ids == class_id])]
+        preds.sort(key=lambda p: -p[0])
+        if not preds:
+            continue
+
+        for ti, threshold in enumerate(IOU_THRESHOLDS):
+            used = [np.zeros(len(b), dtype=bool) for b in ref_boxes]
+            tp = np.zeros(len(preds))
+            for k, (_, frame, box) in enumerate(preds):
+                candidates = ref_boxes[frame]
+                if len(candidates) == 0:
+                    continue
+                iou = _iou(box, candidates)
+                iou[used[frame]] = 0
+                best = int(np.argmax(iou))
+                if iou[best] >= threshold:
+                    used[frame][best] = True
+                    tp[k] = 1
+            cum_tp = np.cumsum(tp)
+            recall = cum_tp / max(n_ref, 1)
+            precision = cum_tp / np.arange(1, len(preds) + 1)
+            # Envolvente de la curva precisión-recall
+            precision = np.maximum.accumulate(precision[::-1])[::-1]
+            points = np.linspace(0, 1, 101)
+            indices = np.searchsorted(recall, points, side='left')
+            ap[ci, ti] = np.mean([precision[i] if i < len(precision) else 0.0 for i in indices])
+
+    return {'map50': float(ap[:, 0].mean()), 'map': float(ap.mean())}
+
+
+def _iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    intersection = np.maximum(0, x2 - x1) * np.maximum(0, y2 - y1)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return intersection / np.maximum(area + areas - intersection, 1e-8)
+
+
+def time_per_frame(detector: YOLODetector, frames: List[np.ndarray]) -> Tuple[float, List[Detections]]:
+    """Milisegundos por frame con detect() y las detecciones obtenidas"""
+    for frame in frames[:3]:
+        detector.detect(frame)  # Calentamiento
+    start = time.perf_counter()
+    detections = [detector.detect(frame) for frame in frames]
+    return 1000 * (time.perf_counter() - start) / max(1, len(frames)), detections
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cuantización INT8 del modelo YOLO con frames propios')
+    parser.add_argument('--model', type=str, default='yolov8n.pt', help='Modelo YOLO (.pt)')
+    parser.add_argument('--videos', type=str, nargs='+', required=True,
+                       help='Grabaciones del sitio para calibrar y evaluar')
+    parser.add_argument('--calibration-frames', type=int, default=200, help='Frames de calibración')
+    parser.add_argument('--eval-frames', type=int, default=100, help='Frames reservados para evaluar')
+    parser.add_argument('--eval-fraction', type=float, default=0.2,
+                       help='Fracción final de cada video reservada para evaluación')
+    parser.add_argument('--eval-data', type=str, default=None,
+                       help='Dataset YOLO etiquetado (data.yaml) para medir el mAP real')
+    parser.add_argument('--method', choices=['minmax', 'entropy', 'percentile'], default='minmax',
+                       help='Método de calibración de las activaciones')
+    parser.add_argument('--quantize-head', action='store_true',
+                       help='Cuantizar también la cabeza de detección')
+    parser.add_argument('--imgsz', type=int, default=640, help='Lado de la imagen de entrada')
+    parser.add_argument('--model-cache-dir', type=str, default=None,
+                       help='Directorio de cache de modelos (por defecto ~/.cache/voi_models)')
+    parser.add_argument('--output', type=str, default=None,
+                       help='Ruta del modelo INT8 (por defecto, en la cache para --inference-backend onnx-int8)')
+    args = parser.parse_args()
+
+    weights = args.model
+    if not os.path.exists(weights):
+        from ultralytics import YOLO
+        weights = str(YOLO(weights).ckpt_path)
+    fp32_path = resolve_model(weights, 'onnx', args.imgsz, args.model_cache_dir)
+    output_path = args.output or artifact_path(weights, 'onnx-int8', args.imgsz, args.model_cache_dir)
+
+    calibration, evaluation = sample_frames(args.videos, args.calibration_frames, args.eval_frames,
+                                            args.eval_fraction)
+    print(f"{len(calibration)} frames de calibración, {len(evaluation)} de evaluación")
+
+    start = time.time()
+    quantize(fp32_path, output_path, calibration, args.imgsz, args.method, args.quantize_head)
+    print(f"Modelo INT8 guardado en {output_path} ({time.time() - start:.0f}s, "
+          f"{os.path.getsize(fp32_path) / 1e6:.1f} MB -> {os.path.getsize(output_path) / 1e6:.1f} MB)\n")
+
+    # Velocidad y detecciones con confianza baja (para la curva precisión-recall)
+    fp32 = YOLODetector(fp32_path, confidence=0.001, imgsz=args.imgsz)
+    int8 = YOLODetector(output_path, confidence=0.001, imgsz=args.imgsz)
+    fp32_ms, fp32_dets = time_per_frame(fp32, evaluation)
+    int8_ms, int8_dets = time_per_frame(int8, evaluation)
+    print(f"Velocidad: FP32 {fp32_ms:.1f} ms/frame, INT8 {int8_ms:.1f} ms/frame "
+          f"({fp32_ms / max(int8_ms, 1e-6):.2f}x)")
+
+    if args.eval_data:
+        metrics = {}
+        for name, detector in (('FP32', fp32), ('INT8', int8)):
+            box = detector.model.val(data=args.eval_data, imgsz=args.imgsz, batch=1, verbose=False).box
+            metrics[name] = {'map50': float(box.map50), 'map': float(box.map)}
+        print(f"mAP50:    FP32 {metrics['FP32']['map50']:.4f}, INT8 {metrics['INT8']['map50']:.4f} "
+              f"(Δ {metrics['INT8']['map50'] - metrics['FP32']['map50']:+.4f})")
+        print(f"mAP50-95: FP32 {metrics['FP32']['map']:.4f}, INT8 {metrics['INT8']['map']:.4f} "
+              f"(Δ {metrics['INT8']['map'] - metrics['FP32']['map']:+.4f})")
+    else:
+        # Sin etiquetas: las detecciones FP32 con la confianza de producción son la referencia
+        references = [dets[dets.scores >= 0.25] for dets in fp32_dets]
+        baseline = average_precision(references, fp32_dets)
+        agreement = average_precision(references, int8_dets)
+        print(f"mAP50 vs FP32:    FP32 {baseline['map50']:.4f}, INT8 {agreement['map50']:.4f} "
+              f"(Δ {agreement['map50'] - baseline['map50']:+.4f})")
+        print(f"mAP50-95 vs FP32: FP32 {baseline['map']:.4f}, INT8 {agreement['map']:.4f} "
+              f"(Δ {agreement['map'] - baseline['map']:+.4f})")
+        print("(referencia: detecciones FP32; usar --eval-data para el mAP sobre etiquetas reales)")
+
+
+if __name__ == "__main__":
+    main()
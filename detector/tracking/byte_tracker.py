@@ -1,15 +1,27 @@
 import numpy as np
-from typing import List, Tuple, Dict, Any
-from collections import defaultdict
+from typing import List, Optional, Tuple, Dict, Any, Union
 import logging
 
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from detector.detection.detections import Detections
+from detector.tracking.kalman_filter import KalmanFilter
+from detector.tracking.spatial_grid import candidate_pairs, pair_iou
+from detector.tracking.track_table import LOST, TRACKED, TrackTable, TrackView
+
 logger = logging.getLogger(__name__)
 
 
 class ByteTracker:
     """Tracker multi-objeto usando algoritmo ByteTrack"""
     
-    def __init__(self, min_hits: int = 3, max_age: int = 30, iou_threshold: float = 0.3):
+    def __init__(self, min_hits: int = 3, max_age: int = 30, iou_threshold: float = 0.3,
+                 matcher: str = 'greedy', high_thresh: float = 0.5, low_thresh: float = 0.1,
+                 new_track_thresh: float = 0.6, low_iou_threshold: float = 0.5,
+                 frame_interval: float = 0.1, dense_max_pairs: int = 16384,
+                 remove_unconfirmed: bool = False):
         """
         Inicializar tracker ByteTrack
         
@@ -17,28 +29,60 @@ class ByteTracker:
             min_hits: Número mínimo de detecciones para confirmar un track
             max_age: Número de frames sin detección antes de eliminar track
             iou_threshold: Umbral IoU para asociar detecciones con tracks
+            matcher: 'greedy' (mayor IoU primero) o 'hungarian' (asignación óptima)
+            high_thresh: Confianza mínima de las detecciones de la primera asociación
+            low_thresh: Confianza mínima de las detecciones de la segunda asociación
+                (las de baja confianza solo mantienen tracks existentes, p. ej. ocluidos)
+            new_track_thresh: Confianza mínima para crear un track nuevo
+            low_iou_threshold: Umbral IoU de la segunda asociación (más estricto)
+            frame_interval: Segundos entre frames cuando update() no recibe timestamp
+            dense_max_pairs: Hasta esta cantidad de pares detección-track se calcula la matriz
+                IoU completa; por encima, solo los pares cercanos según una grilla espacial
+            remove_unconfirmed: Eliminar en el primer frame sin detección los tracks vistos una
+                sola vez (como ByteTrack original: suelen ser falsos positivos de baja confianza);
+                por defecto se conservan hasta max_age como los demás
         """
+        if matcher not in ('greedy', 'hungarian'):
+            raise ValueError(f"Matcher desconocido: {matcher}")
+        if not 0 <= low_thresh <= high_thresh:
+            raise ValueError("Se requiere 0 <= low_thresh <= high_thresh")
         self.min_hits = min_hits
         self.max_age = max_age
         self.iou_threshold = iou_threshold
+        self.matcher = matcher
+        self.high_thresh = high_thresh
+        self.low_thresh = low_thresh
+        self.new_track_thresh = new_track_thresh
+        self.low_iou_threshold = low_iou_threshold
+        self.frame_interval = frame_interval
+        self.dense_max_pairs = dense_max_pairs
+        self.remove_unconfirmed = remove_unconfirmed
+        
+        # Tracks en columnas (estado, contadores, filtro de Kalman, historial): las
+        # transiciones de estado y el filtro operan sobre todos los tracks a la vez
+        self.table = TrackTable()
+        self.kalman = KalmanFilter()
+        self.last_timestamp: Optional[float] = None
         
-        self.tracked_tracks: List[Track] = []
-        self.lost_tracks: List[Track] = []
-        self.removed_tracks: List[Track] = []
         self.frame_count = 0
         self.next_id = 1
+        self.class_names: Dict[int, str] = {}
         
         logger.info("ByteTracker inicializado")
     
-    def update(self, detections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def update(self, detections: Union[Detections, List[Dict[str, Any]]],
+               timestamp: Optional[float] = None) -> Detections:
         """
         Actualizar tracks con nuevas detecciones
         
         Args:
-            detections: Lista de detecciones del frame actual
+            detections: Detecciones del frame actual (Detections o lista de dicts)
+            timestamp: Momento del frame en segundos; el filtro de Kalman avanza el tiempo
+                transcurrido desde el frame anterior (frame_interval si no se indica)
             
         Returns:
-            Lista de tracks activos con formato:
+            Tracks activos en columnas (boxes, scores, class_ids, track_ids, hits, ages);
+            iterarlos produce dicts con formato:
             {
                 'track_id': int,
                 'bbox': [x1, y1, x2, y2],
@@ -50,88 +94,114 @@ class ByteTracker:
             }
         """
         self.frame_count += 1
+        dt = self.frame_interval
+        if timestamp is not None:
+            if self.last_timestamp is not None:
+                dt = max(0.0, timestamp - self.last_timestamp)
+            self.last_timestamp = timestamp
         
-        # Preparar detecciones
-        det_boxes = np.array([d['bbox'] for d in detections])
-        det_scores = np.array([d['confidence'] for d in detections])
-        det_classes = np.array([d['class_id'] for d in detections])
+        detections = Detections.from_list(detections)
+        if detections.class_names:
+            self.class_names = detections.class_names
+        scores = detections.scores
+        high_dets = np.flatnonzero(scores >= self.high_thresh)
+        low_dets = np.flatnonzero((scores >= self.low_thresh) & (scores < self.high_thresh))
         
-        # Inicializar unmatched_dets para el caso cuando no hay tracks existentes
-        unmatched_dets = list(range(len(detections)))
+        # Predecir la posición de todos los tracks (activos primero, luego perdidos) en un solo paso;
+        # en los perdidos no se extrapola el cambio de tamaño
+        table = self.table
+        tracked, lost = table.slots(TRACKED), table.slots(LOST)
+        pool = np.concatenate([tracked, lost])
+        table.means[lost, 7] = 0
+        means, covariances = self.kalman.predict(table.means[pool], table.covariances[pool], dt)
+        table.means[pool], table.covariances[pool] = means, covariances
+        predicted = self.kalman.boxes(means)
         
-        # Actualizar tracks existentes
-        if len(self.tracked_tracks) > 0:
-            tracked_boxes = np.array([t.bbox for t in self.tracked_tracks])
-            iou_matrix = self._compute_iou(det_boxes, tracked_boxes)
-            
-            # Asociar detecciones con tracks existentes
-            matched, unmatched_dets, unmatched_trks = self._associate_detections_to_trackers(
-                iou_matrix, det_boxes, tracked_boxes
+        # Primera asociación: detecciones de alta confianza con tracks activos y perdidos
+        matched, unmatched_high, unmatched_pool = self._match(predicted, detections, high_dets, self.iou_threshold)
+        
+        # Segunda asociación: detecciones de baja confianza con los tracks activos que quedaron
+        # libres (vehículos parcialmente ocluidos), con un umbral IoU más estricto
+        unmatched_pool = np.asarray(unmatched_pool, dtype=int)
+        remaining = unmatched_pool[unmatched_pool < len(tracked)]
+        matched_low, _, _ = self._match(predicted[remaining], detections, low_dets, self.low_iou_threshold)
+        matched += [(int(remaining[trk_idx]), det_idx) for trk_idx, det_idx in matched_low]
+        
+        if matched:
+            rows, dets = (np.array(column) for column in zip(*matched))
+            slots = pool[rows]
+            table.means[slots], table.covariances[slots] = self.kalman.update(
+                means[rows], covariances[rows], detections.boxes[dets]
             )
-            
-            # Actualizar tracks emparejados
-            for m in matched:
-                det_idx, trk_idx = m
-                self.tracked_tracks[trk_idx].update(detections[det_idx])
-            
-            # Tracks no emparejados -> lost
-            for trk_idx in unmatched_trks:
-                self.tracked_tracks[trk_idx].mark_lost()
-                self.lost_tracks.append(self.tracked_tracks[trk_idx])
-            
-            self.tracked_tracks = [t for t in self.tracked_tracks if t.state == 'tracked']
+            table.update(slots, detections, dets, self.frame_count)
         
-        # Procesar detecciones no emparejadas
-        unmatched_detections = [detections[i] for i in unmatched_dets] if len(detections) > 0 and len(unmatched_dets) > 0 else []
+        # Tracks sin detección en este frame: pasan a perdidos y envejecen (también los ya perdidos)
+        missed = pool[table.updated_frame[pool] != self.frame_count]
+        table.mark_lost(missed)
+        expired = table.time_since_update[missed] > self.max_age
+        if self.remove_unconfirmed:
+            expired |= table.hits[missed] <= 1
+        table.remove(missed[expired])
         
-        # Intentar asociar con tracks perdidos
-        if len(self.lost_tracks) > 0 and len(unmatched_detections) > 0:
-            lost_boxes = np.array([t.bbox for t in self.lost_tracks])
-            det_boxes_unmatched = np.array([d['bbox'] for d in unmatched_detections])
-            iou_matrix = self._compute_iou(det_boxes_unmatched, lost_boxes)
-            
-            matched_lost, unmatched_dets_lost, unmatched_lost = self._associate_detections_to_trackers(
-                iou_matrix, det_boxes_unmatched, lost_boxes
+        # Crear nuevos tracks para detecciones de alta confianza no emparejadas
+        unmatched_high = np.asarray(unmatched_high, dtype=int)
+        new_dets = unmatched_high[scores[unmatched_high] >= self.new_track_thresh]
+        if len(new_dets):
+            track_ids = np.arange(self.next_id, self.next_id + len(new_dets))
+            self.next_id += len(new_dets)
+            new_means, new_covariances = self.kalman.initiate(detections.boxes[new_dets])
+            table.add(track_ids, detections, new_dets, self.frame_count, new_means, new_covariances)
+        
+        # Retornar tracks activos (confirmados)
+        active = np.flatnonzero((table.state == TRACKED) & (table.hits >= self.min_hits))
+        return Detections(
+            table.boxes[active],
+            table.scores[active],
+            table.class_ids[active],
+            self.class_names,
+            track_ids=table.track_ids[active],
+            hits=table.hits[active],
+            ages=table.ages[active]
+        )
+    
+    @property
+    def tracked_tracks(self) -> List[TrackView]:
+        """Tracks activos (vistas sobre la tabla)"""
+        return [self.table.view(slot) for slot in self.table.slots(TRACKED)]
+    
+    @property
+    def lost_tracks(self) -> List[TrackView]:
+        """Tracks perdidos que todavía pueden reaparecer"""
+        return [self.table.view(slot) for slot in self.table.slots(LOST)]
+    
+    @property
+    def num_tracked(self) -> int:
+        """Cantidad de tracks activos (sin construir vistas)"""
+        return self.table.count(TRACKED)
+    
+    def _match(self, track_boxes: np.ndarray, detections: Detections, det_indices: np.ndarray,
+               iou_threshold: float) -> Tuple[List[Tuple[int, int]], List[int], List[int]]:
+        """
+        Asociar un subconjunto de detecciones con boxes de tracks (predichos por el filtro)
+        
+        Returns:
+            Tupla (pares (índice de track, índice de detección), detecciones sin par, tracks sin par)
+        """
+        if len(track_boxes) == 0 or len(det_indices) == 0:
+            return [], list(det_indices), list(range(len(track_boxes)))
+        
+        det_boxes = detections.boxes[det_indices]
+        if len(det_boxes) * len(track_boxes) <= self.dense_max_pairs:
+            iou_matrix = self._compute_iou(det_boxes, track_boxes)
+            matched, unmatched_dets, unmatched_trks = self._associate_detections_to_trackers(
+                iou_matrix, det_boxes, track_boxes, iou_threshold
             )
-            
-            # Reactivar tracks perdidos
-            for m in matched_lost:
-                det_idx, lost_idx = m
-                self.lost_tracks[lost_idx].update(unmatched_detections[det_idx])
-                self.tracked_tracks.append(self.lost_tracks[lost_idx])
-            
-            self.lost_tracks = [t for t in self.lost_tracks if t not in self.tracked_tracks]
-            
-            # Actualizar unmatched_detections con las que no se emparejaron
-            unmatched_detections = [unmatched_detections[i] for i in unmatched_dets_lost]
-        
-        # Crear nuevos tracks para detecciones no emparejadas
-        for det in unmatched_detections:
-            if det['confidence'] > 0.5:  # Solo tracks de alta confianza
-                new_track = Track(self.next_id, det, self.frame_count)
-                self.tracked_tracks.append(new_track)
-                self.next_id += 1
-        
-        # Eliminar tracks antiguos
-        self.tracked_tracks = [t for t in self.tracked_tracks if t.age < self.max_age]
-        self.lost_tracks = [t for t in self.lost_tracks if t.age < self.max_age]
-        
-        # Retornar tracks activos
-        active_tracks = []
-        for track in self.tracked_tracks:
-            if track.hits >= self.min_hits:
-                active_tracks.append({
-                    'track_id': track.track_id,
-                    'bbox': track.bbox,
-                    'confidence': track.confidence,
-                    'class_id': track.class_id,
-                    'class_name': track.class_name,
-                    'age': track.age,
-                    'hits': track.hits,
-                    'history': track.history[-10:]  # Últimas 10 posiciones
-                })
-        
-        return active_tracks
+        else:
+            matched, unmatched_dets, unmatched_trks = self._associate_sparse(
+                det_boxes, track_boxes, iou_threshold
+            )
+        return ([(trk_idx, int(det_indices[det_idx])) for det_idx, trk_idx in matched],
+                [int(det_indices[i]) for i in unmatched_dets], unmatched_trks)
     
     def _compute_iou(self, boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
         """Calcular matriz IoU entre dos conjuntos de boxes"""
@@ -158,67 +228,129 @@ class ByteTracker:
     
     def _associate_detections_to_trackers(self, iou_matrix: np.ndarray, 
                                          detections: np.ndarray, 
-                                         trackers: np.ndarray) -> Tuple[List, List, List]:
+                                         trackers: np.ndarray,
+                                         iou_threshold: Optional[float] = None) -> Tuple[List, List, List]:
         """Asociar detecciones con trackers usando IoU"""
         if iou_matrix.size == 0:
             return [], list(range(len(detections))), list(range(len(trackers)))
         
-        # Greedy matching
-        matched_indices = []
-        unmatched_dets = list(range(len(detections)))
-        unmatched_trks = list(range(len(trackers)))
-        
-        # Ordenar por IoU descendente
-        if iou_matrix.size > 0:
-            iou_pairs = []
-            for i in range(len(detections)):
-                for j in range(len(trackers)):
-                    if iou_matrix[i, j] > self.iou_threshold:
-                        iou_pairs.append((iou_matrix[i, j], i, j))
-            
-            iou_pairs.sort(reverse=True)
-            
-            for iou_val, det_idx, trk_idx in iou_pairs:
-                if det_idx in unmatched_dets and trk_idx in unmatched_trks:
-                    matched_indices.append((det_idx, trk_idx))
-                    unmatched_dets.remove(det_idx)
-                    unmatched_trks.remove(trk_idx)
+        threshold = self.iou_threshold if iou_threshold is None else iou_threshold
+        if self.matcher == 'hungarian':
+            det_idx, trk_idx = self._match_hungarian(iou_matrix, threshold)
+        else:
+            det_idx, trk_idx = self._match_greedy(iou_matrix, threshold)
+        
+        return self._split_matches(det_idx, trk_idx, len(detections), len(trackers))
+    
+    def _associate_sparse(self, detections: np.ndarray, trackers: np.ndarray,
+                          iou_threshold: Optional[float] = None) -> Tuple[List, List, List]:
+        """
+        Asociar detecciones con trackers evaluando solo pares cercanos
+        
+        Una grilla uniforme descarta los pares que no pueden solaparse, así el IoU
+        se calcula solo para los candidatos y el matcher recibe una lista dispersa
+        de pares en lugar de una matriz N×M casi toda en cero.
+        """
+        threshold = self.iou_threshold if iou_threshold is None else iou_threshold
+        det_idx, trk_idx = candidate_pairs(detections, trackers)
+        iou = pair_iou(detections, trackers, det_idx, trk_idx)
+        valid = iou > threshold
+        det_idx, trk_idx, iou = det_idx[valid], trk_idx[valid], iou[valid]
         
+        if self.matcher == 'hungarian':
+            keep = self._hungarian_pairs(det_idx, trk_idx, iou, len(detections), len(trackers))
+        else:
+            keep = self._greedy_pairs(det_idx, trk_idx, iou, len(detections), len(trackers))
+        return self._split_matches(det_idx[keep], trk_idx[keep], len(detections), len(trackers))
+    
+    def _split_matches(self, det_idx: np.ndarray, trk_idx: np.ndarray,
+                       num_dets: int, num_trks: int) -> Tuple[List, List, List]:
+        """Pares emparejados, detecciones sin par y tracks sin par"""
+        matched_dets = np.zeros(num_dets, dtype=bool)
+        matched_trks = np.zeros(num_trks, dtype=bool)
+        matched_dets[det_idx] = True
+        matched_trks[trk_idx] = True
+        
+        matched_indices = list(zip(det_idx.tolist(), trk_idx.tolist()))
+        unmatched_dets = np.flatnonzero(~matched_dets).tolist()
+        unmatched_trks = np.flatnonzero(~matched_trks).tolist()
         return matched_indices, unmatched_dets, unmatched_trks
-
-
-class Track:
-    """Representa un track individual"""
     
-    def __init__(self, track_id: int, detection: Dict[str, Any], frame_id: int):
-        self.track_id = track_id
-        self.bbox = detection['bbox']
-        self.confidence = detection['confidence']
-        self.class_id = detection['class_id']
-        self.class_name = detection['class_name']
-        self.state = 'tracked'
-        self.hits = 1
-        self.age = 0
-        self.time_since_update = 0
-        self.history = [detection['bbox']]
-        self.first_seen = frame_id
+    def _match_greedy(self, iou_matrix: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Emparejar por IoU descendente: cada par toma la mejor opción libre"""
+        det_idx, trk_idx = np.nonzero(iou_matrix > threshold)
+        keep = self._greedy_pairs(det_idx, trk_idx, iou_matrix[det_idx, trk_idx], *iou_matrix.shape)
+        return det_idx[keep], trk_idx[keep]
     
-    def update(self, detection: Dict[str, Any]):
-        """Actualizar track con nueva detección"""
-        self.bbox = detection['bbox']
-        self.confidence = detection['confidence']
-        self.class_id = detection['class_id']
-        self.class_name = detection['class_name']
-        self.state = 'tracked'
-        self.hits += 1
-        self.time_since_update = 0
-        self.history.append(detection['bbox'])
-        if len(self.history) > 30:
-            self.history.pop(0)
+    def _greedy_pairs(self, det_idx: np.ndarray, trk_idx: np.ndarray, iou: np.ndarray,
+                      num_dets: int, num_trks: int) -> np.ndarray:
+        """Índices de los pares elegidos por el greedy (pares ordenados por detección y track)"""
+        order = np.argsort(-iou, kind='stable')
+        
+        used_dets = np.zeros(num_dets, dtype=bool)
+        used_trks = np.zeros(num_trks, dtype=bool)
+        matched = []
+        for k in order:
+            d, t = det_idx[k], trk_idx[k]
+            if not used_dets[d] and not used_trks[t]:
+                used_dets[d] = used_trks[t] = True
+                matched.append(k)
+        return np.array(matched, dtype=int)
     
-    def mark_lost(self):
-        """Marcar track como perdido"""
-        self.state = 'lost'
-        self.time_since_update += 1
-        self.age += 1
-
+    def _match_hungarian(self, iou_matrix: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Asignación óptima (máxima IoU total) con compuerta
+        
+        Solo entran al solver las filas y columnas con algún par sobre el umbral;
+        los pares bajo el umbral tienen costo prohibitivo y se descartan al final.
+        """
+        valid = iou_matrix > threshold
+        rows = np.flatnonzero(valid.any(axis=1))
+        cols = np.flatnonzero(valid.any(axis=0))
+        if len(rows) == 0:
+            return rows, cols
+        
+        iou = iou_matrix[np.ix_(rows, cols)]
+        cost = np.where(valid[np.ix_(rows, cols)], 1.0 - iou, 1e6)
+        row_ind, col_ind = linear_sum_assignment(cost)
+        keep = cost[row_ind, col_ind] < 1e6
+        return rows[row_ind[keep]], cols[col_ind[keep]]
+    
+    def _hungarian_pairs(self, det_idx: np.ndarray, trk_idx: np.ndarray, iou: np.ndarray,
+                         num_dets: int, num_trks: int) -> np.ndarray:
+        """
+        Asignación óptima sobre pares dispersos
+        
+        Los pares forman un grafo detección-track cuyas componentes conexas son
+        problemas independientes: las de un solo par se emparejan directo y el
+        resto se resuelve con el solver húngaro sobre una matriz chica.
+        
+        Returns:
+            Índices de los pares elegidos
+        """
+        if len(det_idx) == 0:
+            return np.empty(0, dtype=int)
+        
+        graph = coo_matrix((np.ones(len(det_idx)), (det_idx, num_dets + trk_idx)),
+                           shape=(num_dets + num_trks, num_dets + num_trks))
+        _, labels = connected_components(graph, directed=False)
+        component = labels[det_idx]
+        single = np.bincount(component)[component] == 1
+        chosen = [np.flatnonzero(single)]
+        
+        grouped = np.flatnonzero(~single)
+        grouped = grouped[np.argsort(component[grouped], kind='stable')]
+        bounds = np.flatnonzero(np.diff(component[grouped])) + 1
+        for pairs in np.split(grouped, bounds):
+            if len(pairs) == 0:
+                continue
+            _, rows = np.unique(det_idx[pairs], return_inverse=True)
+            _, cols = np.unique(trk_idx[pairs], return_inverse=True)
+            cost = np.full((rows.max() + 1, cols.max() + 1), 1e6)
+            cost[rows, cols] = 1.0 - iou[pairs]
+            pair_at = np.zeros(cost.shape, dtype=int)
+            pair_at[rows, cols] = pairs
+            row_ind, col_ind = linear_sum_assignment(cost)
+            keep = cost[row_ind, col_ind] < 1e6
+            chosen.append(pair_at[row_ind[keep], col_ind[keep]])
+        return np.sort(np.concatenate(chosen))
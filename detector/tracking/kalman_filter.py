@@ -0,0 +1,129 @@
+import numpy as np
+from typing import Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def xyxy_to_cxcywh(boxes: np.ndarray) -> np.ndarray:
+    """Convertir boxes [x1, y1, x2, y2] a [cx, cy, w, h]"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    wh = boxes[:, 2:] - boxes[:, :2]
+    return np.hstack([boxes[:, :2] + wh / 2, wh])
+
+
+def cxcywh_to_xyxy(state: np.ndarray) -> np.ndarray:
+    """Convertir las primeras 4 columnas del estado [cx, cy, w, h, ...] a boxes [x1, y1, x2, y2]"""
+    center = state[:, :2]
+    half = np.maximum(state[:, 2:4], 1.0) / 2
+    return np.hstack([center - half, center + half])
+
+
+class KalmanFilter:
+    """
+    Filtro de Kalman de velocidad constante vectorizado sobre todos los tracks
+
+    Estado de cada track: [cx, cy, w, h, vcx, vcy, vw, vh] (píxeles y píxeles por
+    segundo). Las medias se guardan apiladas en un array (N, 8) y las covarianzas
+    en (N, 8, 8): predict y update operan sobre todas las filas a la vez, sin
+    matrices ni bucles por objeto. Los ruidos son proporcionales a la altura del
+    box, porque un vehículo cercano recorre más píxeles que uno lejano.
+    """
+
+    def __init__(self, std_position: float = 0.05, std_velocity: float = 0.5,
+                 std_measurement: float = 0.05, std_initial_velocity: float = 5.0):
+        """
+        Inicializar filtro
+
+        Args:
+            std_position: Ruido de proceso de la posición (fracción de la altura por segundo)
+            std_velocity: Ruido de proceso de la velocidad (aceleración, alturas por segundo²)
+            std_measurement: Ruido de las detecciones (fracción de la altura)
+            std_initial_velocity: Incertidumbre de la velocidad de un track nuevo (alturas por segundo)
+        """
+        self.std_position = std_position
+        self.std_velocity = std_velocity
+        self.std_measurement = std_measurement
+        self.std_initial_velocity = std_initial_velocity
+        self._diag = np.arange(8)
+
+    def initiate(self, boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Crear el estado de tracks nuevos a partir de sus primeras detecciones
+
+        Args:
+            boxes: (N, 4) boxes [x1, y1, x2, y2]
+
+        Returns:
+            Tupla (medias (N, 8), covarianzas (N, 8, 8)) con velocidad nula
+        """
+        measurement = xyxy_to_cxcywh(boxes)
+        mean = np.hstack([measurement, np.zeros_like(measurement)])
+        height = np.maximum(measurement[:, 3:4], 1.0)
+        std = np.hstack([np.repeat(2 * self.std_measurement * height, 4, axis=1),
+                         np.repeat(self.std_initial_velocity * height, 4, axis=1)])
+        covariance = np.zeros((len(mean), 8, 8))
+        covariance[:, self._diag, self._diag] = std ** 2
+        return mean, covariance
+
+    def predict(self, mean: np.ndarray, covariance: np.ndarray, dt: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Avanzar el estado de todos los tracks `dt` segundos
+
+        Args:
+            mean: (N, 8) medias
+            covariance: (N, 8, 8) covarianzas
+            dt: Segundos desde la última predicción (el mismo para todos los tracks del frame)
+
+        Returns:
+            Tupla (medias, covarianzas) predichas
+        """
+        if len(mean) == 0:
+            return mean, covariance
+        transition = np.eye(8)
+        transition[:4, 4:] = dt * np.eye(4)
+
+        mean = mean @ transition.T
+        covariance = transition @ covariance @ transition.T
+
+        height = np.maximum(mean[:, 3:4], 1.0)
+        noise = np.hstack([np.repeat(self.std_position * height, 4, axis=1),
+                           np.repeat(self.std_velocity * height, 4, axis=1)]) ** 2 * dt
+        covariance[:, self._diag, self._diag] += noise
+        return mean, covariance
+
+    def update(self, mean: np.ndarray, covariance: np.ndarray,
+               boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Corregir el estado de los tracks con sus detecciones emparejadas
+
+        Args:
+            mean: (N, 8) medias predichas
+            covariance: (N, 8, 8) covarianzas predichas
+            boxes: (N, 4) detección de cada track [x1, y1, x2, y2]
+
+        Returns:
+            Tupla (medias, covarianzas) corregidas
+        """
+        if len(mean) == 0:
+            return mean, covariance
+        measurement = xyxy_to_cxcywh(boxes)
+        height = np.maximum(mean[:, 3], 1.0)
+
+        # Covarianza de la innovación: H P Hᵀ + R, con H = [I 0]
+        innovation_cov = covariance[:, :4, :4].copy()
+        innovation_cov[:, self._diag[:4], self._diag[:4]] += (self.std_measurement * height[:, None]) ** 2
+
+        # Ganancia K = P Hᵀ S⁻¹ (S simétrica: se resuelve Kᵀ = S⁻¹ H P)
+        cross_cov = covariance[:, :4, :]
+        gain = np.linalg.solve(innovation_cov, cross_cov).transpose(0, 2, 1)
+
+        innovation = measurement - mean[:, :4]
+        mean = mean + np.einsum('nij,nj->ni', gain, innovation)
+        covariance = covariance - gain @ cross_cov
+        return mean, covariance
+
+    @staticmethod
+    def boxes(mean: np.ndarray) -> np.ndarray:
+        """Boxes [x1, y1, x2, y2] de las medias (N, 8)"""
+        return cxcywh_to_xyxy(mean)
@@ -0,0 +1,87 @@
+import numpy as np
+from typing import Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def grid_cell_size(boxes1: np.ndarray, boxes2: np.ndarray) -> float:
+    """
+    Lado de celda para un conjunto de boxes
+
+    Del orden del box típico (mediana del lado mayor), así cada box cae en pocas
+    celdas; con un box muy grande en la escena (vehículo cercano) se agranda
+    para que ninguno ocupe más de ~8x8 celdas.
+    """
+    boxes = np.concatenate([boxes1, boxes2])
+    sides = np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])
+    return float(max(1.0, np.median(sides), sides.max() / 8))
+
+
+def _box_cells(boxes: np.ndarray, origin: np.ndarray, cell_size: float,
+               rows: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Pares (índice de box, clave de celda) de todas las celdas que toca cada box"""
+    low = np.floor((boxes[:, :2] - origin) / cell_size).astype(np.int64)
+    high = np.maximum(np.floor((boxes[:, 2:] - origin) / cell_size).astype(np.int64), low)
+    span = high - low + 1
+    counts = span[:, 0] * span[:, 1]
+
+    box_idx = np.repeat(np.arange(len(boxes)), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    cell_x = low[box_idx, 0] + offset // span[box_idx, 1]
+    cell_y = low[box_idx, 1] + offset % span[box_idx, 1]
+    return box_idx, cell_x * rows + cell_y
+
+
+def candidate_pairs(boxes1: np.ndarray, boxes2: np.ndarray,
+                    cell_size: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pares de boxes que comparten alguna celda de una grilla uniforme
+
+    Dos boxes que se solapan comparten al menos la celda de un punto de su
+    intersección, así que todo par con IoU > 0 está entre los candidatos; los
+    boxes lejanos no se comparan.
+
+    Args:
+        boxes1: (N, 4) boxes [x1, y1, x2, y2]
+        boxes2: (M, 4) boxes [x1, y1, x2, y2]
+        cell_size: Lado de la celda en píxeles (por defecto, grid_cell_size)
+
+    Returns:
+        Tupla (índices en boxes1, índices en boxes2), sin repetidos y ordenada por (i, j)
+    """
+    if len(boxes1) == 0 or len(boxes2) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    if cell_size is None:
+        cell_size = grid_cell_size(boxes1, boxes2)
+
+    origin = np.minimum(boxes1[:, :2].min(axis=0), boxes2[:, :2].min(axis=0))
+    extent = np.maximum(boxes1[:, 3].max(), boxes2[:, 3].max()) - origin[1]
+    rows = int(extent // cell_size) + 1
+
+    idx1, keys1 = _box_cells(boxes1, origin, cell_size, rows)
+    idx2, keys2 = _box_cells(boxes2, origin, cell_size, rows)
+    order = np.argsort(keys2, kind='stable')
+    keys2, idx2 = keys2[order], idx2[order]
+
+    # Para cada celda de boxes1, el rango de boxes2 en la misma celda
+    start = np.searchsorted(keys2, keys1, side='left')
+    counts = np.searchsorted(keys2, keys1, side='right') - start
+    first = np.repeat(idx1, counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    second = idx2[np.repeat(start, counts) + offset]
+
+    # Un par que comparte varias celdas aparece varias veces
+    pairs = np.unique(first * len(boxes2) + second)
+    return pairs // len(boxes2), pairs % len(boxes2)
+
+
+def pair_iou(boxes1: np.ndarray, boxes2: np.ndarray, idx1: np.ndarray, idx2: np.ndarray) -> np.ndarray:
+    """IoU de los pares (boxes1[idx1[k]], boxes2[idx2[k]])"""
+    a, b = boxes1[idx1], boxes2[idx2]
+    width = np.maximum(0, np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0]))
+    height = np.maximum(0, np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1]))
+    intersection = width * height
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return intersection / np.maximum(area_a + area_b - intersection, 1e-8)
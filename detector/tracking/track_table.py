@@ -0,0 +1,195 @@
+import numpy as np
+import logging
+
+from detector.detection.detections import Detections
+
+logger = logging.getLogger(__name__)
+
+# Estado de cada fila de la tabla
+FREE = 0
+TRACKED = 1
+LOST = 2
+
+_STATE_NAMES = {FREE: 'removed', TRACKED: 'tracked', LOST: 'lost'}
+
+
+class TrackTable:
+    """
+    Tracks guardados como estructura de arrays
+
+    Cada track ocupa una fila (slot) de columnas preasignadas: box, confianza,
+    clase, estado, contadores, estado del filtro de Kalman e historial de boxes
+    en un buffer circular de largo fijo. Los cambios de estado son escrituras en
+    la columna `state` (sin mover objetos entre listas) y las filas liberadas se
+    reutilizan; la capacidad solo crece (al doble) si no quedan filas libres.
+    Todas las operaciones reciben arrays de slots y trabajan en lote.
+    """
+
+    _COLUMNS = ('track_ids', 'boxes', 'scores', 'class_ids', 'state', 'hits', 'ages', 'time_since_update',
+                'first_seen', 'updated_frame', 'means', 'covariances', 'history', 'history_len', 'history_head')
+
+    def __init__(self, capacity: int = 64, history_size: int = 30):
+        """
+        Inicializar tabla
+
+        Args:
+            capacity: Filas preasignadas (crece automáticamente)
+            history_size: Boxes guardados por track en el buffer circular
+        """
+        self.capacity = 0
+        self.history_size = history_size
+        self.track_ids = np.zeros(0, dtype=np.int64)
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.scores = np.zeros(0, dtype=np.float32)
+        self.class_ids = np.zeros(0, dtype=np.int32)
+        self.state = np.zeros(0, dtype=np.uint8)
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.ages = np.zeros(0, dtype=np.int64)  # Frames desde que se creó
+        self.time_since_update = np.zeros(0, dtype=np.int64)
+        self.first_seen = np.zeros(0, dtype=np.int64)
+        self.updated_frame = np.zeros(0, dtype=np.int64)
+        self.means = np.zeros((0, 8))
+        self.covariances = np.zeros((0, 8, 8))
+        self.history = np.zeros((0, history_size, 4), dtype=np.float32)
+        self.history_len = np.zeros(0, dtype=np.int32)
+        self.history_head = np.zeros(0, dtype=np.int32)  # Próxima posición a escribir
+        self._grow(max(1, capacity))
+
+    def _grow(self, capacity: int):
+        """Ampliar todas las columnas a `capacity` filas (las nuevas quedan libres)"""
+        for name in self._COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:self.capacity] = column
+            setattr(self, name, grown)
+        logger.debug(f"TrackTable: capacidad {self.capacity} -> {capacity}")
+        self.capacity = capacity
+
+    def slots(self, state: int) -> np.ndarray:
+        """Slots con el estado dado, en orden de fila"""
+        return np.flatnonzero(self.state == state)
+
+    def count(self, state: int) -> int:
+        """Cantidad de tracks con el estado dado"""
+        return int(np.count_nonzero(self.state == state))
+
+    def add(self, track_ids: np.ndarray, detections: Detections, indices: np.ndarray, frame_id: int,
+            means: np.ndarray, covariances: np.ndarray) -> np.ndarray:
+        """
+        Crear tracks nuevos a partir de detecciones
+
+        Args:
+            track_ids: IDs asignados a los tracks nuevos
+            detections: Detecciones del frame
+            indices: Detección de cada track nuevo
+            frame_id: Frame actual
+            means, covariances: Estado inicial del filtro de Kalman
+
+        Returns:
+            Slots ocupados por los tracks nuevos
+        """
+        free = self.slots(FREE)
+        if len(free) < len(indices):
+            self._grow(max(2 * self.capacity, self.capacity + len(indices) - len(free)))
+            free = self.slots(FREE)
+        slots = free[:len(indices)]
+
+        self.track_ids[slots] = track_ids
+        self.state[slots] = TRACKED
+        self.hits[slots] = 0
+        self.ages[slots] = -1
+        self.first_seen[slots] = frame_id
+        self.history_len[slots] = 0
+        self.history_head[slots] = 0
+        self.means[slots] = means
+        self.covariances[slots] = covariances
+        # Primera detección: mismo registro que una actualización (hits = 1, age = 0)
+        self.update(slots, detections, indices, frame_id)
+        return slots
+
+    def update(self, slots: np.ndarray, detections: Detections, indices: np.ndarray, frame_id: int):
+        """Asignar a cada slot su detección (reactiva los tracks perdidos)"""
+        self.boxes[slots] = detections.boxes[indices]
+        self.scores[slots] = detections.scores[indices]
+        self.class_ids[slots] = detections.class_ids[indices]
+        self.state[slots] = TRACKED
+        self.hits[slots] += 1
+        self.ages[slots] += 1
+        self.time_since_update[slots] = 0
+        self.updated_frame[slots] = frame_id
+
+        head = self.history_head[slots]
+        self.history[slots, head] = self.boxes[slots]
+        self.history_head[slots] = (head + 1) % self.history_size
+        self.history_len[slots] = np.minimum(self.history_len[slots] + 1, self.history_size)
+
+    def mark_lost(self, slots: np.ndarray):
+        """Marcar tracks como perdidos (se llama en cada frame sin detección)"""
+        self.state[slots] = LOST
+        self.time_since_update[slots] += 1
+        self.ages[slots] += 1
+
+    def remove(self, slots: np.ndarray):
+        """Liberar las filas de los tracks eliminados para reutilizarlas"""
+        self.state[slots] = FREE
+
+    def box_history(self, slot: int) -> np.ndarray:
+        """Boxes del track del más antiguo al más reciente"""
+        length = self.history_len[slot]
+        order = (self.history_head[slot] - length + np.arange(length)) % self.history_size
+        return self.history[slot, order]
+
+    def view(self, slot: int) -> 'TrackView':
+        return TrackView(self, slot)
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.state != FREE))
+
+
+class TrackView:
+    """Acceso por atributos a una fila de TrackTable (no copia datos)"""
+
+    __slots__ = ('table', 'slot')
+
+    def __init__(self, table: TrackTable, slot: int):
+        self.table = table
+        self.slot = slot
+
+    @property
+    def track_id(self) -> int:
+        return int(self.table.track_ids[self.slot])
+
+    @property
+    def bbox(self) -> np.ndarray:
+        return self.table.boxes[self.slot]
+
+    @property
+    def confidence(self) -> float:
+        return float(self.table.scores[self.slot])
+
+    @property
+    def class_id(self) -> int:
+        return int(self.table.class_ids[self.slot])
+
+    @property
+    def state(self) -> str:
+        return _STATE_NAMES[int(self.table.state[self.slot])]
+
+    @property
+    def hits(self) -> int:
+        return int(self.table.hits[self.slot])
+
+    @property
+    def age(self) -> int:
+        return int(self.table.ages[self.slot])
+
+    @property
+    def time_since_update(self) -> int:
+        return int(self.table.time_since_update[self.slot])
+
+    @property
+    def history(self) -> np.ndarray:
+        return self.table.box_history(self.slot)
+
+    def __repr__(self) -> str:
+        return f"TrackView(track_id={self.track_id}, state={self.state}, hits={self.hits})"
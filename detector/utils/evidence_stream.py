@@ -0,0 +1,113 @@
+import threading
+import time
+import logging
+from typing import Callable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from detector.utils.ffmpeg_capture import FFmpegCapture, probe_stream
+
+logger = logging.getLogger(__name__)
+
+
+class EvidenceStream:
+    """Stream principal (alta resolución) que se abre solo cuando se necesita evidencia"""
+
+    def __init__(self, source: str, opener: Callable[[str], object], idle_timeout: float = 30.0):
+        """
+        Inicializar stream de evidencia
+
+        Args:
+            source: URL del stream principal de la cámara
+            opener: Función que abre la fuente y retorna un ThreadedCapture (o None)
+            idle_timeout: Segundos sin pedidos de evidencia antes de cerrar el stream
+        """
+        self.source = source
+        self.opener = opener
+        self.idle_timeout = idle_timeout
+
+        self._cap = None
+        self._opening = False
+        self._lock = threading.Lock()
+        self._last_frame: Optional[np.ndarray] = None
+        self._last_request = 0.0
+        self._retry_at = 0.0
+
+        self.frames_served = 0
+        self.opens = 0
+
+    def probe_size(self) -> Optional[Tuple[int, int]]:
+        """Obtener (ancho, alto) del stream principal sin mantenerlo abierto"""
+        if FFmpegCapture.is_available():
+            info = probe_stream(self.source)
+            if info is not None:
+                return info['width'], info['height']
+
+        cap = cv2.VideoCapture(self.source)
+        try:
+            if cap.isOpened():
+                width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+                height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                if width > 0 and height > 0:
+                    return width, height
+        finally:
+            cap.release()
+        return None
+
+    def get_frame(self) -> Optional[np.ndarray]:
+        """
+        Obtener el frame más reciente del stream principal
+
+        La primera llamada abre el stream en segundo plano y retorna None hasta
+        que esté disponible, para no bloquear el loop de detección.
+
+        Returns:
+            Copia del último frame en alta resolución o None si aún no hay
+        """
+        self._last_request = time.time()
+
+        with self._lock:
+            cap = self._cap
+            if cap is None and not self._opening and self._last_request >= self._retry_at:
+                self._opening = True
+                threading.Thread(target=self._open, name='evidence-open', daemon=True).start()
+
+        if cap is None:
+            return None
+
+        ret, frame, _ = cap.read_latest(timeout=0)
+        if ret:
+            self._last_frame = frame
+        if self._last_frame is None:
+            return None
+
+        self.frames_served += 1
+        return self._last_frame.copy()
+
+    def _open(self):
+        logger.info(f"Abriendo stream principal para evidencia: {self.source}")
+        cap = self.opener(self.source)
+        with self._lock:
+            self._cap = cap
+            self._opening = False
+        if cap is None:
+            self._retry_at = time.time() + self.idle_timeout
+            logger.warning("No se pudo abrir el stream principal, se usará el frame de detección")
+        else:
+            self.opens += 1
+
+    def close_if_idle(self):
+        """Cerrar el stream principal si no se pidió evidencia recientemente"""
+        if self._cap is None or time.time() - self._last_request < self.idle_timeout:
+            return
+        self.release()
+        logger.info("Stream principal de evidencia cerrado por inactividad")
+
+    def release(self):
+        """Cerrar el stream principal"""
+        with self._lock:
+            cap, self._cap = self._cap, None
+            self._last_frame = None
+        if cap is not None:
+            cap.release()
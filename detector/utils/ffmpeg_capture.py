@@ -0,0 +1,209 @@
+import json
+import shutil
+import subprocess
+import logging
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def probe_stream(source: str, ffprobe_path: str = 'ffprobe', timeout: int = 10) -> Optional[dict]:
+    """
+    Obtener resolución y FPS nativos de una fuente con ffprobe
+
+    Args:
+        source: Fuente de video (RTSP, HTTP o archivo)
+        ffprobe_path: Ejecutable de ffprobe
+        timeout: Timeout en segundos
+
+    Returns:
+        Diccionario {'width', 'height', 'fps'} o None si falla
+    """
+    cmd = [ffprobe_path, '-v', 'error', '-select_streams', 'v:0',
+           '-show_entries', 'stream=width,height,avg_frame_rate,r_frame_rate', '-of', 'json']
+    if source.startswith('rtsp://'):
+        cmd += ['-rtsp_transport', 'tcp']
+    cmd.append(source)
+
+    try:
+        result = subprocess.run(cmd, capture_output=True, timeout=timeout, check=True)
+        stream = json.loads(result.stdout)['streams'][0]
+    except Exception as e:
+        logger.warning(f"ffprobe no pudo analizar la fuente {source}: {e}")
+        return None
+
+    fps = 0.0
+    for key in ('avg_frame_rate', 'r_frame_rate'):
+        num, _, den = stream.get(key, '0/0').partition('/')
+        try:
+            fps = float(num) / float(den or 1)
+        except (ValueError, ZeroDivisionError):
+            fps = 0.0
+        if fps > 0:
+            break
+
+    return {'width': int(stream['width']), 'height': int(stream['height']), 'fps': fps}
+
+
+class FFmpegCapture:
+    """Captura de video mediante un subproceso ffmpeg que entrega frames BGR ya escalados"""
+
+    def __init__(self, source: str, width: Optional[int] = None, fps: Optional[float] = None,
+                 num_buffers: int = 8, ffmpeg_path: str = 'ffmpeg', ffprobe_path: str = 'ffprobe'):
+        """
+        Inicializar captura ffmpeg
+
+        Args:
+            source: Fuente de video (RTSP, HTTP o archivo)
+            width: Ancho de salida (el alto mantiene la relación de aspecto); None = nativo
+            fps: FPS de salida (filtro fps de ffmpeg); None = nativo
+            num_buffers: Cantidad de buffers preasignados que se reciclan en rotación
+            ffmpeg_path: Ejecutable de ffmpeg
+            ffprobe_path: Ejecutable de ffprobe
+
+        Los frames devueltos por grab()/read() son vistas sobre buffers preasignados que
+        se reutilizan tras `num_buffers` lecturas: quien necesite conservar un frame más
+        tiempo debe copiarlo o pasar a read() su propio array (como ThreadedCapture).
+        """
+        self.source = source
+        self.ffmpeg_path = ffmpeg_path
+        self._proc: Optional[subprocess.Popen] = None
+        self._frames_read = 0
+        self._last_frame: Optional[np.ndarray] = None
+
+        native = probe_stream(source, ffprobe_path=ffprobe_path)
+        if native is None:
+            raise RuntimeError(f"No se pudo determinar la resolución de la fuente: {source}")
+
+        self.native_width = native['width']
+        self.native_height = native['height']
+        self.native_fps = native['fps'] or 30.0
+
+        # Resolución de salida (par, como exigen muchos filtros de ffmpeg)
+        if width and width < self.native_width:
+            self.width = int(width) // 2 * 2
+            self.height = int(round(self.native_height * self.width / self.native_width)) // 2 * 2
+        else:
+            self.width, self.height = self.native_width, self.native_height
+        self.fps = float(fps) if fps else self.native_fps
+
+        # Buffers preasignados: ffmpeg escribe directamente sobre ellos (sin copias extra)
+        self.frame_size = self.width * self.height * 3
+        self._buffers = np.empty((max(2, num_buffers), self.height, self.width, 3), dtype=np.uint8)
+        self._next_buffer = 0
+
+        self._start()
+
+    def _build_command(self) -> list:
+        cmd = [self.ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-nostdin']
+        if self.source.startswith('rtsp://'):
+            cmd += ['-rtsp_transport', 'tcp', '-fflags', 'nobuffer', '-flags', 'low_delay']
+        cmd += ['-i', self.source, '-an']
+
+        filters = []
+        if self.fps != self.native_fps:
+            filters.append(f'fps={self.fps}')
+        if (self.width, self.height) != (self.native_width, self.native_height):
+            filters.append(f'scale={self.width}:{self.height}')
+        if filters:
+            cmd += ['-vf', ','.join(filters)]
+
+        cmd += ['-pix_fmt', 'bgr24', '-f', 'rawvideo', 'pipe:1']
+        return cmd
+
+    def _start(self):
+        cmd = self._build_command()
+        logger.info(f"Iniciando captura ffmpeg: {self.width}x{self.height} @ {self.fps:g} FPS "
+                    f"(nativo {self.native_width}x{self.native_height} @ {self.native_fps:g} FPS)")
+        self._proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+
+    def _read_into(self, buffer: np.ndarray) -> bool:
+        """Leer exactamente un frame del pipe sobre el buffer dado"""
+        if self._proc is None or self._proc.stdout is None:
+            return False
+        view = memoryview(buffer.reshape(-1))
+        received = 0
+        while received < self.frame_size:
+            n = self._proc.stdout.readinto(view[received:])
+            if not n:
+                return False
+            received += n
+        return True
+
+    def grab(self) -> bool:
+        """Avanzar un frame (interfaz compatible con cv2.VideoCapture)"""
+        buffer = self._buffers[self._next_buffer]
+        if not self._read_into(buffer):
+            return False
+        self._next_buffer = (self._next_buffer + 1) % len(self._buffers)
+        self._last_frame = buffer
+        self._frames_read += 1
+        return True
+
+    def retrieve(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Obtener el último frame leído con grab()"""
+        return self._last_frame is not None, self._last_frame
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Leer el siguiente frame (interfaz compatible con cv2.VideoCapture)
+
+        Args:
+            image: Array del tamaño de salida donde escribir el frame; sin él se usa
+                el siguiente buffer de la rotación
+
+        Returns:
+            Tupla (ok, frame)
+        """
+        if image is None or image.shape != self._buffers.shape[1:] or image.dtype != np.uint8:
+            if not self.grab():
+                return False, None
+            return self.retrieve()
+        if not self._read_into(image):
+            return False, None
+        self._last_frame = image
+        self._frames_read += 1
+        return True, image
+
+    def get(self, prop_id: int) -> float:
+        """Consultar propiedades del stream de salida"""
+        if prop_id == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop_id == cv2.CAP_PROP_POS_MSEC:
+            return 1000.0 * max(0, self._frames_read - 1) / self.fps
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            return float(self._frames_read)
+        return 0.0
+
+    def set(self, prop_id: int, value: float) -> bool:
+        """Las propiedades se fijan al construir la captura"""
+        return False
+
+    def isOpened(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def release(self):
+        """Terminar el subproceso ffmpeg"""
+        if self._proc is None:
+            return
+        try:
+            self._proc.terminate()
+            self._proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+        finally:
+            if self._proc.stdout is not None:
+                self._proc.stdout.close()
+            self._proc = None
+
+    @staticmethod
+    def is_available(ffmpeg_path: str = 'ffmpeg') -> bool:
+        """Verificar que ffmpeg y ffprobe estén instalados"""
+        return shutil.which(ffmpeg_path) is not None and shutil.which('ffprobe') is not None
@@ -0,0 +1,109 @@
+import threading
+import time
+import logging
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class FramePublisher:
+    """Envío en segundo plano de frames JPEG al backend, conservando solo el más reciente"""
+
+    def __init__(self, api_url: str, camera_id: int, timeout: float = 2.0):
+        """
+        Inicializar publicador
+
+        Args:
+            api_url: URL del backend API
+            camera_id: ID de la cámara en el sistema
+            timeout: Timeout de cada envío (no afecta al loop de procesamiento)
+        """
+        self.url = f"{api_url}/api/camera-detection/update-frame/{camera_id}"
+        self.camera_id = camera_id
+        self.timeout = timeout
+
+        # Conexión keep-alive reutilizada entre envíos
+        self._session = requests.Session()
+        self._session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self._session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+        self._pending: Optional[bytes] = None
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self.last_latency: Optional[float] = None
+        self.avg_latency: Optional[float] = None
+
+    def publish(self, jpeg_bytes: bytes):
+        """
+        Dejar un frame listo para enviar (no bloquea)
+
+        Si el frame anterior todavía no salió, se reemplaza: al navegador solo le
+        interesa el último.
+        """
+        with self._condition:
+            if not self._running:
+                self._start()
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = jpeg_bytes
+            self._condition.notify()
+
+    def _start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._send_loop, name=f'frame-publisher-{self.camera_id}',
+                                        daemon=True)
+        self._thread.start()
+
+    def _send_loop(self):
+        while True:
+            with self._condition:
+                while self._running and self._pending is None:
+                    self._condition.wait()
+                if not self._running:
+                    break
+                jpeg_bytes, self._pending = self._pending, None
+
+            start = time.perf_counter()
+            try:
+                files = {'frame': ('frame.jpg', jpeg_bytes, 'image/jpeg')}
+                response = self._session.post(self.url, files=files, timeout=self.timeout)
+                response.close()
+                self.sent += 1
+            except Exception as e:
+                self.failed += 1
+                # No es crítico: loggear solo ocasionalmente para no saturar
+                if self.failed % 100 == 1:
+                    logger.debug(f"Error enviando frame al backend: {e}")
+                continue
+
+            latency = time.perf_counter() - start
+            self.last_latency = latency
+            self.avg_latency = latency if self.avg_latency is None else 0.9 * self.avg_latency + 0.1 * latency
+
+    def get_stats(self) -> dict:
+        """Obtener contadores de frames enviados, descartados y latencia de envío"""
+        return {
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'avg_latency_ms': round(self.avg_latency * 1000, 1) if self.avg_latency is not None else None
+        }
+
+    def stop(self):
+        """Detener el hilo de envío y cerrar la conexión"""
+        with self._condition:
+            if not self._running:
+                return
+            self._running = False
+            self._condition.notify()
+        self._thread.join(timeout=self.timeout + 1)
+        self._session.close()
+        logger.info(f"Publicador de frames detenido: {self.get_stats()}")
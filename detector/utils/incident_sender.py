@@ -0,0 +1,246 @@
+import json
+import os
+import threading
+import time
+import uuid
+import logging
+from collections import deque
+from typing import List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class IncidentSender:
+    """
+    Envío asíncrono de incidentes al backend, en lotes y con spool local
+
+    Los incidentes que no se pueden entregar se agregan a un archivo JSONL y se
+    reenvían cuando el backend vuelve a responder. Cada incidente lleva una
+    idempotency_key, así que un reenvío nunca crea duplicados.
+    """
+
+    def __init__(self, api_url: str, camera_id: int, spool_dir: str = 'spool',
+                 batch_size: int = 50, flush_interval: float = 1.0, timeout: float = 5.0,
+                 retry_interval: float = 10.0):
+        """
+        Inicializar sender
+
+        Args:
+            api_url: URL del backend API
+            camera_id: ID de la cámara (define el nombre del spool)
+            spool_dir: Directorio del spool de incidentes pendientes
+            batch_size: Máximo de incidentes por request
+            flush_interval: Segundos máximos que un incidente espera a completar un lote
+            timeout: Timeout de cada request
+            retry_interval: Segundos entre reintentos mientras el backend no responde
+        """
+        self.api_url = api_url
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.spool_path = os.path.join(spool_dir, f'incidents_camera_{camera_id}.jsonl')
+
+        self._session = requests.Session()
+        self._session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._bulk_supported = True
+
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._retry_at = 0.0
+
+        self.sent = 0
+        self.duplicates = 0
+        self.spooled = 0
+        self.replayed = 0
+
+    def submit(self, incidents: List[dict]):
+        """
+        Encolar incidentes para envío (no bloquea)
+
+        Args:
+            incidents: Incidentes con el formato de IncidentCreate del backend
+        """
+        if not incidents:
+            return
+        for incident in incidents:
+            incident.setdefault('idempotency_key', uuid.uuid4().hex)
+        with self._condition:
+            if not self._running:
+                self._start()
+            self._pending.extend(incidents)
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def _start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._send_loop, name='incident-sender', daemon=True)
+        self._thread.start()
+
+    def _send_loop(self):
+        # Reenviar lo que quedó pendiente de ejecuciones anteriores
+        self._replay_spool()
+
+        while True:
+            with self._condition:
+                if self._running and len(self._pending) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                running = self._running
+
+            if batch:
+                # Con el backend caído no se espera al timeout en cada lote: directo al spool
+                if time.time() < self._retry_at or not self._deliver(batch):
+                    self._spool(batch)
+                elif os.path.exists(self.spool_path):
+                    self._replay_spool()
+            elif time.time() >= self._retry_at and os.path.exists(self.spool_path):
+                self._replay_spool()
+
+            if not running and not self._pending:
+                break
+
+    def _deliver(self, batch: List[dict]) -> bool:
+        """Enviar un lote al backend. Retorna False si hay que reintentar más tarde"""
+        try:
+            if self._bulk_supported:
+                response = self._post('/api/incidents/bulk', {'incidents': batch})
+                if response.status_code == 404:
+                    # Backend sin endpoint bulk: enviar de a uno
+                    self._bulk_supported = False
+                    logger.warning("El backend no soporta /api/incidents/bulk, se envía de a uno")
+                    return self._deliver(batch)
+                if response.status_code == 200:
+                    result = response.json()
+                    self.sent += result.get('created', len(batch))
+                    self.duplicates += result.get('duplicates', 0)
+                    logger.info(f"Incidentes enviados: {len(batch)} ({result.get('duplicates', 0)} ya registrados)")
+                    rejected = [batch[i] for i in result.get('rejected', []) if 0 <= i < len(batch)]
+                    if rejected:
+                        # Solo esos incidentes van a revisión; el resto del lote ya quedó registrado
+                        logger.error(f"Incidentes rechazados por el backend: {len(rejected)}")
+                        self._append(f'{self.spool_path}.rejected', rejected)
+                    return True
+                if response.status_code < 500 and len(batch) > 1:
+                    # Un incidente inválido (p. ej. 422 de validación) rechaza el request entero:
+                    # enviar de a uno para que solo los inválidos vayan a revisión
+                    logger.warning(f"Lote rechazado por el backend ({response.status_code}), se envía de a uno")
+                    return self._deliver_one_by_one(batch)
+                return self._handle_error(response, batch)
+
+            return self._deliver_one_by_one(batch)
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Backend no disponible, incidentes al spool: {e}")
+            self._retry_at = time.time() + self.retry_interval
+            return False
+
+    def _deliver_one_by_one(self, batch: List[dict]) -> bool:
+        """Enviar un lote de a un incidente (los errores de conexión los maneja _deliver)"""
+        # Si falla a mitad de lote se reintenta el lote entero: la idempotency_key evita duplicados
+        for incident in batch:
+            response = self._post('/api/incidents/', incident)
+            if response.status_code == 200:
+                self.sent += 1
+            elif not self._handle_error(response, [incident]):
+                return False
+        return True
+
+    def _post(self, path: str, payload) -> requests.Response:
+        data = json.dumps(payload, default=float)
+        return self._session.post(f"{self.api_url}{path}", data=data, timeout=self.timeout,
+                                  headers={'Content-Type': 'application/json'})
+
+    def _handle_error(self, response: requests.Response, batch: List[dict]) -> bool:
+        """Errores 5xx: reintentar; 4xx: el payload es inválido y reintentar no sirve"""
+        if response.status_code >= 500:
+            logger.warning(f"Error del backend enviando incidentes: {response.status_code}")
+            self._retry_at = time.time() + self.retry_interval
+            return False
+        # Conservar el incidente rechazado para revisión en lugar de perderlo
+        logger.error(f"Incidentes rechazados por el backend ({response.status_code}): {response.text[:200]}")
+        self._append(f'{self.spool_path}.rejected', batch)
+        return True
+
+    def _append(self, path: str, incidents: List[dict]):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a') as f:
+            for incident in incidents:
+                f.write(json.dumps(incident, default=float) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _spool(self, incidents: List[dict]):
+        """Guardar incidentes no entregados en el spool (append + fsync)"""
+        if not incidents:
+            return
+        try:
+            self._append(self.spool_path, incidents)
+            self.spooled += len(incidents)
+        except OSError as e:
+            # Último recurso: devolverlos a la cola en memoria
+            logger.error(f"No se pudo escribir el spool de incidentes: {e}")
+            with self._condition:
+                self._pending.extendleft(reversed(incidents))
+
+    def _replay_spool(self):
+        """Reenviar los incidentes del spool; los que vuelvan a fallar quedan en él"""
+        replay_path = f'{self.spool_path}.replay'
+        if not os.path.exists(replay_path):
+            if not os.path.exists(self.spool_path):
+                return
+            # Renombrar antes de leer: lo que falle durante el reenvío se agrega a un spool nuevo
+            os.replace(self.spool_path, replay_path)
+
+        incidents = []
+        with open(replay_path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    incidents.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Línea truncada por un corte de energía durante la escritura
+                    logger.warning("Línea inválida en el spool de incidentes, se descarta")
+
+        logger.info(f"Reenviando {len(incidents)} incidentes del spool")
+        for start in range(0, len(incidents), self.batch_size):
+            batch = incidents[start:start + self.batch_size]
+            if not self._deliver(batch):
+                self._spool(incidents[start:])
+                break
+            self.replayed += len(batch)
+        os.remove(replay_path)
+
+    def get_stats(self) -> dict:
+        """Obtener contadores de incidentes enviados, duplicados y en spool"""
+        return {
+            'sent': self.sent,
+            'duplicates': self.duplicates,
+            'spooled': self.spooled,
+            'replayed': self.replayed,
+            'pending': len(self._pending)
+        }
+
+    def stop(self, timeout: float = 10.0):
+        """Enviar (o mandar al spool) lo pendiente y detener el hilo"""
+        with self._condition:
+            if not self._running:
+                return
+            self._running = False
+            self._condition.notify()
+        self._thread.join(timeout=timeout)
+        # Si el backend no respondió a tiempo, no perder lo que quedó en memoria
+        with self._condition:
+            remaining = list(self._pending)
+            self._pending.clear()
+        if remaining:
+            self._spool(remaining)
+        self._session.close()
+        logger.info(f"Envío de incidentes detenido: {self.get_stats()}")
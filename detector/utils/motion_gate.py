@@ -0,0 +1,120 @@
+import time
+import logging
+from typing import Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MotionGate:
+    """Compuerta de movimiento: evita la inferencia sobre escenas estáticas o streams congelados"""
+
+    def __init__(self, motion_threshold: float = 0.002, pixel_threshold: int = 25,
+                 heartbeat_interval: float = 5.0, frozen_timeout: float = 10.0,
+                 scale_width: int = 160):
+        """
+        Inicializar compuerta
+
+        Args:
+            motion_threshold: Fracción mínima de píxeles cambiados para considerar que hubo movimiento
+            pixel_threshold: Diferencia de gris (0-255) a partir de la cual un píxel cuenta como cambiado
+            heartbeat_interval: Segundos máximos sin inferencia aunque no haya movimiento
+            frozen_timeout: Segundos con frames idénticos para considerar el stream congelado
+            scale_width: Ancho del frame reducido en gris sobre el que se compara
+        """
+        self.motion_threshold = motion_threshold
+        self.pixel_threshold = pixel_threshold
+        self.heartbeat_interval = heartbeat_interval
+        self.frozen_timeout = frozen_timeout
+        self.scale_width = scale_width
+
+        self._previous: Optional[np.ndarray] = None
+        self._last_detection: Optional[float] = None
+        self._last_change: Optional[float] = None
+
+        self.motion_ratio = 0.0
+        self.frozen = False
+
+        self.checked_frames = 0
+        self.skipped_frames = 0
+        self.heartbeat_frames = 0
+        self.frozen_frames = 0
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        """Reducir y pasar a gris (primero reducir: la conversión opera sobre menos píxeles)"""
+        height, width = frame.shape[:2]
+        scale_height = max(1, int(round(height * self.scale_width / width)))
+        small = cv2.resize(frame, (self.scale_width, scale_height), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def should_detect(self, frame: np.ndarray, timestamp: Optional[float] = None,
+                      has_tracks: bool = False) -> bool:
+        """
+        Decidir si el frame necesita inferencia
+
+        Args:
+            frame: Frame de video (BGR)
+            timestamp: Momento de captura del frame (por defecto, ahora)
+            has_tracks: Hay tracks vivos que deben seguir actualizándose
+
+        Returns:
+            True si hay que ejecutar la detección sobre el frame
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        self.checked_frames += 1
+
+        current = self._prepare(frame)
+        previous, self._previous = self._previous, current
+        if previous is None or previous.shape != current.shape:
+            self._last_change = timestamp
+            return self._accept(timestamp)
+
+        diff = cv2.absdiff(current, previous)
+        changed = int(np.count_nonzero(diff > self.pixel_threshold))
+        self.motion_ratio = changed / diff.size
+
+        # Stream congelado: frames idénticos durante más de frozen_timeout segundos
+        if diff.any():
+            self._last_change = timestamp
+            if self.frozen:
+                self.frozen = False
+                logger.info("El stream volvió a entregar frames nuevos")
+        elif not self.frozen and timestamp - self._last_change >= self.frozen_timeout:
+            self.frozen = True
+            logger.warning(f"Stream congelado: frames idénticos durante {self.frozen_timeout:.0f}s, "
+                           f"se suspende la inferencia")
+        if self.frozen:
+            self.frozen_frames += 1
+            self.skipped_frames += 1
+            return False
+
+        if has_tracks or self.motion_ratio >= self.motion_threshold:
+            return self._accept(timestamp)
+
+        # Heartbeat: inferencia periódica para no perder objetos que entraron sin movimiento visible
+        if self._last_detection is None or timestamp - self._last_detection >= self.heartbeat_interval:
+            self.heartbeat_frames += 1
+            return self._accept(timestamp)
+
+        self.skipped_frames += 1
+        return False
+
+    def _accept(self, timestamp: float) -> bool:
+        self._last_detection = timestamp
+        return True
+
+    def get_stats(self) -> dict:
+        """Obtener contadores de frames evaluados y omitidos"""
+        return {
+            'checked_frames': self.checked_frames,
+            'skipped_frames': self.skipped_frames,
+            'heartbeat_frames': self.heartbeat_frames,
+            'frozen_frames': self.frozen_frames,
+            'skip_ratio': round(self.skipped_frames / self.checked_frames, 3) if self.checked_frames else 0.0,
+            'frozen': self.frozen
+        }
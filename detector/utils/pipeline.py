@@ -0,0 +1,257 @@
+import queue
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Marca de fin de stream que se propaga por todas las etapas
+_STOP = object()
+
+
+class _Stage:
+    """Etapa del pipeline: un hilo que consume de una cola y produce en la siguiente"""
+
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], None],
+                 input_queue: queue.Queue, output_queue: Optional[queue.Queue],
+                 on_done: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.name = name
+        self.func = func
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.on_done = on_done
+        self.processed = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self.thread = threading.Thread(target=self._run, name=f"pipeline-{name}", daemon=True)
+
+    def _run(self):
+        while True:
+            item = self.input_queue.get()
+            if item is _STOP:
+                if self.output_queue is not None:
+                    self.output_queue.put(_STOP)
+                break
+
+            start = time.perf_counter()
+            try:
+                self.func(item)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error en etapa '{self.name}' del pipeline: {e}", exc_info=True)
+                continue
+            finally:
+                elapsed = time.perf_counter() - start
+                self.busy_time += elapsed
+                item['stage_times'].append(elapsed)
+            self.processed += 1
+
+            if self.on_done is not None:
+                self.on_done(item)
+
+            # put() bloqueante: si la etapa siguiente está saturada se propaga la contrapresión
+            if self.output_queue is not None:
+                self.output_queue.put(item)
+
+
+class FramePipeline:
+    """Ejecutor en pipeline de VideoProcessor (detección / tracking / anotación / publicación)"""
+
+    def __init__(self, processor, queue_depth: int = 2, drop_when_full: bool = True,
+                 output_depth: int = 4, release_frame: Optional[Callable[[np.ndarray], None]] = None,
+                 on_processed: Optional[Callable[[List[float], float], None]] = None):
+        """
+        Inicializar pipeline
+
+        Args:
+            processor: VideoProcessor con las etapas detect/track/annotate/encode/publish
+            queue_depth: Capacidad de las colas entre etapas
+            drop_when_full: Si la entrada está llena, descartar el frame en lugar de bloquear
+                (y descartar frames anotados viejos si nadie consume la salida); con False
+                no se pierde ningún frame y hay que consumir la salida (on_result)
+            output_depth: Capacidad de la cola de frames anotados para display/escritura
+            release_frame: Función que devuelve a la captura el buffer de un frame que el
+                pipeline ya no usa (ThreadedCapture.release_frame)
+            on_processed: Receptor, por cada frame terminado, de (segundos en cada etapa,
+                timestamp de captura) para el control de tasa
+        """
+        self.processor = processor
+        self.queue_depth = max(1, queue_depth)
+        self.drop_when_full = drop_when_full
+        self.release_frame = release_frame
+        self.on_processed = on_processed
+
+        self._queues = [queue.Queue(maxsize=self.queue_depth) for _ in range(4)]
+        self._output: queue.Queue = queue.Queue(maxsize=max(1, output_depth))
+
+        self._stages: List[_Stage] = [
+            _Stage('detect', self._detect, self._queues[0], self._queues[1]),
+            _Stage('track', self._track, self._queues[1], self._queues[2]),
+            _Stage('annotate', self._annotate, self._queues[2], self._queues[3]),
+            _Stage('publish', self._publish, self._queues[3], None, on_done=self._finished),
+        ]
+
+        self.submitted = 0
+        self.dropped_frames = 0
+        self.dropped_outputs = 0
+        self._started = False
+
+    def start(self) -> 'FramePipeline':
+        """Iniciar los hilos de todas las etapas"""
+        if not self._started:
+            for stage in self._stages:
+                stage.thread.start()
+            self._started = True
+            logger.info(f"Pipeline iniciado ({len(self._stages)} etapas, colas de {self.queue_depth})")
+        return self
+
+    def submit(self, frame: np.ndarray, timestamp: Optional[float] = None,
+               on_result: Optional[Callable[[np.ndarray], None]] = None) -> bool:
+        """
+        Encolar un frame para procesamiento
+
+        Args:
+            frame: Frame de video (BGR)
+            timestamp: Momento de captura del frame (por defecto, ahora)
+            on_result: Receptor de frames anotados mientras se espera lugar en la entrada.
+                Con contrapresión 'block' la salida no descarta frames: si nadie la consume
+                mientras submit() espera, el pipeline se detiene
+
+        Returns:
+            True si el frame fue encolado, False si se descartó por contrapresión
+        """
+        item = {'frame': frame, 'timestamp': timestamp if timestamp is not None else time.time(),
+                'stage_times': []}
+        if self.drop_when_full:
+            try:
+                self._queues[0].put_nowait(item)
+            except queue.Full:
+                self.dropped_frames += 1
+                if self.release_frame is not None:
+                    self.release_frame(frame)
+                return False
+        else:
+            self._put_draining(item, on_result)
+        self.submitted += 1
+        return True
+
+    def get_result(self, timeout: Optional[float] = 0) -> Optional[np.ndarray]:
+        """Obtener el siguiente frame anotado disponible (None si no hay)"""
+        try:
+            if timeout == 0:
+                return self._output.get_nowait()
+            return self._output.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def stop(self, timeout: float = 5.0, on_result: Optional[Callable[[np.ndarray], None]] = None):
+        """
+        Vaciar el pipeline y detener las etapas
+
+        Args:
+            timeout: Segundos máximos de espera
+            on_result: Receptor de los frames anotados que salen mientras se vacía
+        """
+        if not self._started:
+            return
+        deadline = time.time() + timeout
+        if self._put_draining(_STOP, on_result, deadline):
+            for stage in self._stages:
+                while stage.thread.is_alive() and time.time() < deadline:
+                    stage.thread.join(timeout=0.05)
+                    self._deliver_results(on_result)
+        self._deliver_results(on_result)
+        self._started = False
+        logger.info(f"Pipeline detenido: {self.get_stats()}")
+
+    def _put_draining(self, item: Any, on_result: Optional[Callable[[np.ndarray], None]],
+                      deadline: Optional[float] = None) -> bool:
+        """
+        put() en la entrada que, mientras está llena, entrega los frames terminados
+
+        Sin esto, con la salida llena el hilo que encola quedaría esperando a la
+        etapa de publicación y ésta a que alguien retire sus frames.
+        """
+        while True:
+            try:
+                self._queues[0].put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                if deadline is not None and time.time() >= deadline:
+                    return False
+                self._deliver_results(on_result)
+
+    def _deliver_results(self, on_result: Optional[Callable[[np.ndarray], None]]):
+        """Pasar a on_result todos los frames anotados disponibles"""
+        if on_result is None:
+            return
+        result = self.get_result()
+        while result is not None:
+            on_result(result)
+            result = self.get_result()
+
+    def get_stats(self) -> dict:
+        """Obtener contadores por etapa y de frames descartados"""
+        return {
+            'submitted': self.submitted,
+            'dropped_frames': self.dropped_frames,
+            'dropped_outputs': self.dropped_outputs,
+            'stages': {
+                stage.name: {
+                    'processed': stage.processed,
+                    'errors': stage.errors,
+                    'busy_time': round(stage.busy_time, 3),
+                    'queued': stage.input_queue.qsize()
+                }
+                for stage in self._stages
+            }
+        }
+
+    def _finished(self, item: Dict[str, Any]):
+        if self.on_processed is not None:
+            self.on_processed(item['stage_times'], item['timestamp'])
+
+    # Etapas
+
+    def _detect(self, item: Dict[str, Any]):
+        item['detections'] = self.processor.detect_stage(item['frame'], item['timestamp'])
+
+    def _track(self, item: Dict[str, Any]):
+        item['tracked'], item['incidents'] = self.processor.track_stage(
+            item.pop('detections'), item['timestamp'], item['frame']
+        )
+
+    def _annotate(self, item: Dict[str, Any]):
+        frame, tracked = item['frame'], item.pop('tracked')
+        render, publish = self.processor.output_plan()
+        item['rendered'] = render
+        item['annotated'] = self.processor.annotate_stage(frame, tracked) if render else frame
+        item['jpeg'] = self.processor.encode_stage(item['annotated']) if publish else None
+
+    def _publish(self, item: Dict[str, Any]):
+        self.processor.publish_stage(item.pop('incidents'), item.pop('jpeg'))
+        annotated = self.processor.finish_stage(item.pop('annotated'), draw_overlay=item.pop('rendered'))
+        frame = item.pop('frame')
+        # Sin anotar, la salida es el propio frame de la captura: su buffer no se devuelve
+        if self.release_frame is not None and annotated is not frame:
+            self.release_frame(frame)
+
+        if not self.drop_when_full:
+            # Contrapresión 'block' (archivos): cada frame anotado llega al consumidor
+            self._output.put(annotated)
+            return
+
+        # En vivo la salida es best-effort: si nadie la consume se descarta el frame más viejo
+        while True:
+            try:
+                self._output.put_nowait(annotated)
+                break
+            except queue.Full:
+                try:
+                    self._output.get_nowait()
+                    self.dropped_outputs += 1
+                except queue.Empty:
+                    pass
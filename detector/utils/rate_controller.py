@@ -0,0 +1,118 @@
+import math
+import time
+import logging
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveRateController:
+    """Controlador adaptativo de frames a saltar según el tiempo real de procesamiento"""
+
+    def __init__(self, source_fps: float, target_fps: float = 10.0,
+                 latency_budget: float = 0.5, max_skip: Optional[int] = None,
+                 live: bool = True, smoothing: float = 0.2, report_interval: float = 10.0):
+        """
+        Inicializar controlador
+
+        Args:
+            source_fps: FPS nominales de la fuente de video
+            target_fps: Tasa de procesamiento deseada (frames procesados por segundo de video)
+            latency_budget: Retraso máximo aceptable entre captura y resultado, en segundos
+            max_skip: Máximo de frames a saltar (por defecto, 1 segundo de video)
+            live: Fuente en vivo; en archivos no hace falta mantener el ritmo de la fuente
+            smoothing: Factor de suavizado exponencial del tiempo de procesamiento
+            report_interval: Cada cuántos segundos loggear la tasa efectiva
+        """
+        self.source_fps = max(1.0, float(source_fps))
+        self.target_fps = max(0.1, float(target_fps))
+        self.latency_budget = latency_budget
+        self.max_skip = max_skip or max(1, int(self.source_fps))
+        self.live = live
+        self.smoothing = smoothing
+        self.report_interval = report_interval
+
+        # Salto mínimo para no superar la tasa objetivo
+        self.base_skip = max(1, round(self.source_fps / self.target_fps))
+        self.skip = self.base_skip
+        self._backlog_skip = 0
+
+        self.avg_processing_time: Optional[float] = None
+        self.last_latency: Optional[float] = None
+        self._last_processed_idx: Optional[int] = None
+        self._processed_times = deque(maxlen=120)
+        self._last_report = time.time()
+
+    def should_process(self, frame_idx: int) -> bool:
+        """Indicar si el frame con este índice debe procesarse"""
+        if self._last_processed_idx is None or frame_idx - self._last_processed_idx >= self.skip:
+            self._last_processed_idx = frame_idx
+            return True
+        return False
+
+    def record(self, processing_time: Optional[float], latency: Optional[float] = None,
+               waiting: Optional[float] = None):
+        """
+        Registrar el resultado de procesar un frame y recalcular el salto
+
+        Args:
+            processing_time: Tiempo que tomó procesar el frame, en segundos (None si no se conoce)
+            latency: Retraso entre la captura del frame y el fin del procesamiento (si se conoce)
+            waiting: Parte de la latencia que el frame pasó esperando en colas (por defecto,
+                latency - processing_time; en un pipeline el frame también pasa por las
+                etapas que no son el cuello de botella)
+        """
+        now = time.time()
+        self._processed_times.append(now)
+
+        if processing_time is not None:
+            if self.avg_processing_time is None:
+                self.avg_processing_time = processing_time
+            else:
+                self.avg_processing_time += self.smoothing * (processing_time - self.avg_processing_time)
+
+        # Salto necesario para mantener el ritmo de la fuente con el tiempo de procesamiento actual
+        keep_up_skip = 1
+        if self.live and self.avg_processing_time is not None:
+            keep_up_skip = math.ceil(self.avg_processing_time * self.source_fps)
+
+        # Si la latencia supera el presupuesto por frames acumulados (no por el propio
+        # procesamiento) se salta más para vaciar el atraso, y se recupera gradualmente
+        if latency is not None:
+            self.last_latency = latency
+            if waiting is None:
+                waiting = latency - (processing_time or 0.0)
+            if latency > self.latency_budget and waiting > 0.5 * (self.avg_processing_time or 0.0):
+                self._backlog_skip = min(self.max_skip, self._backlog_skip + 1)
+            elif latency < self.latency_budget / 2 and self._backlog_skip > 0:
+                self._backlog_skip -= 1
+
+        self.skip = min(self.max_skip, max(self.base_skip, keep_up_skip) + self._backlog_skip)
+
+        if now - self._last_report >= self.report_interval:
+            self._last_report = now
+            self._report()
+
+    @property
+    def effective_fps(self) -> float:
+        """Frames procesados por segundo (reloj de pared) en la ventana reciente"""
+        if len(self._processed_times) < 2:
+            return 0.0
+        elapsed = self._processed_times[-1] - self._processed_times[0]
+        return (len(self._processed_times) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def get_stats(self) -> dict:
+        """Obtener estado actual del controlador"""
+        return {
+            'skip': self.skip,
+            'effective_fps': round(self.effective_fps, 2),
+            'avg_processing_ms': round((self.avg_processing_time or 0.0) * 1000, 1),
+            'latency_ms': round(self.last_latency * 1000, 1) if self.last_latency is not None else None
+        }
+
+    def _report(self):
+        stats = self.get_stats()
+        latency = f", latencia={stats['latency_ms']} ms" if stats['latency_ms'] is not None else ""
+        logger.info(f"Tasa efectiva: {stats['effective_fps']} FPS (salto={stats['skip']}, "
+                    f"procesamiento={stats['avg_processing_ms']} ms{latency})")
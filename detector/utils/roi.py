@@ -0,0 +1,86 @@
+import logging
+from typing import Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from detector.detection.detections import Detections
+
+logger = logging.getLogger(__name__)
+
+
+class RegionOfInterest:
+    """Región de interés poligonal: recorta el frame antes de la inferencia y filtra detecciones"""
+
+    def __init__(self, points: Sequence[Sequence[float]]):
+        """
+        Inicializar región de interés
+
+        Args:
+            points: Vértices [[x, y], ...] del polígono en coordenadas del frame procesado
+        """
+        self.polygon = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        if len(self.polygon) < 3:
+            raise ValueError("La región de interés necesita al menos 3 puntos")
+
+        self._frame_shape: Optional[Tuple[int, int]] = None
+        self.rect = (0, 0, 0, 0)
+        self._mask: Optional[np.ndarray] = None
+
+        self.kept = 0
+        self.discarded = 0
+
+    def _prepare(self, frame_shape: Tuple[int, int]):
+        """Calcular rectángulo envolvente y máscara para un tamaño de frame (solo si cambia)"""
+        if self._frame_shape == frame_shape:
+            return
+        height, width = frame_shape
+        x, y, w, h = cv2.boundingRect(np.round(self.polygon).astype(np.int32))
+        x1, y1 = max(0, x), max(0, y)
+        x2, y2 = min(width, x + w), min(height, y + h)
+        if x2 <= x1 or y2 <= y1:
+            logger.warning("La región de interés queda fuera del frame; se usa el frame completo")
+            x1, y1, x2, y2 = 0, 0, width, height
+        self.rect = (x1, y1, x2, y2)
+
+        # Máscara del tamaño del recorte: la consulta por detección es un acceso a un array
+        mask = np.zeros((y2 - y1, x2 - x1), dtype=np.uint8)
+        cv2.fillPoly(mask, [np.round(self.polygon - (x1, y1)).astype(np.int32)], 1)
+        self._mask = mask
+        self._frame_shape = frame_shape
+
+        area = 100.0 * (x2 - x1) * (y2 - y1) / (width * height)
+        logger.info(f"Región de interés: recorte {x2 - x1}x{y2 - y1} ({area:.0f}% del frame)")
+
+    def crop(self, frame: np.ndarray) -> np.ndarray:
+        """Recortar el frame al rectángulo envolvente del polígono (vista, sin copia)"""
+        self._prepare(frame.shape[:2])
+        x1, y1, x2, y2 = self.rect
+        return frame[y1:y2, x1:x2]
+
+    def filter(self, detections: Detections) -> Detections:
+        """
+        Llevar detecciones del recorte a coordenadas del frame y descartar las de fuera del polígono
+
+        Se evalúa el punto inferior central del bbox (contacto del vehículo con la calzada).
+
+        Args:
+            detections: Detecciones sobre el frame recortado por crop()
+
+        Returns:
+            Detecciones dentro de la región, con bbox en coordenadas del frame completo
+        """
+        if self._mask is None:
+            return detections
+        x1, y1, _, _ = self.rect
+        mask_h, mask_w = self._mask.shape
+
+        boxes = detections.boxes
+        px = np.clip(((boxes[:, 0] + boxes[:, 2]) / 2).astype(np.int32), 0, mask_w - 1)
+        py = np.clip(boxes[:, 3].astype(np.int32), 0, mask_h - 1)
+        kept = detections[self._mask[py, px].astype(bool)]
+        kept.boxes += np.array([x1, y1, x1, y1], dtype=np.float32)
+
+        self.discarded += len(detections) - len(kept)
+        self.kept += len(kept)
+        return kept
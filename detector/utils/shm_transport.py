@@ -0,0 +1,132 @@
+import mmap
+import os
+import tempfile
+import time
+import logging
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Formato del archivo (debe coincidir con backend/app/services/shared_frames.py):
+#   cabecera (64 bytes) | cabecera de cada slot (64 bytes c/u) | datos de cada slot
+# Cada slot usa un seqlock: `seq` impar mientras se escribe, par (2 * n) al terminar el frame n.
+MAGIC = b'VOIF'
+VERSION = 1
+HEADER_DTYPE = np.dtype({
+    'names': ['magic', 'version', 'num_slots', 'slot_capacity', 'write_seq'],
+    'formats': ['S4', '<u4', '<u4', '<u8', '<u8'],
+    'offsets': [0, 4, 8, 16, 24],
+    'itemsize': 64
+})
+SLOT_DTYPE = np.dtype({
+    'names': ['seq', 'timestamp', 'width', 'height', 'channels', 'nbytes'],
+    'formats': ['<u8', '<f8', '<u4', '<u4', '<u4', '<u8'],
+    'offsets': [0, 8, 16, 20, 24, 32],
+    'itemsize': 64
+})
+
+
+def default_shm_dir() -> str:
+    """Directorio por defecto de los buffers compartidos (en RAM si existe /dev/shm)"""
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, 'voi_frames')
+
+
+class SharedFrameWriter:
+    """Publicación de frames BGR en un ring buffer mmap por cámara, leído sin copias por el backend"""
+
+    def __init__(self, camera_id: int, shm_dir: Optional[str] = None, num_slots: int = 4):
+        """
+        Inicializar escritor
+
+        Args:
+            camera_id: ID de la cámara (define el nombre del archivo)
+            shm_dir: Directorio compartido con el backend (por defecto, /dev/shm/voi_frames)
+            num_slots: Cantidad de frames en el ring buffer
+
+        El archivo se crea con el primer frame, dimensionado para ese tamaño de frame.
+        """
+        self.camera_id = camera_id
+        self.path = os.path.join(shm_dir or default_shm_dir(), f'camera_{camera_id}.bin')
+        self.num_slots = max(2, num_slots)
+
+        self._mmap: Optional[mmap.mmap] = None
+        self._header = None
+        self._slots = None
+        self._data_offset = 0
+        self._slot_capacity = 0
+
+        self.sent = 0
+
+    def _create(self, frame: np.ndarray):
+        """Crear el archivo con el tamaño de este frame y publicarlo de forma atómica"""
+        self._close()
+        self._slot_capacity = frame.nbytes
+        self._data_offset = HEADER_DTYPE.itemsize + SLOT_DTYPE.itemsize * self.num_slots
+        size = self._data_offset + self._slot_capacity * self.num_slots
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb+') as f:
+            f.truncate(size)
+            self._mmap = mmap.mmap(f.fileno(), size)
+
+        self._header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self._mmap, offset=0)
+        self._slots = np.ndarray((self.num_slots,), dtype=SLOT_DTYPE, buffer=self._mmap,
+                                 offset=HEADER_DTYPE.itemsize)
+        self._header['version'] = VERSION
+        self._header['num_slots'] = self.num_slots
+        self._header['slot_capacity'] = self._slot_capacity
+        self._header['write_seq'] = 0
+        self._header['magic'] = MAGIC
+        # rename() es atómico: el backend nunca ve un archivo a medio inicializar
+        os.replace(tmp_path, self.path)
+        logger.info(f"Transporte de frames en memoria compartida: {self.path} "
+                    f"({self.num_slots} slots de {self._slot_capacity / 1e6:.1f} MB)")
+
+    def publish(self, frame: np.ndarray):
+        """
+        Copiar el frame al siguiente slot del ring buffer (no bloquea)
+
+        Args:
+            frame: Frame BGR (uint8) a publicar
+        """
+        if self._mmap is None or frame.nbytes > self._slot_capacity:
+            if self._mmap is not None:
+                logger.warning("El frame supera el tamaño del slot: se recrea el buffer compartido")
+            self._create(frame)
+
+        seq = int(self._header['write_seq'])
+        index = seq % self.num_slots
+        slot = self._slots[index]
+        offset = self._data_offset + index * self._slot_capacity
+
+        # Seqlock: impar mientras se escribe, para que el lector descarte lecturas a medias
+        slot['seq'] = 2 * seq + 1
+        data = np.ndarray(frame.shape, dtype=np.uint8, buffer=self._mmap, offset=offset)
+        np.copyto(data, frame)
+        slot['timestamp'] = time.time()
+        slot['height'], slot['width'] = frame.shape[:2]
+        slot['channels'] = frame.shape[2] if frame.ndim == 3 else 1
+        slot['nbytes'] = frame.nbytes
+        slot['seq'] = 2 * seq + 2
+        self._header['write_seq'] = seq + 1
+        self.sent += 1
+
+    def get_stats(self) -> dict:
+        """Obtener contadores de frames publicados"""
+        return {'sent': self.sent, 'path': self.path}
+
+    def _close(self):
+        self._header = None
+        self._slots = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def stop(self):
+        """Cerrar el buffer compartido (el archivo queda para que el backend muestre el último frame)"""
+        self._close()
+        logger.info(f"Transporte de frames en memoria compartida cerrado: {self.get_stats()}")
@@ -0,0 +1,172 @@
+import threading
+import time
+import logging
+from collections import deque
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadedCapture:
+    """
+    Captura de video en segundo plano con buffer circular del frame más reciente
+
+    Cada frame se lee sobre un array propio que no se reutiliza mientras el
+    consumidor lo tenga: los frames entregados por read_latest() le pertenecen
+    hasta que los devuelva con release_frame() (si nunca los devuelve, se
+    asignan arrays nuevos). Los frames descartados sin entregar se reciclan solos.
+    """
+
+    def __init__(self, cap, buffer_size: int = 2, name: str = "captura"):
+        """
+        Inicializar captura en segundo plano
+
+        Args:
+            cap: Objeto de captura ya abierto (cv2.VideoCapture o compatible)
+            buffer_size: Tamaño del buffer circular (se descartan los frames más antiguos)
+            name: Nombre del hilo de captura (para logs)
+        """
+        self.cap = cap
+        self.buffer_size = max(1, buffer_size)
+        self.name = name
+
+        self._buffer = deque()
+        self._free: List[np.ndarray] = []  # Arrays que ningún consumidor está usando
+        self._frame_shape: Optional[tuple] = None
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        # Contadores
+        self.frames_captured = 0
+        self.frames_delivered = 0
+        self.dropped_frames = 0
+        self.read_failures = 0
+        self.last_capture_time: Optional[float] = None
+        self.last_frame_index = 0  # Número de captura del último frame entregado
+
+    def start(self) -> 'ThreadedCapture':
+        """Iniciar el hilo de captura"""
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._capture_loop, name=self.name, daemon=True)
+        self._thread.start()
+        logger.info(f"Captura en segundo plano iniciada (buffer de {self.buffer_size} frames)")
+        return self
+
+    def _capture_loop(self):
+        """Leer frames continuamente y guardarlos en el buffer circular"""
+        while self._running:
+            buffer = self._take_buffer()
+            if buffer is not None:
+                ret, frame = self.cap.read(buffer)
+            else:
+                # Primer frame: la captura puede devolver un buffer propio que reutilizará
+                ret, frame = self.cap.read()
+                if ret and frame is not None:
+                    frame = frame.copy()
+                    self._frame_shape = frame.shape
+            timestamp = time.time()
+
+            if not ret or frame is None:
+                if buffer is not None:
+                    self.release_frame(buffer)
+                self.read_failures += 1
+                if self.read_failures % 50 == 1:
+                    logger.warning("No se pudo leer frame del stream, reintentando...")
+                time.sleep(0.05)
+                continue
+
+            with self._condition:
+                # Si el buffer está lleno se descarta el frame más antiguo
+                if len(self._buffer) == self.buffer_size:
+                    self._free.append(self._buffer.popleft()[0])
+                    self.dropped_frames += 1
+                self.frames_captured += 1
+                self._buffer.append((frame, timestamp, self.frames_captured))
+                self.last_capture_time = timestamp
+                self._condition.notify_all()
+
+    def _take_buffer(self) -> Optional[np.ndarray]:
+        """Array libre donde leer el próximo frame (uno nuevo si todos están en uso)"""
+        with self._condition:
+            if self._free:
+                return self._free.pop()
+        if self._frame_shape is None:
+            return None
+        return np.empty(self._frame_shape, dtype=np.uint8)
+
+    def read_latest(self, timeout: float = 1.0) -> Tuple[bool, Optional[np.ndarray], Optional[float]]:
+        """
+        Obtener el frame más reciente que aún no fue entregado
+
+        El frame no se sobrescribe mientras el consumidor lo use; al terminar con
+        él conviene devolverlo con release_frame() para reutilizar su memoria.
+
+        Args:
+            timeout: Tiempo máximo de espera en segundos por un frame nuevo
+
+        Returns:
+            Tupla (ok, frame, timestamp de captura)
+        """
+        with self._condition:
+            if not self._buffer:
+                self._condition.wait_for(lambda: len(self._buffer) > 0 or not self._running, timeout)
+            if not self._buffer:
+                return False, None, None
+
+            frame, timestamp, self.last_frame_index = self._buffer.pop()
+            # Los frames más viejos que quedan en el buffer ya no se procesarán
+            self.dropped_frames += len(self._buffer)
+            self._free.extend(old_frame for old_frame, _, _ in self._buffer)
+            self._buffer.clear()
+            self.frames_delivered += 1
+
+        return True, frame, timestamp
+
+    def release_frame(self, frame: np.ndarray):
+        """Devolver un frame entregado por read_latest() para reutilizar su memoria"""
+        if frame is None or frame.shape != self._frame_shape:
+            return
+        with self._condition:
+            if not any(free is frame for free in self._free):
+                self._free.append(frame)
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Interfaz compatible con cv2.VideoCapture.read()"""
+        ret, frame, _ = self.read_latest()
+        return ret, frame
+
+    def get(self, prop_id: int) -> float:
+        """Consultar propiedades de la captura subyacente"""
+        return self.cap.get(prop_id)
+
+    def isOpened(self) -> bool:
+        return self._running and self.cap.isOpened()
+
+    def get_stats(self) -> dict:
+        """Obtener contadores de captura"""
+        return {
+            'frames_captured': self.frames_captured,
+            'frames_delivered': self.frames_delivered,
+            'dropped_frames': self.dropped_frames,
+            'read_failures': self.read_failures
+        }
+
+    def stop(self):
+        """Detener el hilo de captura"""
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def release(self):
+        """Detener la captura y liberar el stream"""
+        self.stop()
+        self.cap.release()
+        logger.info(f"Captura en segundo plano finalizada: {self.get_stats()}")
@@ -0,0 +1,156 @@
+import struct
+import threading
+import time
+import logging
+from collections import deque
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Mensaje binario por frame (debe coincidir con backend/app/services/track_stream.py):
+#   cabecera: magic 'VOIT', versión u16, reservado u16, camera_id u32, timestamp f64, cantidad u32
+#   seguida de `cantidad` registros TRACK_DTYPE (32 bytes c/u, little endian)
+MAGIC = b'VOIT'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIdI')
+TRACK_DTYPE = np.dtype([
+    ('track_id', '<u4'),
+    ('class_id', '<u2'),
+    ('flags', '<u2'),
+    ('bbox', '<f4', (4,)),
+    ('confidence', '<f4'),
+    ('speed_kmh', '<f4'),
+])
+FLAG_SPEED_VALID = 1
+FLAG_OVER_LIMIT = 2
+
+
+def encode_tracks(camera_id: int, timestamp: float, tracks, speeds: np.ndarray,
+                  speed_limit: Optional[float] = None, scale: Tuple[float, float] = (1.0, 1.0)) -> bytes:
+    """
+    Codificar los tracks de un frame en el formato binario del stream
+
+    Args:
+        camera_id: ID de la cámara
+        timestamp: Momento de captura del frame (época)
+        tracks: Tracks del frame en columnas (Detections con track_ids)
+        speeds: Velocidades en km/h por track (NaN = sin velocidad)
+        speed_limit: Límite para marcar los tracks que lo exceden (None = no marcar)
+        scale: Escala (x, y) a coordenadas nativas de la cámara
+
+    Returns:
+        Mensaje binario (24 bytes + 32 por track)
+    """
+    records = np.zeros(len(tracks), dtype=TRACK_DTYPE)
+    records['track_id'] = tracks.track_ids
+    records['class_id'] = tracks.class_ids
+    records['bbox'] = tracks.boxes * np.array([scale[0], scale[1], scale[0], scale[1]], dtype=np.float32)
+    records['confidence'] = tracks.scores
+    records['speed_kmh'] = speeds
+
+    valid = ~np.isnan(speeds)
+    flags = np.where(valid, FLAG_SPEED_VALID, 0)
+    if speed_limit is not None:
+        flags |= np.where(valid & (np.nan_to_num(speeds) > speed_limit * 1.1), FLAG_OVER_LIMIT, 0)
+    records['flags'] = flags
+
+    return HEADER.pack(MAGIC, VERSION, 0, camera_id, timestamp, len(tracks)) + records.tobytes()
+
+
+class TrackStreamSender:
+    """Envío de los tracks de cada frame por una conexión WebSocket persistente"""
+
+    def __init__(self, api_url: str, max_queue: int = 64, reconnect_interval: float = 5.0):
+        """
+        Inicializar sender
+
+        Args:
+            api_url: URL del backend API (http/https; se usa ws/wss)
+            max_queue: Mensajes en espera mientras no hay conexión (se descartan los más viejos)
+            reconnect_interval: Segundos entre intentos de reconexión
+        """
+        self.url = api_url.replace('https://', 'wss://').replace('http://', 'ws://') + '/api/tracks/ingest'
+        self.reconnect_interval = reconnect_interval
+
+        self._queue = deque(maxlen=max(1, max_queue))
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.sent = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+
+    def start(self) -> 'TrackStreamSender':
+        """Iniciar el hilo de envío"""
+        self._running = True
+        self._thread = threading.Thread(target=self._send_loop, name='track-stream', daemon=True)
+        self._thread.start()
+        return self
+
+    def send(self, message: bytes):
+        """Encolar un mensaje (no bloquea; si la cola está llena se descarta el más viejo)"""
+        with self._condition:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(message)
+            self._condition.notify()
+
+    def _connect(self):
+        try:
+            import websocket
+        except ImportError:
+            logger.error("Falta el paquete websocket-client: stream de tracks deshabilitado")
+            self._running = False
+            return None
+        try:
+            ws = websocket.create_connection(self.url, timeout=5)
+            logger.info(f"Stream de tracks conectado: {self.url}")
+            return ws
+        except Exception as e:
+            logger.warning(f"No se pudo conectar el stream de tracks: {e}")
+            return None
+
+    def _send_loop(self):
+        ws = None
+        while self._running:
+            if ws is None:
+                ws = self._connect()
+                if ws is None:
+                    time.sleep(self.reconnect_interval)
+                    continue
+
+            with self._condition:
+                while self._running and not self._queue:
+                    self._condition.wait(1.0)
+                if not self._running:
+                    break
+                message = self._queue.popleft()
+
+            try:
+                ws.send_binary(message)
+                self.sent += 1
+                self.bytes_sent += len(message)
+            except Exception as e:
+                logger.warning(f"Stream de tracks desconectado: {e}")
+                self.dropped += 1
+                ws.close()
+                ws = None
+
+        if ws is not None:
+            ws.close()
+
+    def get_stats(self) -> dict:
+        """Obtener contadores de mensajes enviados y descartados"""
+        return {'sent': self.sent, 'dropped': self.dropped, 'bytes_sent': self.bytes_sent}
+
+    def stop(self):
+        """Detener el hilo de envío"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=3)
+        logger.info(f"Stream de tracks detenido: {self.get_stats()}")
@@ -0,0 +1,78 @@
+import threading
+import time
+import logging
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class ViewerMonitor:
+    """Consulta en segundo plano si la cámara tiene visores en la web y regula la publicación de frames"""
+
+    def __init__(self, api_url: str, camera_id: int, preview_fps: float = 5.0,
+                 poll_interval: float = 1.0):
+        """
+        Inicializar monitor de visores
+
+        Args:
+            api_url: URL del backend API
+            camera_id: ID de la cámara en el sistema
+            preview_fps: Tasa máxima de frames publicados mientras haya visores
+            poll_interval: Segundos entre consultas al backend
+        """
+        self.url = f"{api_url}/api/camera-detection/viewers/{camera_id}"
+        self.min_interval = 1.0 / preview_fps if preview_fps > 0 else 0.0
+        self.poll_interval = poll_interval
+
+        self.has_viewers = False
+        self._last_publish = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll_loop, name=f'viewers-{camera_id}', daemon=True)
+
+        self.published_frames = 0
+        self.skipped_frames = 0
+
+    def start(self) -> 'ViewerMonitor':
+        """Iniciar el hilo de consulta"""
+        self._thread.start()
+        return self
+
+    def _poll_loop(self):
+        with requests.Session() as session:
+            while not self._stop.is_set():
+                try:
+                    response = session.get(self.url, timeout=2)
+                    if response.status_code == 200:
+                        has_viewers = bool(response.json().get('has_viewers'))
+                    elif response.status_code == 404:
+                        # Backend sin seguimiento de visores: publicar siempre, como antes
+                        has_viewers = True
+                    else:
+                        has_viewers = self.has_viewers
+                    if has_viewers != self.has_viewers:
+                        logger.info("Visores conectados: publicando frames" if has_viewers
+                                    else "Sin visores: se omite dibujo y publicación de frames")
+                    self.has_viewers = has_viewers
+                except Exception as e:
+                    logger.debug(f"No se pudo consultar visores: {e}")
+                self._stop.wait(self.poll_interval)
+
+    def should_publish(self) -> bool:
+        """Indicar si el frame actual debe dibujarse y publicarse para los visores"""
+        if not self.has_viewers:
+            self.skipped_frames += 1
+            return False
+        now = time.monotonic()
+        if now - self._last_publish < self.min_interval:
+            self.skipped_frames += 1
+            return False
+        self._last_publish = now
+        self.published_frames += 1
+        return True
+
+    def stop(self):
+        """Detener el hilo de consulta"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=3)